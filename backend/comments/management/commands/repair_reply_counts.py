@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from comments.models import Comment
+
+
+class Command(BaseCommand):
+    help = 'Backfill Comment.reply_count and repair any drift from the replies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report comments with a wrong count')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        actual_count = Comment.objects.filter(
+            parent=OuterRef('pk')
+        ).order_by().values('parent').annotate(total=Count('id')).values('total')
+
+        # Replies cannot have replies of their own, only top-level comments can drift
+        drifted = Comment.objects.filter(parent__isnull=True).annotate(
+            actual_count=Coalesce(Subquery(actual_count), 0)
+        ).exclude(reply_count=F('actual_count')).values_list('id', 'actual_count')
+
+        batch = []
+        repaired = 0
+        for comment_id, count in drifted.iterator(chunk_size=batch_size):
+            batch.append(Comment(id=comment_id, reply_count=count))
+            if len(batch) >= batch_size:
+                repaired += self._save(batch, options['dry_run'])
+                batch = []
+        repaired += self._save(batch, options['dry_run'])
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{action} {repaired} comments with a wrong reply count'))
+
+    def _save(self, batch, dry_run):
+        if batch and not dry_run:
+            Comment.objects.bulk_update(batch, ['reply_count'])
+        return len(batch)
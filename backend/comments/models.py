@@ -13,6 +13,7 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_edited = models.BooleanField(default=False)
+    reply_count = models.PositiveIntegerField(default=0)
     
     class Meta:
         ordering = ['-created_at']
@@ -24,13 +25,20 @@ class Comment(models.Model):
     def __str__(self):
         return f"Comment by {self.user.username} on {self.post.id}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored content, so save() can detect edits without a query
+        instance._loaded_content = instance.__dict__.get('content')
+        return instance
+    
     def save(self, *args, **kwargs):
         # Mark as edited if content changes (exclude initial creation)
-        if self.pk:
-            try:
-                old = Comment.objects.get(pk=self.pk)
-                if old.content != self.content:
-                    self.is_edited = True
-            except Comment.DoesNotExist:
-                pass
-        super().save(*args, **kwargs)
\ No newline at end of file
+        loaded_content = getattr(self, '_loaded_content', None)
+        if not self._state.adding and loaded_content is not None and loaded_content != self.content:
+            self.is_edited = True
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'is_edited' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'is_edited']
+        super().save(*args, **kwargs)
+        self._loaded_content = self.content
@@ -1,33 +1,34 @@
 from rest_framework import serializers
 from .models import Comment
-from users.models import Follow
-from django.db.models import Exists, OuterRef
+from posts.services.viewer_context import ViewerContext
 
 
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.SerializerMethodField()
-    reply_count = serializers.IntegerField(read_only=True)
     is_author = serializers.SerializerMethodField()
     
     class Meta:
         model = Comment
         fields = ['id', 'post', 'parent', 'content', 'author', 'created_at', 
                   'updated_at', 'is_edited', 'reply_count', 'is_author']
-        read_only_fields = ['created_at', 'updated_at', 'is_edited']
+        read_only_fields = ['created_at', 'updated_at', 'is_edited', 'reply_count']
     
     def get_author(self, obj):
         avatar = None
+        request = self.context.get('request')
         if hasattr(obj.user, 'avatar') and obj.user.avatar:
             try:
-                request = self.context.get('request')
                 avatar = request.build_absolute_uri(obj.user.avatar.url) if request else obj.user.avatar.url
             except ValueError:
                 avatar = None
         
-        # Use annotated value from queryset
-        is_following = getattr(obj, 'is_following_author', False)
+        # Shared (cached) pages leave viewer-specific fields to the overlay
+        is_following = False
+        if request and not self.context.get('viewer_independent'):
+            is_following = ViewerContext.for_request(request).is_following(obj.user_id)
         
         return {
+            'id': str(obj.user_id),
             'name': obj.user.username,
             'avatar': avatar,
             'is_following': is_following
@@ -35,6 +36,8 @@ class CommentSerializer(serializers.ModelSerializer):
     
     def get_is_author(self, obj):
         request = self.context.get('request')
+        if self.context.get('viewer_independent'):
+            return False
         if request and request.user.is_authenticated:
             return obj.user.id == request.user.id
         return False
@@ -0,0 +1,78 @@
+# comments/services/comment_cache.py
+from django.conf import settings
+
+from typing import List, Optional
+import logging
+
+from posts.services.feed_cache import FeedPageCache
+from posts.services.viewer_context import ViewerContext
+
+logger = logging.getLogger(__name__)
+
+
+class CommentPageCache(FeedPageCache):
+    """
+    Caches serialized, viewer-independent comment pages.
+
+    A post's top-level comments and a comment's replies each form a scope,
+    invalidated by bumping its version whenever a comment in it is created,
+    edited or deleted. Viewer-specific fields (author.is_following,
+    is_author) are filled in afterwards by apply_viewer_overlay.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.timeout = getattr(settings, 'COMMENT_PAGE_CACHE_TIMEOUT', 60)
+        self.key_prefix = getattr(settings, 'COMMENT_PAGE_CACHE_KEY_PREFIX', 'comment_page')
+
+    def scope(self, post_id=None, parent_id=None) -> Optional[str]:
+        """Scope of a comment list, None for lists that are not cached."""
+        if parent_id:
+            return f"parent:{parent_id}"
+        if post_id:
+            return f"post:{post_id}"
+        return None
+
+    def invalidate_thread(self, post_id, thread_id):
+        """Invalidate a post's comment pages and the reply pages of one top-level comment."""
+        try:
+            self.bump_version(self.scope(post_id=post_id))
+            self.bump_version(self.scope(parent_id=thread_id))
+        except Exception as e:
+            logger.error(f"Error invalidating comment cache for post {post_id}: {e}")
+
+    def invalidate_comment(self, comment):
+        """Invalidate every cached page that can contain this comment or its reply count."""
+        # A reply shows in its parent's reply list, a top-level comment owns one
+        self.invalidate_thread(comment.post_id, comment.parent_id or comment.pk)
+
+    def overlay_comments(self, comments: List[dict], user) -> List[dict]:
+        """Fill in the viewer-specific fields of serialized comments and their inlined replies."""
+        context = ViewerContext(user)
+        context.load(author_ids=[
+            item['author']['id']
+            for comment in comments
+            for item in [comment, *comment.get('replies', [])]
+        ])
+        viewer_id = str(user.pk) if context.is_authenticated else None
+
+        def overlay(item):
+            item = {
+                **item,
+                'author': {**item['author'], 'is_following': context.is_following(item['author']['id'])},
+                'is_author': item['author']['id'] == viewer_id,
+            }
+            if 'replies' in item:
+                item['replies'] = [overlay(reply) for reply in item['replies']]
+            return item
+
+        return [overlay(comment) for comment in comments]
+
+    def apply_viewer_overlay(self, page: dict, user) -> dict:
+        if not page['results']:
+            return page
+        return {**page, 'results': self.overlay_comments(page['results'], user)}
+
+
+# Singleton instance
+comment_page_cache = CommentPageCache()
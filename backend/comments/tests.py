@@ -1,3 +1,95 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from posts.models import Post
+from users.models import User, Follow
+from .models import Comment
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CommentQueryCountTests(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create(username='viewer')
+        self.author = User.objects.create(username='author')
+        Follow.objects.create(user_from=self.viewer, user_to=self.author)
+        self.post = Post.objects.create(user=self.author, caption='post', status='ready')
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def create_thread(self, comments, replies):
+        for i in range(comments):
+            parent = Comment.objects.create(post=self.post, user=self.author, content=f'comment {i}')
+            for j in range(replies):
+                self.client.post('/api/comments/', {'post': self.post.id, 'parent': parent.id, 'content': f'reply {j}'})
+
+    def get_thread(self):
+        return self.client.get('/api/comments/', {'post_id': self.post.id, 'limit': 20, 'replies': 2})
+
+    def test_list_query_count_is_constant(self):
+        # One page query, one window query for the inlined replies and one follow lookup
+        for comments, replies in [(2, 1), (10, 3)]:
+            self.create_thread(comments, replies)
+            with self.assertNumQueries(3):
+                response = self.get_thread()
+            self.assertEqual(response.status_code, 200)
+            for item in response.data['results']:
+                self.assertEqual(len(item['replies']), min(item['reply_count'], 2))
+                self.assertTrue(item['author']['is_following'])
+                self.assertFalse(item['is_author'])
+                self.assertTrue(all(reply['is_author'] for reply in item['replies']))
+
+    def test_cached_page_is_overlaid_per_viewer(self):
+        self.create_thread(3, 1)
+        self.get_thread()
+
+        # Only the viewer's follow lookup, the page itself comes from the cache
+        with self.assertNumQueries(1):
+            response = self.get_thread()
+        self.assertTrue(response.data['results'][0]['author']['is_following'])
+
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(0):
+            response = self.get_thread()
+        self.assertFalse(response.data['results'][0]['author']['is_following'])
+        self.assertFalse(response.data['results'][0]['replies'][0]['is_author'])
+
+    def test_writes_invalidate_cached_pages(self):
+        self.create_thread(1, 1)
+        parent = Comment.objects.get(parent__isnull=True)
+        self.assertEqual(self.get_thread().data['results'][0]['reply_count'], 1)
+
+        reply = self.client.post('/api/comments/', {'post': self.post.id, 'parent': parent.id, 'content': 'new'}).data
+        self.assertEqual(self.get_thread().data['results'][0]['reply_count'], 2)
+
+        self.client.patch(f"/api/comments/{reply['id']}/", {'content': 'edited'})
+        self.assertEqual(self.get_thread().data['results'][0]['replies'][0]['content'], 'edited')
+
+        self.client.delete(f"/api/comments/{reply['id']}/")
+        self.assertEqual(self.get_thread().data['results'][0]['reply_count'], 1)
+
+    def test_reply_count_is_maintained(self):
+        self.create_thread(1, 3)
+        parent = Comment.objects.get(parent__isnull=True)
+        self.assertEqual(parent.reply_count, 3)
+
+        reply = parent.replies.first()
+        self.assertEqual(self.client.delete(f'/api/comments/{reply.id}/').status_code, 204)
+        parent.refresh_from_db()
+        self.assertEqual(parent.reply_count, 2)
+
+    def test_edit_detection_needs_no_extra_select(self):
+        comment = Comment.objects.create(post=self.post, user=self.author, content='original')
+        comment = Comment.objects.get(pk=comment.pk)
+
+        with self.assertNumQueries(1):
+            comment.save()
+        self.assertFalse(comment.is_edited)
+
+        comment.content = 'changed'
+        with self.assertNumQueries(1):
+            comment.save()
+        comment.refresh_from_db()
+        self.assertTrue(comment.is_edited)
@@ -1,15 +1,29 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
-from django.db.models import Count, Exists, OuterRef, Value, BooleanField
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import Greatest, RowNumber
+from rest_framework.pagination import CursorPagination
 from .models import Comment
+from posts.models import Post
 from .serializers import CommentSerializer, CommentCreateSerializer, CommentUpdateSerializer
-from users.models import Follow
+from .services.comment_cache import comment_page_cache
+
+
+class CommentCursorPagination(CursorPagination):
+    # Keyset pagination on the (post, -created_at) and (parent, -created_at) indexes
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = '-created_at'
+    cursor_query_param = 'cursor'
 
 
 class CommentListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    pagination_class = None  # Disable pagination for comments
+    pagination_class = CommentCursorPagination
+    max_inline_replies = 10
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -21,66 +35,86 @@ class CommentListCreateView(generics.ListCreateAPIView):
         parent_id = self.request.query_params.get('parent_id')
         
         # Base queryset with optimizations
-        queryset = Comment.objects.select_related('user', 'post').annotate(
-            reply_count=Count('replies')
+        queryset = Comment.objects.select_related('user', 'post')
+        
+        if parent_id:
+            # Get replies to a specific comment
+            queryset = queryset.filter(parent_id=parent_id)
+        elif post_id:
+            # Get top-level comments for a post
+            queryset = queryset.filter(post_id=post_id, parent__isnull=True)
+        
+        return queryset.order_by('-created_at')
+    
+    def list(self, request, *args, **kwargs):
+        # ?replies=N inlines the newest N replies of each top-level comment
+        inline = request.query_params.get('replies')
+        limit = None
+        if inline and not request.query_params.get('parent_id'):
+            try:
+                limit = min(max(int(inline), 0), self.max_inline_replies)
+            except ValueError:
+                limit = 0
+        
+        scope = comment_page_cache.scope(
+            post_id=request.query_params.get('post_id'),
+            parent_id=request.query_params.get('parent_id')
         )
+        params = f"{request.query_params.get('cursor', '')}:{request.query_params.get('limit', '')}:{limit}"
         
-        # Annotate is_following for authenticated users
-        if self.request.user.is_authenticated:
-            queryset = queryset.annotate(
-                is_following_author=Exists(
-                    Follow.objects.filter(
-                        user_from=self.request.user,
-                        user_to=OuterRef('user_id')
-                    )
-                )
-            )
+        # Pages are shared between viewers, viewer-specific fields are filled in afterwards
+        if scope:
+            page = comment_page_cache.get_or_build(scope, params, lambda: self._build_page(request, limit))
         else:
-            queryset = queryset.annotate(
-                is_following_author=Value(False, output_field=BooleanField())
-            )
+            page = self._build_page(request, limit)
+        return Response(comment_page_cache.apply_viewer_overlay(page, request.user))
+    
+    def _build_page(self, request, limit):
+        page = super().list(request).data
+        if limit is not None:
+            self.inline_replies(page['results'], limit)
+        return page
+    
+    def inline_replies(self, comments, limit):
+        """Attach the first `limit` replies of every comment, fetched with one window-function query."""
+        for comment in comments:
+            comment['replies'] = []
+        if not comments or not limit:
+            return
         
-        # Filter by post (top-level comments only by default)
-        if post_id:
-            if parent_id:
-                # Get replies to a specific comment
-                queryset = queryset.filter(parent_id=parent_id)
-            else:
-                # Get top-level comments for a post
-                queryset = queryset.filter(post_id=post_id, parent__isnull=True)
+        replies = Comment.objects.select_related('user', 'post').filter(
+            parent_id__in=[comment['id'] for comment in comments]
+        ).annotate(
+            row_number=Window(RowNumber(), partition_by=[F('parent_id')], order_by=F('created_at').desc())
+        ).filter(row_number__lte=limit).order_by('parent_id', '-created_at')
         
-        return queryset.order_by('-created_at')
+        by_parent = {str(comment['id']): comment for comment in comments}
+        for reply in CommentSerializer(replies, many=True, context=self.get_serializer_context()).data:
+            by_parent[str(reply['parent'])]['replies'].append(reply)
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        comment = serializer.save()
+        with transaction.atomic():
+            comment = serializer.save()
+            Post.objects.filter(pk=comment.post_id).update(comment_count=F('comment_count') + 1)
+            if comment.parent_id:
+                Comment.objects.filter(pk=comment.parent_id).update(reply_count=F('reply_count') + 1)
+        comment_page_cache.invalidate_comment(comment)
         
-        # Return the full comment data with annotations
-        comment_queryset = Comment.objects.filter(pk=comment.pk).select_related('user', 'post').annotate(
-            reply_count=Count('replies')
+        # Return the full comment data
+        output_serializer = CommentSerializer(
+            Comment.objects.select_related('user', 'post').get(pk=comment.pk),
+            context={'request': request}
         )
-        
-        if request.user.is_authenticated:
-            comment_queryset = comment_queryset.annotate(
-                is_following_author=Exists(
-                    Follow.objects.filter(
-                        user_from=request.user,
-                        user_to=OuterRef('user_id')
-                    )
-                )
-            )
-        else:
-            comment_queryset = comment_queryset.annotate(
-                is_following_author=Value(False, output_field=BooleanField())
-            )
-        
-        output_serializer = CommentSerializer(comment_queryset.first(), context={'request': request})
         return Response(output_serializer.data, status=status.HTTP_201_CREATED)
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
+        if self.request.method == 'GET':
+            # List pages are cached for every viewer, see CommentPageCache.apply_viewer_overlay
+            context['viewer_independent'] = True
         return context
 
 
@@ -93,37 +127,29 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
             return CommentUpdateSerializer
         return CommentSerializer
     
-    def get_queryset(self):
-        queryset = super().get_queryset().annotate(
-            reply_count=Count('replies')
-        )
-        
-        if self.request.user.is_authenticated:
-            queryset = queryset.annotate(
-                is_following_author=Exists(
-                    Follow.objects.filter(
-                        user_from=self.request.user,
-                        user_to=OuterRef('user_id')
-                    )
-                )
-            )
-        else:
-            queryset = queryset.annotate(
-                is_following_author=Value(False, output_field=BooleanField())
-            )
-        
-        return queryset
-    
     def perform_update(self, serializer):
-        comment = self.get_object()
-        if comment.user != self.request.user:
+        comment = serializer.instance
+        if comment.user_id != self.request.user.id:
             raise PermissionDenied("You can only edit your own comments")
         serializer.save()
+        comment_page_cache.invalidate_comment(comment)
     
     def perform_destroy(self, instance):
         if instance.user != self.request.user:
             raise PermissionDenied("You can only delete your own comments")
-        instance.delete()
+        thread_id = instance.parent_id or instance.pk
+        with transaction.atomic():
+            # Deleting a top-level comment cascades to its replies
+            removed = 1 + instance.reply_count
+            instance.delete()
+            Post.objects.filter(pk=instance.post_id).update(
+                comment_count=Greatest(F('comment_count') - removed, 0)
+            )
+            if instance.parent_id:
+                Comment.objects.filter(pk=instance.parent_id).update(
+                    reply_count=Greatest(F('reply_count') - 1, 0)
+                )
+        comment_page_cache.invalidate_thread(instance.post_id, thread_id)
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
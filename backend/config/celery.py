@@ -11,9 +11,40 @@ app.autodiscover_tasks()
 # Optional: periodic tasks
 app.conf.beat_schedule = {
     'daily-reputation-decay': {
-        'task': 'users.tasks.decay_all_creators',
+        'task': 'votes.tasks.decay_all_creators',
         'schedule': crontab(hour=0, minute=0),
     },
+    'rebuild-feed-ranking': {
+        'task': 'posts.tasks.rebuild_feed_ranking',
+        'schedule': crontab(minute='*/5'),
+    },
+    'rebuild-follow-graph': {
+        'task': 'users.tasks.rebuild_follow_graph',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'compute-who-to-follow': {
+        'task': 'users.tasks.compute_who_to_follow',
+        'schedule': crontab(hour=4, minute=0),
+    },
 }
 
 app.conf.timezone = 'UTC'
+
+
+@app.on_after_configure.connect
+def setup_interval_tasks(sender, **kwargs):
+    # Intervals come from config/settings.py, which is loaded by now
+    from django.conf import settings
+
+    sender.add_periodic_task(
+        settings.VIEW_COUNT_FLUSH_INTERVAL, sender.signature('posts.tasks.flush_view_counts'),
+        name='flush-view-counts',
+    )
+    sender.add_periodic_task(
+        settings.REPUTATION_RECALC_INTERVAL, sender.signature('votes.tasks.recalculate_dirty_creators'),
+        name='recalculate-dirty-creators',
+    )
+    sender.add_periodic_task(
+        settings.VOTE_STREAM_CONSUME_INTERVAL, sender.signature('votes.tasks.consume_vote_stream'),
+        name='consume-vote-stream',
+    )
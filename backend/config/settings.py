@@ -96,6 +96,44 @@ CACHES = {
     }
 }
 
+# 'keys' stores one Redis key per (post, viewer); 'hll' uses bounded-size structures per post
+VIEW_TRACKING_MODE = os.getenv('VIEW_TRACKING_MODE', 'keys')
+VIEW_BLOOM_INITIAL_VIEWERS = int(os.getenv('VIEW_BLOOM_INITIAL_VIEWERS', 256))  # per post and bucket before the filter grows
+VIEW_BLOOM_FALSE_POSITIVE_RATE = float(os.getenv('VIEW_BLOOM_FALSE_POSITIVE_RATE', 0.001))  # new viewers wrongly in cooldown
+
+# Buffered view counting, see posts.services.redis__service.RedisViewCounter
+VIEW_COUNT_FLUSH_INTERVAL = int(os.getenv('VIEW_COUNT_FLUSH_INTERVAL', 5))  # seconds
+VIEW_COUNT_FLUSH_BATCH_SIZE = int(os.getenv('VIEW_COUNT_FLUSH_BATCH_SIZE', 500))
+VIEW_COUNT_FLUSH_LOCK_TIMEOUT = int(os.getenv('VIEW_COUNT_FLUSH_LOCK_TIMEOUT', 60))  # seconds, longest expected flush
+
+# 'sync' applies votes in the request; 'stream' queues them, see votes.services.vote_stream.VoteStream
+VOTE_INGESTION_MODE = os.getenv('VOTE_INGESTION_MODE', 'sync')
+VOTE_STREAM_CONSUME_INTERVAL = int(os.getenv('VOTE_STREAM_CONSUME_INTERVAL', 1))  # seconds
+VOTE_STREAM_BATCH_SIZE = int(os.getenv('VOTE_STREAM_BATCH_SIZE', 500))
+VOTE_STREAM_LOCK_TIMEOUT = int(os.getenv('VOTE_STREAM_LOCK_TIMEOUT', 60))  # seconds, longer than one batch takes
+
+# Window in which votes for one creator are coalesced into a single reputation recalculation
+REPUTATION_RECALC_INTERVAL = int(os.getenv('REPUTATION_RECALC_INTERVAL', 60))  # seconds
+REPUTATION_CHUNK_SIZE = int(os.getenv('REPUTATION_CHUNK_SIZE', 1000))  # creators per grouped aggregate
+
+# Weekly and monthly leaderboards are cached for this long
+LEADERBOARD_WINDOW_CACHE_TTL = int(os.getenv('LEADERBOARD_WINDOW_CACHE_TTL', 300))  # seconds
+
+# Following feed inboxes, see posts.services.following_feed.FollowingFeed
+FOLLOWING_FEED_INBOX_SIZE = int(os.getenv('FOLLOWING_FEED_INBOX_SIZE', 500))  # posts per follower
+FOLLOWING_FEED_FANOUT_LIMIT = int(os.getenv('FOLLOWING_FEED_FANOUT_LIMIT', 10000))  # followers above which posts are merged at read time
+FOLLOWING_FEED_FANOUT_CHUNK_SIZE = int(os.getenv('FOLLOWING_FEED_FANOUT_CHUNK_SIZE', 1000))  # inboxes per fan-out task
+
+# Who-to-follow suggestions are recomputed nightly, see users.recommendations
+WHO_TO_FOLLOW_TTL = int(os.getenv('WHO_TO_FOLLOW_TTL', 60 * 60 * 48))  # seconds
+
+# Authenticated users are resolved from a two-tier cache, see users.services.user_cache
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))  # seconds, shared cache
+AUTH_USER_CACHE_LOCAL_TTL = int(os.getenv('AUTH_USER_CACHE_LOCAL_TTL', 5))  # seconds, per process
+
+# Comment pages are shared between viewers and invalidated on every write, see comments.services.comment_cache
+COMMENT_PAGE_CACHE_TIMEOUT = int(os.getenv('COMMENT_PAGE_CACHE_TIMEOUT', 60))  # seconds
+
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
 
@@ -108,7 +146,7 @@ CELERY_TIMEZONE = 'UTC'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -0,0 +1,116 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from redis.exceptions import ResponseError
+
+from posts.services.redis__service import (
+    TRACK_VIEW_BLOOM_SCRIPT,
+    TRACK_VIEW_SCRIPT,
+    RedisHLLViewTracker,
+    RedisViewTracker,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare memory and accuracy of the key-per-view tracker with the '
+        'HyperLogLog/Bloom filter tracker over a full cooldown window, for '
+        'posts whose viewers follow a Zipf distribution'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000, help='Number of posts')
+        parser.add_argument('--peak-viewers', type=int, default=10000,
+                            help='Distinct viewers per bucket of the most viewed post')
+        parser.add_argument('--zipf', type=float, default=1.0,
+                            help='Zipf exponent, post r gets peak / r**zipf viewers per bucket')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Views per pipeline')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        keys_tracker = RedisViewTracker()
+        hll_tracker = RedisHLLViewTracker()
+        for tracker in (keys_tracker, hll_tracker):
+            tracker.key_prefix = f"bench-{run_id}:{tracker.key_prefix}"
+        self.batch_size = options['batch_size']
+
+        # Every bucket of the window gets new viewers, as with steady traffic
+        buckets = hll_tracker.window_buckets + 1
+        post_ids = [uuid.uuid4().hex for _ in range(options['posts'])]
+        viewers = {
+            post_id: max(int(options['peak_viewers'] / rank ** options['zipf']), 1)
+            for rank, post_id in enumerate(post_ids, start=1)
+        }
+        self.stdout.write(
+            f"{len(post_ids)} posts, {sum(viewers.values()) * buckets:,} views over {buckets} buckets "
+            f"of {hll_tracker.bucket_seconds // 60} minutes, "
+            f"{viewers[post_ids[0]]:,} to {viewers[post_ids[-1]]:,} viewers per post and bucket"
+        )
+
+        self.redis_conn = keys_tracker._get_redis()
+        try:
+            for name, tracker in [('keys', keys_tracker), ('hll', hll_tracker)]:
+                self.report(name, tracker, post_ids, viewers, buckets)
+        finally:
+            self.delete_keys(f"bench-{run_id}:*")
+
+    def report(self, name, tracker, post_ids, viewers, buckets):
+        now = time.time()
+        refused = {post_id: 0 for post_id in post_ids}
+        for bucket in range(buckets):
+            # Oldest bucket first, ending with the current one
+            bucket_now = now - (buckets - 1 - bucket) * getattr(tracker, 'bucket_seconds', 0)
+            views = [
+                (post_id, f"user_{uuid.uuid4().hex}")
+                for post_id in post_ids for _ in range(viewers[post_id])
+            ]
+            # Every viewer is new, so any refusal is a false cooldown
+            for post_id, tracked in self.track(tracker, views, bucket_now):
+                refused[post_id] += not tracked
+
+        head, tail = post_ids[0], post_ids[len(post_ids) // 2]
+        total_views = sum(viewers.values()) * buckets
+        memory = self.memory_usage(f'{tracker.key_prefix}:*')
+        line = (
+            f"  {name:>4}: {memory / 1024 ** 2:,.1f} MB in total, "
+            f"{self.memory_usage(f'{tracker.key_prefix}:*{head}*') / 1024:,.0f} KB for the top post, "
+            f"{self.memory_usage(f'{tracker.key_prefix}:*{tail}*') / 1024:,.1f} KB for the median post, "
+            f"false cooldowns {sum(refused.values()) / total_views:.3%} "
+            f"({refused[head] / (viewers[head] * buckets):.3%} on the top post)"
+        )
+        if isinstance(tracker, RedisHLLViewTracker):
+            count = viewers[head] * buckets
+            estimate = tracker.get_unique_viewers(head)
+            line += f", top post unique viewer estimate {estimate} ({(estimate - count) / count:+.2%})"
+        self.stdout.write(line)
+
+    def track(self, tracker, views, now):
+        """Track (post_id, viewer) pairs in pipelines, yielding (post_id, tracked)."""
+        is_hll = isinstance(tracker, RedisHLLViewTracker)
+        script = self.redis_conn.register_script(TRACK_VIEW_BLOOM_SCRIPT if is_hll else TRACK_VIEW_SCRIPT)
+        current_bucket = int(now // tracker.bucket_seconds) if is_hll else None
+        for start in range(0, len(views), self.batch_size):
+            batch = views[start:start + self.batch_size]
+            pipe = self.redis_conn.pipeline(transaction=False)
+            for post_id, viewer in batch:
+                if is_hll:
+                    tracker._queue_check(script, pipe, post_id, viewer, current_bucket)
+                else:
+                    script(keys=[tracker._get_key(post_id, viewer)], args=[tracker.cooldown], client=pipe)
+            for (post_id, _), (tracked, _) in zip(batch, pipe.execute()):
+                yield post_id, tracked
+
+    def memory_usage(self, pattern):
+        total = 0
+        for key in self.redis_conn.scan_iter(match=pattern, count=1000):
+            try:
+                total += self.redis_conn.memory_usage(key) or 0
+            except ResponseError:
+                # Server without MEMORY USAGE: serialized size, without Redis overhead
+                total += len(key) + len(self.redis_conn.dump(key) or b'')
+        return total
+
+    def delete_keys(self, pattern):
+        for key in self.redis_conn.scan_iter(match=pattern, count=1000):
+            self.redis_conn.delete(key)
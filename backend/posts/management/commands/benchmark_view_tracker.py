@@ -0,0 +1,92 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from redis.exceptions import ResponseError
+
+from posts.services.redis__service import redis_view_tracker
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the legacy get/set view cooldown with the atomic one: '
+        'Redis calls per request, latency under concurrency and double counting'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--viewers', type=int, default=200, help='Distinct viewers, so some requests hit the cooldown')
+
+    def handle(self, *args, **options):
+        self.redis_conn = redis_view_tracker._get_redis()
+        self.run_id = uuid.uuid4().hex[:8]
+
+        try:
+            for name, track in [('legacy get/set', self.legacy_track), ('atomic script', self.atomic_track)]:
+                self.report(name, *self.run(track, options))
+                self.report_race(name, track, options['concurrency'])
+        finally:
+            for key in self.redis_conn.scan_iter(match=f"*{redis_view_tracker.key_prefix}:bench-{self.run_id}*"):
+                self.redis_conn.delete(key)
+
+    def legacy_track(self, post_id, user_identifier):
+        """The previous implementation: cache.get, cache.set, then a TTL lookup on refusal."""
+        key = redis_view_tracker._get_key(post_id, user_identifier)
+        if cache.get(key):
+            self.redis_conn.ttl(key)
+            return False
+        cache.set(key, 1, timeout=redis_view_tracker.cooldown)
+        return True
+
+    def atomic_track(self, post_id, user_identifier):
+        tracked, _ = redis_view_tracker.check_and_track(post_id, user_identifier)
+        return tracked
+
+    def run(self, track, options):
+        post_id = f"bench-{self.run_id}-{uuid.uuid4().hex[:8]}"
+        viewers = [f"user_{i}" for i in range(options['viewers'])]
+
+        def timed(i):
+            start = time.perf_counter()
+            track(post_id, viewers[i % len(viewers)])
+            return time.perf_counter() - start
+
+        calls_before = self.command_calls()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            latencies = list(pool.map(timed, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+        calls_after = self.command_calls()
+        calls = calls_after - calls_before if calls_before is not None else None
+
+        return options['requests'], calls, elapsed, latencies
+
+    def report(self, name, requests, calls, elapsed, latencies):
+        latencies_ms = sorted(latency * 1000 for latency in latencies)
+        p95 = latencies_ms[int(len(latencies_ms) * 0.95) - 1]
+        calls_per_request = f"{calls / requests:.2f}" if calls is not None else 'n/a'
+        self.stdout.write(
+            f"{name:>15}: {calls_per_request} Redis calls/request, "
+            f"mean {statistics.mean(latencies_ms):.3f} ms, p95 {p95:.3f} ms, "
+            f"{requests / elapsed:.0f} requests/s"
+        )
+
+    def report_race(self, name, track, concurrency):
+        """Fire the same (post, viewer) pair concurrently, exactly one view should count."""
+        post_id = f"bench-{self.run_id}-race-{uuid.uuid4().hex[:8]}"
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            tracked = sum(pool.map(lambda _: track(post_id, 'user_race'), range(concurrency)))
+        style = self.style.SUCCESS if tracked == 1 else self.style.WARNING
+        self.stdout.write(style(f"{name:>15}: {tracked} of {concurrency} concurrent duplicate views counted"))
+
+    def command_calls(self):
+        # Includes commands from other clients, run against an otherwise idle Redis
+        try:
+            stats = self.redis_conn.info('commandstats')
+        except ResponseError:
+            return None
+        return sum(stat['calls'] for command, stat in stats.items() if command != 'cmdstat_info')
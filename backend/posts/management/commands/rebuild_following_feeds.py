@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.services.following_feed import following_feed
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every Following feed outbox and inbox from the posts and follow tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        outboxes, inboxes = following_feed.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {outboxes} outboxes and {inboxes} inboxes'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from comments.models import Comment
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Backfill Post.comment_count and repair any drift from the comments table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report posts with a wrong count')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        actual_count = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(total=Count('id')).values('total')
+
+        drifted = Post.objects.annotate(
+            actual_count=Coalesce(Subquery(actual_count), 0)
+        ).exclude(comment_count=F('actual_count')).values_list('id', 'actual_count')
+
+        batch = []
+        repaired = 0
+        for post_id, count in drifted.iterator(chunk_size=batch_size):
+            batch.append(Post(id=post_id, comment_count=count))
+            if len(batch) >= batch_size:
+                repaired += self._save(batch, options['dry_run'])
+                batch = []
+        repaired += self._save(batch, options['dry_run'])
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{action} {repaired} posts with a wrong comment count'))
+
+    def _save(self, batch, dry_run):
+        if batch and not dry_run:
+            Post.objects.bulk_update(batch, ['comment_count'])
+        return len(batch)
@@ -57,6 +57,7 @@ class Post(models.Model):
     plus_two_count = models.IntegerField(default=0)
     total_score = models.IntegerField(default=0, db_index=True)
     view_count = models.PositiveIntegerField(default=0, db_index=True)
+    comment_count = models.PositiveIntegerField(default=0)
 
     
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -0,0 +1,230 @@
+# posts/pagination.py
+import base64
+import json
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .services.feed_service import get_feed_base_queryset, get_user_feed, hydrate_posts
+from .services.following_feed import following_feed
+from .services.ranking_service import feed_ranking_index
+from .services.viewer_context import ViewerContext
+
+
+class RankedFeedPagination(BasePagination):
+    """
+    Cursor pagination that keeps the feed ranking.
+
+    When the ranking index is available, the first page freezes the ranked IDs
+    in a snapshot (shared by sessions starting within the same short window,
+    see FeedRankingIndex.create_snapshot) and the cursor encodes (snapshot, offset), so
+    every page is a single range read and posts never repeat or go missing
+    while scores change. Snapshots hold the top FEED_SNAPSHOT_SIZE posts, past
+    the last one the feed continues on the keyset path below.
+
+    Otherwise it falls back to keyset pagination over the SQL feed, with a cursor
+    encoding (now, feed_score, created_at, id). `now` is frozen on the first page
+    so the computed scores stay comparable between pages.
+    """
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 50
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_feed(self, request, category_slug=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_cursor = None
+        self.previous_cursor = None
+
+        cursor = self.decode_cursor(request)
+
+        if cursor is None or 's' in cursor:
+            page = self._paginate_snapshot(cursor, category_slug)
+            if page is not None:
+                return page
+            # The index is not available, start over on the SQL feed
+            cursor = None
+
+        return self._paginate_keyset(cursor, category_slug)
+
+    def _paginate_snapshot(self, cursor, category_slug):
+        if cursor:
+            snapshot_id, offset = cursor['s'], cursor['o']
+            post_ids = feed_ranking_index.get_snapshot_ids(snapshot_id, offset, self.page_size + 1)
+        else:
+            snapshot_id, offset, post_ids = None, 0, None
+
+        if post_ids is None:
+            # First page or expired snapshot: freeze a new one and keep the same offset
+            snapshot_id = feed_ranking_index.create_snapshot(category_slug)
+            if snapshot_id is None:
+                return None
+            post_ids = feed_ranking_index.get_snapshot_ids(snapshot_id, offset, self.page_size + 1) or []
+
+        if len(post_ids) > self.page_size:
+            self.next_cursor = {'s': snapshot_id, 'o': offset + self.page_size}
+        if offset > 0:
+            self.previous_cursor = {'s': snapshot_id, 'o': max(offset - self.page_size, 0)}
+
+        page = hydrate_posts(post_ids[:self.page_size])
+        if self.next_cursor is None and page and offset + len(post_ids) >= feed_ranking_index.snapshot_size:
+            # The snapshot is capped, continue below its last post on the SQL feed
+            page += self._paginate_keyset(
+                self._keyset_cursor(snapshot_id, page[-1], category_slug), category_slug, self.page_size - len(page)
+            )
+        return page
+
+    def _keyset_cursor(self, snapshot_id, post, category_slug):
+        """
+        A keyset cursor right after this snapshot post, at the score and
+        reference time it has in the snapshot so the SQL feed continues the
+        same order. Scored by the SQL feed at the current time if the
+        snapshot expired meanwhile.
+        """
+        position = feed_ranking_index.get_snapshot_score(snapshot_id, str(post.id))
+        if position is None:
+            now = timezone.now()
+            feed_score = get_user_feed(category_slug=category_slug, now=now).filter(
+                id=post.id
+            ).values_list('feed_score', flat=True).first()
+        else:
+            now, feed_score = position
+        return {'t': now, 'f': feed_score or 0.0, 'c': post.created_at, 'i': str(post.id)}
+
+    def _encode_keyset_cursor(self, now, feed_score, created_at, post_id):
+        return {
+            't': now.timestamp(),
+            'f': feed_score,
+            'c': created_at.isoformat(),
+            'i': str(post_id),
+        }
+
+    def _paginate_keyset(self, cursor, category_slug, limit=None):
+        limit = self.page_size if limit is None else limit
+        now = cursor['t'] if cursor else timezone.now()
+
+        if limit <= 0:
+            # The page is already full, only hand out the cursor
+            self.next_cursor = self._encode_keyset_cursor(cursor['t'], cursor['f'], cursor['c'], cursor['i'])
+            return []
+
+        queryset = get_user_feed(category_slug=category_slug, now=now)
+
+        if cursor:
+            queryset = queryset.filter(
+                Q(feed_score__lt=cursor['f']) |
+                Q(feed_score=cursor['f'], created_at__lt=cursor['c']) |
+                Q(feed_score=cursor['f'], created_at=cursor['c'], id__lt=cursor['i'])
+            ).exclude(id=cursor['i'])
+
+        page = list(queryset[:limit + 1])
+        if len(page) > limit:
+            page = page[:limit]
+            last = page[-1]
+            self.next_cursor = self._encode_keyset_cursor(now, last.feed_score, last.created_at, last.id)
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii'))
+            if 's' in cursor:
+                cursor['o'] = max(int(cursor['o']), 0)
+            else:
+                cursor['t'] = datetime.fromtimestamp(float(cursor['t']), tz=dt_timezone.utc)
+                cursor['f'] = float(cursor['f'])
+                cursor['c'] = parse_datetime(cursor['c'])
+                if cursor['c'] is None:
+                    raise ValueError
+                cursor['i'] = str(uuid.UUID(cursor['i']))
+            return cursor
+        except (TypeError, ValueError, KeyError, AttributeError, OverflowError, OSError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        if cursor is None:
+            return None
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('ascii')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.encode_cursor(self.next_cursor),
+            'previous': self.encode_cursor(self.previous_cursor),
+            'results': data,
+        })
+
+
+class FollowingFeedPagination(RankedFeedPagination):
+    """
+    Cursor pagination for the Following feed, newest first.
+
+    The cursor holds the creation timestamp of the last post shown. Pages
+    come from the viewer's inbox (see FollowingFeed), or from a join over
+    the Follow table while Redis is unavailable or the inbox is not built.
+    """
+
+    def paginate_following(self, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_cursor = None
+        self.previous_cursor = None
+
+        cursor = self.decode_cursor(request)
+        before = cursor['b'] if cursor else None
+
+        entries = following_feed.get_page(
+            ViewerContext.for_request(request), None if before is None else before.timestamp(), self.page_size + 1
+        )
+        if entries is None:
+            return self._paginate_follow_join(request.user, before)
+
+        if len(entries) > self.page_size:
+            self.next_cursor = {'b': entries[self.page_size - 1][1]}
+        return hydrate_posts([post_id for post_id, _ in entries[:self.page_size]])
+
+    def _paginate_follow_join(self, user, before):
+        from users.models import Follow
+
+        queryset = get_feed_base_queryset().filter(
+            user__in=Follow.objects.filter(user_from=user).values('user_to')
+        )
+        if before is not None:
+            queryset = queryset.filter(created_at__lt=before)
+
+        page = list(queryset.order_by('-created_at')[:self.page_size + 1])
+        if len(page) > self.page_size:
+            page = page[:self.page_size]
+            self.next_cursor = {'b': page[-1].created_at.timestamp()}
+        return page
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii'))
+            return {'b': datetime.fromtimestamp(float(cursor['b']), tz=dt_timezone.utc)}
+        except (TypeError, ValueError, KeyError, OverflowError, OSError):
+            raise NotFound(self.invalid_cursor_message)
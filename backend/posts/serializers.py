@@ -2,9 +2,9 @@ from rest_framework import serializers
 from .models import Post, Category
 from django.conf import settings
 from users.serializers import UserSerializer
-from users.models import Follow
 from django.utils import timezone
 from datetime import timedelta
+from .services.viewer_context import ViewerContext
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -13,6 +13,16 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'label', 'slug', 'order']
 
 
+class PostListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Resolve the viewer's votes and follows for the whole page at once
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request and not self.context.get('viewer_independent'):
+            ViewerContext.for_request(request).load_posts(posts)
+        return super().to_representation(posts)
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.SerializerMethodField()
     videoUrl = serializers.SerializerMethodField()
@@ -42,6 +52,7 @@ class PostSerializer(serializers.ModelSerializer):
             'createdAt', 'totalScore', 'views', 
             'userVote', 'editingSoftware', 'category', 'categoryId', 'commentCount'
         ]
+        list_serializer_class = PostListSerializer
 
     def get_totalScore(self, obj):
         """Return total score only if post is older than 24 hours, otherwise None"""
@@ -59,20 +70,13 @@ class PostSerializer(serializers.ModelSerializer):
             except ValueError:
                 avatar = None
         
-        # Check for annotated is_following value from queryset
         is_following = False
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            if hasattr(obj.user, 'is_following'):
-                is_following = obj.user.is_following
-            else:
-                # Fallback query if not annotated
-                is_following = Follow.objects.filter(
-                    user_from=request.user, 
-                    user_to=obj.user
-                ).exists()
+        if request and not self.context.get('viewer_independent'):
+            is_following = ViewerContext.for_request(request).is_following(obj.user_id)
         
         return {
+            'id': str(obj.user_id),
             'name': obj.user.username,
             'avatar': avatar,
             'is_following': is_following
@@ -92,13 +96,8 @@ class PostSerializer(serializers.ModelSerializer):
 
     def get_userVote(self, obj):
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            from votes.models import Vote
-            try:
-                vote = Vote.objects.get(user=request.user, post=obj)
-                return vote.value
-            except Vote.DoesNotExist:
-                return None
+        if request and not self.context.get('viewer_independent'):
+            return ViewerContext.for_request(request).get_vote(obj.id)
         return None
     
     
@@ -175,4 +174,13 @@ class PostThumbnailSerializer(serializers.ModelSerializer):
         return None
 
     def get_viewCount(self, obj):
-        return obj.view_count
\ No newline at end of file
+        return obj.view_count
+
+
+class TrackViewItemSerializer(serializers.Serializer):
+    post_id = serializers.UUIDField()
+    viewed_at = serializers.DateTimeField(required=False)
+
+
+class TrackViewsBatchSerializer(serializers.Serializer):
+    views = TrackViewItemSerializer(many=True, allow_empty=False, max_length=50)
@@ -0,0 +1,134 @@
+# posts/services/feed_cache.py
+from django.core.cache import cache
+from django.conf import settings
+
+from typing import Callable, Optional
+import hashlib
+import logging
+import time
+
+from .viewer_context import ViewerContext
+
+logger = logging.getLogger(__name__)
+
+
+class FeedPageCache:
+    """
+    Caches serialized, viewer-independent feed and profile pages.
+
+    Pages are keyed by scope (category or profile), a scope version and the
+    pagination params. Bumping a scope version invalidates all of its pages at
+    once. Viewer-specific fields (author.is_following, userVote) are filled in
+    afterwards by apply_viewer_overlay.
+    """
+
+    def __init__(self):
+        self.timeout = getattr(settings, 'FEED_PAGE_CACHE_TIMEOUT', 60)
+        self.lock_timeout = getattr(settings, 'FEED_PAGE_CACHE_LOCK_TIMEOUT', 10)
+        self.lock_wait = getattr(settings, 'FEED_PAGE_CACHE_LOCK_WAIT', 2.0)
+        self.key_prefix = getattr(settings, 'FEED_PAGE_CACHE_KEY_PREFIX', 'feed_page')
+
+    def feed_scope(self, category_slug: Optional[str] = None) -> str:
+        if category_slug and category_slug not in ['all', 'other']:
+            return f"cat:{category_slug}"
+        return "all"
+
+    def profile_scope(self, username: str, category_slug: Optional[str] = None) -> str:
+        if category_slug and category_slug not in ['all', 'other']:
+            return f"user:{username}:cat:{category_slug}"
+        return f"user:{username}:cat:all"
+
+    def _get_version_key(self, scope: str) -> str:
+        # Profile pages share one version per user across categories, "user:<username>"
+        return f"{self.key_prefix}:version:{scope.split(':cat:')[0]}"
+
+    def _get_page_key(self, scope: str, version: int, params: str) -> str:
+        digest = hashlib.md5(params.encode()).hexdigest()
+        return f"{self.key_prefix}:{scope}:v{version}:{digest}"
+
+    def get_version(self, scope: str) -> int:
+        return cache.get_or_set(self._get_version_key(scope), 1, timeout=None)
+
+    def bump_version(self, scope: str):
+        key = self._get_version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, timeout=None)
+
+    def invalidate_post(self, post):
+        """
+        Invalidate every cached page that can contain this post, when it is
+        published or removed. Score and counter changes are not worth a
+        miss on every page, they show up once the pages expire.
+        """
+        category_slug = post.category.slug if post.category_id else None
+        try:
+            self.bump_version(self.feed_scope())
+            if category_slug:
+                self.bump_version(self.feed_scope(category_slug))
+            self.bump_version(self.profile_scope(post.user.username))
+        except Exception as e:
+            logger.error(f"Error invalidating feed cache for post {post.id}: {e}")
+
+    def get_or_build(self, scope: str, params: str, build: Callable[[], dict]) -> dict:
+        """
+        Return the cached page, or build and cache it.
+        Only one request rebuilds a cold key, the others wait for its result.
+        """
+        try:
+            key = self._get_page_key(scope, self.get_version(scope), params)
+            page = cache.get(key)
+            if page is not None:
+                return page
+            lock_key = f"{key}:lock"
+            locked = cache.add(lock_key, 1, timeout=self.lock_timeout)
+        except Exception as e:
+            logger.error(f"Feed page cache unavailable: {e}")
+            return build()
+
+        if locked:
+            try:
+                page = build()
+                cache.set(key, page, timeout=self.timeout)
+                return page
+            finally:
+                cache.delete(lock_key)
+
+        # Another request is rebuilding this page, wait for it
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            page = cache.get(key)
+            if page is not None:
+                return page
+
+        return build()
+
+    def apply_viewer_overlay(self, page: dict, user) -> dict:
+        """Fill in the viewer-specific fields of a cached page."""
+        if not user or not user.is_authenticated or not page['results']:
+            return page
+
+        results = page['results']
+        context = ViewerContext(user)
+        context.load(
+            post_ids=[item['id'] for item in results],
+            author_ids=[item['author']['id'] for item in results]
+        )
+
+        return {
+            **page,
+            'results': [
+                {
+                    **item,
+                    'author': {**item['author'], 'is_following': context.is_following(item['author']['id'])},
+                    'userVote': context.get_vote(item['id']),
+                }
+                for item in results
+            ],
+        }
+
+
+# Singleton instance
+feed_page_cache = FeedPageCache()
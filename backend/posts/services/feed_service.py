@@ -1,42 +1,30 @@
-from django.db.models import F, ExpressionWrapper, FloatField, Q, Exists, OuterRef, Value, Count, BooleanField
-from django.db.models.functions import Cast, Extract
+from django.db.models import F, ExpressionWrapper, FloatField, Value
+from django.db.models.functions import Extract, Greatest
 from django.utils import timezone
 from ..models import Post
-from users.models import Follow
 
 
-def get_user_feed(user=None, category_slug=None):
-    now = timezone.now()
-    
-    # Start with ready posts
-    queryset = Post.objects.filter(status='ready').select_related('user', 'category')
+def get_feed_base_queryset():
+    # Start with ready posts, viewer-specific fields are resolved by ViewerContext
+    return Post.objects.filter(status='ready').select_related('user', 'category')
+
+
+def get_user_feed(category_slug=None, now=None):
+    # Cursor pagination passes a frozen `now` so scores are stable across pages
+    now = now or timezone.now()
     
-    # Annotate following status
-    if user and user.is_authenticated:
-        queryset = queryset.annotate(
-            is_following_author=Exists(
-                Follow.objects.filter(
-                    user_from=user,
-                    user_to=OuterRef('user_id')
-                )
-            )
-        )
-    else:
-        queryset = queryset.annotate(
-            is_following_author=Value(False, output_field=BooleanField())
-        )
+    queryset = get_feed_base_queryset()
     
     # Category filter - exclude 'other' and 'all'
     # Posts with NULL category or 'other' category only appear in 'all'
     if category_slug and category_slug not in ['all', 'other']:
         queryset = queryset.filter(category__slug=category_slug)
     # If category is 'other' or 'all', show all posts including NULL categories
-    
-    queryset = queryset.annotate(comment_count=Count('comments'))
 
     queryset = queryset.annotate(
+        # Clamped like calculate_feed_score, for posts newer than a snapshot's reference time
         age_penalty=ExpressionWrapper(
-            (Value(now.timestamp()) - Extract(F('created_at'), 'epoch')) / 3600.0,
+            Greatest(Value(now.timestamp()) - Extract(F('created_at'), 'epoch'), Value(0.0)) / 3600.0,
             output_field=FloatField()
         ),
         feed_score=ExpressionWrapper(
@@ -45,4 +33,11 @@ def get_user_feed(user=None, category_slug=None):
         )
     )
     
-    return queryset.order_by('-feed_score', '-created_at')
\ No newline at end of file
+    return queryset.order_by('-feed_score', '-created_at', '-id')
+
+
+def hydrate_posts(post_ids):
+    """Load posts for a list of IDs, keeping the given order and skipping missing ones."""
+    posts = {str(post.id): post for post in get_feed_base_queryset().filter(id__in=post_ids)}
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
+
@@ -0,0 +1,271 @@
+# posts/services/following_feed.py
+from django.conf import settings
+
+from typing import List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FollowingFeed:
+    """
+    Per-user "Following" feed inboxes kept in Redis.
+
+    Publishing a post pushes its ID into the inbox of every follower
+    (fan-out-on-write, in chunks over Celery tasks), scored by creation time
+    and capped to the newest inbox_size entries. Every author also keeps a
+    capped outbox of their own recent posts. Accounts with more than
+    fanout_limit followers are not fanned out: readers merge the outboxes of
+    the large accounts they follow at query time (fan-out-on-read).
+
+    An inbox is only read once it has been built from the database, by
+    rebuild() or by build_inbox(), which the first read of an unbuilt inbox
+    queues. Reads return None while Redis is unavailable or the inbox is not
+    built, and callers fall back to the database.
+    """
+
+    def __init__(self):
+        self.key_prefix = getattr(settings, 'FOLLOWING_FEED_KEY_PREFIX', 'following_feed')
+        self.inbox_size = getattr(settings, 'FOLLOWING_FEED_INBOX_SIZE', 500)
+        self.outbox_size = getattr(settings, 'FOLLOWING_FEED_OUTBOX_SIZE', 200)
+        self.fanout_limit = getattr(settings, 'FOLLOWING_FEED_FANOUT_LIMIT', 10000)
+        self.fanout_chunk_size = getattr(settings, 'FOLLOWING_FEED_FANOUT_CHUNK_SIZE', 1000)
+        self.large_key = f"{self.key_prefix}:large"
+        self.built_key = f"{self.key_prefix}:built"
+        # An inbox build queued on a read is retried after this many seconds if the inbox is still not built
+        self.build_retry = getattr(settings, 'FOLLOWING_FEED_BUILD_RETRY', 60 * 10)
+
+    def _get_redis(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+
+    def inbox_key(self, user_id) -> str:
+        return f"{self.key_prefix}:inbox:{user_id}"
+
+    def outbox_key(self, user_id) -> str:
+        return f"{self.key_prefix}:outbox:{user_id}"
+
+    def _score(self, post) -> float:
+        return post.created_at.timestamp()
+
+    def _queue_add(self, pipe, key: str, entries: dict, size: int):
+        pipe.zadd(key, entries)
+        pipe.zremrangebyrank(key, 0, -size - 1)
+
+    def publish(self, post) -> bool:
+        """
+        Record a new post in its author's outbox. Returns True when it
+        should be fanned out to the followers' inboxes (see fan_out).
+        """
+        is_large = post.user.follower_count > self.fanout_limit
+        try:
+            pipe = self._get_redis().pipeline()
+            self._queue_add(pipe, self.outbox_key(post.user_id), {str(post.id): self._score(post)}, self.outbox_size)
+            if is_large:
+                pipe.sadd(self.large_key, str(post.user_id))
+            else:
+                pipe.srem(self.large_key, str(post.user_id))
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error publishing post {post.id} to the following feed: {e}")
+        return not is_large
+
+    def fan_out(self, post, after_id: int = 0) -> Optional[int]:
+        """
+        Push a post into the inboxes of one chunk of its author's followers,
+        those with a Follow ID above after_id. Returns the ID to continue
+        from, or None once every follower has it.
+        """
+        from users.models import Follow
+
+        follows = list(
+            Follow.objects.filter(user_to_id=post.user_id, id__gt=after_id)
+            .order_by('id').values_list('id', 'user_from_id')[:self.fanout_chunk_size]
+        )
+        if not follows:
+            return None
+
+        entry = {str(post.id): self._score(post)}
+        pipe = self._get_redis().pipeline(transaction=False)
+        for _, follower_id in follows:
+            self._queue_add(pipe, self.inbox_key(follower_id), entry, self.inbox_size)
+        pipe.execute()
+
+        if len(follows) < self.fanout_chunk_size:
+            return None
+        return follows[-1][0]
+
+    def remove_post(self, post):
+        """Drop a deleted post from its author's outbox. Inboxes keep it until trimmed, reads skip it."""
+        try:
+            self._get_redis().zrem(self.outbox_key(post.user_id), str(post.id))
+        except Exception as e:
+            logger.error(f"Error removing post {post.id} from the following feed: {e}")
+
+    def add_author(self, user_id, author_id):
+        """Backfill a newly followed author's recent posts into the follower's inbox."""
+        try:
+            redis_conn = self._get_redis()
+            if redis_conn.sismember(self.large_key, str(author_id)):
+                return
+            inbox = self.inbox_key(user_id)
+            pipe = redis_conn.pipeline()
+            pipe.zunionstore(inbox, [inbox, self.outbox_key(author_id)], aggregate='MAX')
+            pipe.zremrangebyrank(inbox, 0, -self.inbox_size - 1)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error adding author {author_id} to the following feed of user {user_id}: {e}")
+
+    def remove_author(self, user_id, author_id):
+        """Remove an unfollowed author's recent posts from the follower's inbox."""
+        try:
+            redis_conn = self._get_redis()
+            post_ids = redis_conn.zrange(self.outbox_key(author_id), 0, -1)
+            if post_ids:
+                redis_conn.zrem(self.inbox_key(user_id), *post_ids)
+        except Exception as e:
+            logger.error(f"Error removing author {author_id} from the following feed of user {user_id}: {e}")
+
+    def get_page(self, context, before: Optional[float] = None, limit: int = 10) -> Optional[List[Tuple[str, float]]]:
+        """
+        Up to limit (post_id, score) entries older than `before`, newest first,
+        merged from the viewer's inbox and the outboxes of the large accounts
+        they follow. context is the viewer's ViewerContext.
+        """
+        try:
+            redis_conn = self._get_redis()
+            pipe = redis_conn.pipeline(transaction=False)
+            pipe.sismember(self.built_key, str(context.user.pk))
+            pipe.smembers(self.large_key)
+            built, large = pipe.execute()
+            if not built:
+                # A built inbox can be empty, e.g. when the user follows nobody
+                self._schedule_build(redis_conn, context.user.pk)
+                return None
+            large = [user_id.decode() for user_id in large]
+            context.load(author_ids=large)
+            keys = [self.inbox_key(context.user.pk)]
+            keys += [self.outbox_key(user_id) for user_id in large if context.is_following(user_id)]
+
+            upper = '+inf' if before is None else f"({before}"
+            pipe = redis_conn.pipeline(transaction=False)
+            for key in keys:
+                pipe.zrevrangebyscore(key, upper, '-inf', start=0, num=limit, withscores=True)
+            entries = {}
+            for rows in pipe.execute():
+                entries.update((post_id.decode(), score) for post_id, score in rows)
+        except Exception as e:
+            logger.error(f"Error reading following feed of user {context.user.pk}: {e}")
+            return None
+
+        return sorted(entries.items(), key=lambda entry: entry[1], reverse=True)[:limit]
+
+    def _schedule_build(self, redis_conn, user_id):
+        """Queue one build of a user's inbox, e.g. for users who have not read it since the feed existed."""
+        try:
+            if redis_conn.set(f"{self.key_prefix}:building:{user_id}", 1, nx=True, ex=self.build_retry):
+                from ..tasks import build_following_inbox
+                build_following_inbox.apply_async((str(user_id),), retry=False)
+        except Exception as e:
+            logger.error(f"Error scheduling the following feed inbox of user {user_id}: {e}")
+
+    def build_inbox(self, user_id) -> int:
+        """
+        Fill a user's inbox with the newest posts of the non-large accounts
+        they follow, read from the database, and mark it built. Entries fanned
+        out meanwhile are kept. Returns the number of posts loaded.
+        """
+        from users.models import Follow
+        from ..models import Post
+
+        redis_conn = self._get_redis()
+        large = [author_id.decode() for author_id in redis_conn.smembers(self.large_key)]
+        recent = Post.objects.filter(
+            user__in=Follow.objects.filter(user_from_id=user_id).values('user_to'), status='ready'
+        ).exclude(user_id__in=large).order_by('-created_at').values_list('id', 'created_at')[:self.inbox_size]
+        entries = {str(post_id): created_at.timestamp() for post_id, created_at in recent}
+
+        pipe = redis_conn.pipeline()
+        if entries:
+            self._queue_add(pipe, self.inbox_key(user_id), entries, self.inbox_size)
+        pipe.sadd(self.built_key, str(user_id))
+        pipe.execute()
+        return len(entries)
+
+    def rebuild(self, chunk_size: int = 1000) -> Tuple[int, int]:
+        """
+        Rebuild every outbox from the posts table, then every inbox as the
+        union of the outboxes of the non-large accounts each user follows.
+        Returns (outboxes, inboxes) written.
+        """
+        from django.db.models import F, Window
+        from django.db.models.functions import RowNumber
+        from users.models import Follow, User
+        from ..models import Post
+
+        redis_conn = self._get_redis()
+        large = {str(user_id) for user_id in User.objects.filter(
+            follower_count__gt=self.fanout_limit).values_list('id', flat=True)}
+        pipe = redis_conn.pipeline()
+        pipe.delete(self.large_key)
+        if large:
+            pipe.sadd(self.large_key, *large)
+        pipe.execute()
+
+        outboxes = 0
+        last_id = None
+        while True:
+            authors = User.objects.order_by('id')
+            if last_id is not None:
+                authors = authors.filter(id__gt=last_id)
+            author_ids = list(authors.values_list('id', flat=True)[:chunk_size])
+            if not author_ids:
+                break
+            recent = Post.objects.filter(user_id__in=author_ids, status='ready').annotate(
+                row_number=Window(RowNumber(), partition_by=[F('user_id')], order_by=F('created_at').desc())
+            ).filter(row_number__lte=self.outbox_size).values_list('user_id', 'id', 'created_at')
+
+            by_author = {}
+            for user_id, post_id, created_at in recent:
+                by_author.setdefault(user_id, {})[str(post_id)] = created_at.timestamp()
+            pipe = redis_conn.pipeline(transaction=False)
+            for user_id in author_ids:
+                pipe.delete(self.outbox_key(user_id))
+                if user_id in by_author:
+                    pipe.zadd(self.outbox_key(user_id), by_author[user_id])
+            pipe.execute()
+            outboxes += len(by_author)
+            last_id = author_ids[-1]
+
+        inboxes = 0
+        last_id = None
+        while True:
+            users = User.objects.order_by('id')
+            if last_id is not None:
+                users = users.filter(id__gt=last_id)
+            user_ids = list(users.values_list('id', flat=True)[:chunk_size])
+            if not user_ids:
+                break
+            following = {}
+            for user_from_id, user_to_id in Follow.objects.filter(user_from_id__in=user_ids).values_list(
+                    'user_from_id', 'user_to_id'):
+                if str(user_to_id) not in large:
+                    following.setdefault(user_from_id, []).append(self.outbox_key(user_to_id))
+            pipe = redis_conn.pipeline(transaction=False)
+            for user_id in user_ids:
+                inbox = self.inbox_key(user_id)
+                pipe.delete(inbox)
+                if user_id in following:
+                    pipe.zunionstore(inbox, following[user_id])
+                    pipe.zremrangebyrank(inbox, 0, -self.inbox_size - 1)
+            pipe.sadd(self.built_key, *[str(user_id) for user_id in user_ids])
+            pipe.execute()
+            inboxes += len(following)
+            last_id = user_ids[-1]
+
+        logger.info(f"Rebuilt following feed with {outboxes} outboxes and {inboxes} inboxes")
+        return outboxes, inboxes
+
+
+# Singleton instance
+following_feed = FollowingFeed()
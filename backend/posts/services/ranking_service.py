@@ -0,0 +1,242 @@
+# posts/services/ranking_service.py
+from django.conf import settings
+from django.utils import timezone
+
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable, List, Optional, Tuple
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def calculate_feed_score(total_score: int, created_at, now) -> float:
+    """
+    Hot-feed score: (votes + 1) / (age_in_hours + 2) ^ 1.5
+    Mirrors the SQL annotation in feed_service.get_user_feed.
+    """
+    age_hours = max((now - created_at).total_seconds(), 0) / 3600.0
+    return (total_score + 1.0) / ((age_hours + 2.0) ** 1.5)
+
+
+class FeedRankingIndex:
+    """
+    Maintains precomputed feed rankings in Redis sorted sets.
+
+    One sorted set holds every ready post ('all'), plus one per category.
+    All scores are computed against a shared reference time (the time of the
+    last full rebuild), so incremental updates stay comparable with the rest
+    of the index until the next periodic rebuild refreshes every score.
+    """
+
+    def __init__(self):
+        self.key_prefix = getattr(settings, 'FEED_RANKING_KEY_PREFIX', 'feed_rank')
+        self.max_size = getattr(settings, 'FEED_RANKING_MAX_SIZE', 10000)
+        self.snapshot_size = getattr(settings, 'FEED_SNAPSHOT_SIZE', 1000)
+        self.snapshot_ttl = getattr(settings, 'FEED_SNAPSHOT_TTL', 60 * 30)  # 30 minutes
+        self.snapshot_share_window = getattr(settings, 'FEED_SNAPSHOT_SHARE_WINDOW', 60)
+
+    def _get_redis(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+
+    def _get_key(self, category_slug: Optional[str] = None) -> str:
+        """Generate Redis key for a category ranking (or the global one)."""
+        if category_slug and category_slug not in ['all', 'other']:
+            return f"{self.key_prefix}:cat:{category_slug}"
+        return f"{self.key_prefix}:all"
+
+    def _get_ref_key(self) -> str:
+        return f"{self.key_prefix}:ref"
+
+    def _get_snapshot_key(self, snapshot_id: str) -> str:
+        return f"{self.key_prefix}:snapshot:{snapshot_id}"
+
+    def _get_snapshot_ref_key(self, snapshot_id: str) -> str:
+        return f"{self.key_prefix}:snapshot:{snapshot_id}:ref"
+
+    def _get_current_snapshot_key(self, category_slug: Optional[str] = None) -> str:
+        return self._get_key(category_slug).replace(self.key_prefix, f"{self.key_prefix}:snapshot_current", 1)
+
+    def _get_reference_time(self, redis_conn) -> Optional[datetime]:
+        ref = redis_conn.get(self._get_ref_key())
+        if ref is None:
+            return None
+        return datetime.fromtimestamp(float(ref), tz=dt_timezone.utc)
+
+    def add_post(self, post) -> bool:
+        """
+        Insert or re-score a post in the global and category rankings.
+        Posts that are not ready are removed instead.
+        """
+        category_slug = post.category.slug if post.category_id else None
+
+        if post.status != 'ready':
+            return self.remove_post(post.id, category_slug)
+
+        try:
+            redis_conn = self._get_redis()
+            ref_time = self._get_reference_time(redis_conn)
+            if ref_time is None:
+                # Index not built yet, the next rebuild will pick this post up
+                return False
+
+            score = calculate_feed_score(post.total_score, post.created_at, ref_time)
+            pipe = redis_conn.pipeline()
+            pipe.zadd(self._get_key(), {str(post.id): score})
+            if category_slug:
+                pipe.zadd(self._get_key(category_slug), {str(post.id): score})
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating feed ranking for post {post.id}: {e}")
+            return False
+
+    def remove_post(self, post_id, category_slug: Optional[str] = None) -> bool:
+        """Remove a post from the global and category rankings."""
+        try:
+            pipe = self._get_redis().pipeline()
+            pipe.zrem(self._get_key(), str(post_id))
+            if category_slug:
+                pipe.zrem(self._get_key(category_slug), str(post_id))
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error removing post {post_id} from feed ranking: {e}")
+            return False
+
+    def create_snapshot(self, category_slug: Optional[str] = None) -> Optional[str]:
+        """
+        Freeze the current ranking for browsing sessions.
+        Sessions starting within the same share window reuse one snapshot,
+        so their pages (and page cache entries) are identical. The snapshot
+        keeps the scores and the reference time they were computed at.
+        Returns a snapshot ID, or None if the index is unavailable.
+        """
+        try:
+            redis_conn = self._get_redis()
+            if not redis_conn.exists(self._get_ref_key()):
+                return None
+
+            current_key = self._get_current_snapshot_key(category_slug)
+            current_id = redis_conn.get(current_key)
+            if current_id and self._touch_snapshot(redis_conn, current_id.decode()):
+                return current_id.decode()
+
+            snapshot_id = uuid.uuid4().hex
+            snapshot_key = self._get_snapshot_key(snapshot_id)
+            snapshot_ref_key = self._get_snapshot_ref_key(snapshot_id)
+            # One transaction, so a rebuild cannot swap the scores between the copies
+            pipe = redis_conn.pipeline()
+            pipe.zrangestore(snapshot_key, self._get_key(category_slug), 0, self.snapshot_size - 1, desc=True)
+            pipe.copy(self._get_ref_key(), snapshot_ref_key)
+            pipe.expire(snapshot_key, self.snapshot_ttl)
+            pipe.expire(snapshot_ref_key, self.snapshot_ttl)
+            pipe.set(current_key, snapshot_id, ex=self.snapshot_share_window)
+            pipe.execute()
+            return snapshot_id
+        except Exception as e:
+            logger.error(f"Error creating feed snapshot: {e}")
+            return None
+
+    def _touch_snapshot(self, redis_conn, snapshot_id: str) -> bool:
+        """Extend a snapshot's TTL. Returns False if it has expired."""
+        pipe = redis_conn.pipeline()
+        pipe.expire(self._get_snapshot_key(snapshot_id), self.snapshot_ttl)
+        pipe.expire(self._get_snapshot_ref_key(snapshot_id), self.snapshot_ttl)
+        exists, _ = pipe.execute()
+        return bool(exists)
+
+    def get_snapshot_ids(self, snapshot_id: str, offset: int = 0, limit: int = 10) -> Optional[List[str]]:
+        """
+        Get one page of post IDs from a frozen snapshot, extending its TTL.
+        Returns None if the snapshot has expired.
+        """
+        try:
+            redis_conn = self._get_redis()
+            if not self._touch_snapshot(redis_conn, snapshot_id):
+                return None
+            ids = redis_conn.zrevrange(self._get_snapshot_key(snapshot_id), offset, offset + limit - 1)
+            return [post_id.decode() for post_id in ids]
+        except Exception as e:
+            logger.error(f"Error reading feed snapshot {snapshot_id}: {e}")
+            return None
+
+    def get_snapshot_score(self, snapshot_id: str, post_id: str) -> Optional[Tuple[datetime, float]]:
+        """
+        A post's frozen score in a snapshot and the reference time it was
+        computed at, which the SQL feed can score every other post against.
+        Returns None if the snapshot has expired or does not hold the post.
+        """
+        try:
+            pipe = self._get_redis().pipeline()
+            pipe.get(self._get_snapshot_ref_key(snapshot_id))
+            pipe.zscore(self._get_snapshot_key(snapshot_id), post_id)
+            ref, score = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error reading feed snapshot {snapshot_id}: {e}")
+            return None
+        if ref is None or score is None:
+            return None
+        return datetime.fromtimestamp(float(ref), tz=dt_timezone.utc), score
+
+    def rebuild(self, rows: Optional[Iterable] = None, chunk_size: int = 2000) -> int:
+        """
+        Recompute every score and atomically swap in fresh sorted sets.
+        `rows` yields (post_id, total_score, created_at, category_slug) tuples;
+        defaults to every ready post.
+        """
+        if rows is None:
+            from ..models import Post
+            rows = Post.objects.filter(status='ready').values_list(
+                'id', 'total_score', 'created_at', 'category__slug'
+            ).iterator(chunk_size=chunk_size)
+
+        now = timezone.now()
+        redis_conn = self._get_redis()
+        tmp_suffix = f":rebuild:{int(now.timestamp())}"
+        keys = set()
+        count = 0
+
+        pipe = redis_conn.pipeline()
+        for post_id, total_score, created_at, category_slug in rows:
+            score = calculate_feed_score(total_score, created_at, now)
+            member = {str(post_id): score}
+
+            global_key = self._get_key() + tmp_suffix
+            pipe.zadd(global_key, member)
+            keys.add(global_key)
+            if category_slug:
+                category_key = self._get_key(category_slug) + tmp_suffix
+                pipe.zadd(category_key, member)
+                keys.add(category_key)
+
+            count += 1
+            if count % chunk_size == 0:
+                pipe.execute()
+        pipe.execute()
+
+        # Swap the rebuilt sets in and drop categories that no longer have posts
+        stale_keys = {
+            key.decode() for key in redis_conn.scan_iter(match=f"{self.key_prefix}:cat:*")
+            if b":rebuild:" not in key
+        }
+        pipe = redis_conn.pipeline()
+        for tmp_key in keys:
+            key = tmp_key[:-len(tmp_suffix)]
+            pipe.zremrangebyrank(tmp_key, 0, -(self.max_size + 1))
+            pipe.rename(tmp_key, key)
+            stale_keys.discard(key)
+        if not count:
+            pipe.delete(self._get_key())
+        for key in stale_keys:
+            pipe.delete(key)
+        pipe.set(self._get_ref_key(), now.timestamp())
+        pipe.execute()
+
+        logger.info(f"Rebuilt feed ranking index with {count} posts")
+        return count
+
+
+# Singleton instance
+feed_ranking_index = FeedRankingIndex()
@@ -1,12 +1,33 @@
 # posts/services/redis_service.py
-from django.core.cache import cache
 from django.conf import settings
 
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+import hashlib
 import logging
+import math
+import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# Sets the cooldown key if it is missing, otherwise reports its TTL.
+# Returns {1, 0} when the view was tracked, {0, remaining_seconds} otherwise.
+TRACK_VIEW_SCRIPT = """
+if redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[1]) then
+    return {1, 0}
+end
+return {0, redis.call('TTL', KEYS[1])}
+"""
+
+# Releases the flush lock only if this flush still holds it.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
 class RedisViewTracker:
     """
     Service class for tracking post views using Redis.
@@ -17,6 +38,10 @@ class RedisViewTracker:
         self.cooldown = getattr(settings, 'VIEW_TRACKING_COOLDOWN', 60 * 60 * 3)  # 3 hours
         self.key_prefix = getattr(settings, 'VIEW_REDIS_KEY_PREFIX', 'post_view')
     
+    def _get_redis(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    
     def _get_key(self, post_id: str, user_identifier: str) -> str:
         """Generate Redis key for a post view."""
         return f"{self.key_prefix}:{post_id}:{user_identifier}"
@@ -27,7 +52,7 @@ class RedisViewTracker:
         Returns True if the cooldown period has passed or no record exists.
         """
         key = self._get_key(post_id, user_identifier)
-        exists = cache.get(key)
+        exists = self._get_redis().exists(key)
         
         if exists:
             logger.info(f"View cooldown active for post {post_id}, user {user_identifier}")
@@ -35,18 +60,57 @@ class RedisViewTracker:
         
         return True
     
+    def check_and_track(self, post_id: str, user_identifier: str) -> Tuple[bool, Optional[int]]:
+        """
+        Check the cooldown, start it and read its TTL in one atomic server-side call.
+        Returns (True, None) if the view was tracked,
+        or (False, remaining_seconds) if the cooldown is active.
+        While Redis is unavailable views are not tracked: (False, None).
+        """
+        try:
+            redis_conn = self._get_redis()
+            script = redis_conn.register_script(TRACK_VIEW_SCRIPT)
+            tracked, ttl = script(keys=[self._get_key(post_id, user_identifier)], args=[self.cooldown])
+        except Exception as e:
+            logger.error(f"Error tracking view for post {post_id}: {e}")
+            return False, None
+        
+        if tracked:
+            logger.info(f"Tracked view for post {post_id}, user {user_identifier}")
+            return True, None
+        
+        logger.info(f"View cooldown active for post {post_id}, user {user_identifier}")
+        return False, ttl if ttl > 0 else None
+    
+    def check_and_track_many(self, post_ids: List[str], user_identifier: str) -> List[Tuple[bool, Optional[int]]]:
+        """
+        Batch version of check_and_track for one viewer, sent as a single pipeline.
+        Results are in the same order as post_ids; a repeated ID hits the cooldown.
+        """
+        try:
+            redis_conn = self._get_redis()
+            script = redis_conn.register_script(TRACK_VIEW_SCRIPT)
+            pipe = redis_conn.pipeline(transaction=False)
+            for post_id in post_ids:
+                script(keys=[self._get_key(post_id, user_identifier)], args=[self.cooldown], client=pipe)
+            rows = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error tracking {len(post_ids)} views: {e}")
+            return [(False, None)] * len(post_ids)
+        
+        results = []
+        for tracked, ttl in rows:
+            results.append((True, None) if tracked else (False, ttl if ttl > 0 else None))
+        logger.info(f"Tracked {sum(tracked for tracked, _ in results)}/{len(post_ids)} views for user {user_identifier}")
+        return results
+    
     def track_view(self, post_id: str, user_identifier: str) -> bool:
         """
         Track a view by setting a Redis key with TTL.
         Returns True if tracked, False if cooldown is active.
         """
-        if not self.can_track_view(post_id, user_identifier):
-            return False
-        
-        key = self._get_key(post_id, user_identifier)
-        cache.set(key, 1, timeout=self.cooldown)
-        logger.info(f"Tracked view for post {post_id}, user {user_identifier}")
-        return True
+        tracked, _ = self.check_and_track(post_id, user_identifier)
+        return tracked
     
     def get_remaining_cooldown(self, post_id: str, user_identifier: str) -> Optional[int]:
         """
@@ -57,9 +121,7 @@ class RedisViewTracker:
         
         # Get TTL from Redis directly
         try:
-            from django_redis import get_redis_connection
-            redis_conn = get_redis_connection("default")
-            ttl = redis_conn.ttl(key)
+            ttl = self._get_redis().ttl(key)
             
             if ttl > 0:
                 return ttl
@@ -71,10 +133,337 @@ class RedisViewTracker:
     def clear_view(self, post_id: str, user_identifier: str) -> bool:
         """Clear a view record (useful for testing or admin purposes)."""
         key = self._get_key(post_id, user_identifier)
-        cache.delete(key)
+        self._get_redis().delete(key)
         logger.info(f"Cleared view record for post {post_id}, user {user_identifier}")
         return True
 
 
-# Singleton instance
-redis_view_tracker = RedisViewTracker()
\ No newline at end of file
+# Cooldown check against time-bucketed scalable Bloom filters, newest bucket first.
+# Each bucket is one bitmap: a u32 viewer count at bit 0, then the filter layers.
+# A bucket fills its layers in order and only the layers it has started are checked.
+# KEYS[1]: HyperLogLog of unique viewers, KEYS[2..]: Bloom filter buckets (KEYS[2] is current)
+# ARGV[1]: viewer, ARGV[2]: bucket TTL, ARGV[3]: 1 to track the view, 0 to only check it,
+# ARGV[4], ARGV[5]: the viewer's two hashes, ARGV[6..]: (start, bits, hashes, capacity) of each layer,
+# capacity counting the viewers of every layer up to and including it.
+# Returns {1, 0} when the view was (or would be) tracked, {0, bucket_age} when the viewer is in a live bucket.
+TRACK_VIEW_BLOOM_SCRIPT = """
+local h1, h2 = tonumber(ARGV[4]), tonumber(ARGV[5])
+local layers = {}
+for i = 6, #ARGV, 4 do
+    table.insert(layers, {tonumber(ARGV[i]), tonumber(ARGV[i + 1]), tonumber(ARGV[i + 2]), tonumber(ARGV[i + 3])})
+end
+local function in_layer(key, layer)
+    for j = 0, layer[3] - 1 do
+        if redis.call('GETBIT', KEYS[key], layer[1] + (h1 + j * h2) % layer[2]) == 0 then
+            return false
+        end
+    end
+    return true
+end
+local count = 0
+for i = 2, #KEYS do
+    local viewers = redis.call('BITFIELD', KEYS[i], 'GET', 'u32', 0)[1]
+    if i == 2 then
+        count = viewers
+    end
+    for l, layer in ipairs(layers) do
+        if l > 1 and viewers <= layers[l - 1][4] then
+            break
+        end
+        if in_layer(i, layer) then
+            return {0, i - 2}
+        end
+    end
+end
+if ARGV[3] == '0' then
+    return {1, 0}
+end
+local current = layers[#layers]
+for _, layer in ipairs(layers) do
+    if count < layer[4] then
+        current = layer
+        break
+    end
+end
+for j = 0, current[3] - 1 do
+    redis.call('SETBIT', KEYS[2], current[1] + (h1 + j * h2) % current[2], 1)
+end
+redis.call('BITFIELD', KEYS[2], 'INCRBY', 'u32', 0, 1)
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('PFADD', KEYS[1], ARGV[1])
+return {1, 0}
+"""
+
+
+class RedisHLLViewTracker(RedisViewTracker):
+    """
+    Memory-bounded view tracker (VIEW_TRACKING_MODE = 'hll').
+    
+    Instead of one key per (post, viewer), each post has:
+    - a HyperLogLog estimating its unique viewers (12KB at most, sparse
+      encoding keeps it much smaller for posts with few viewers)
+    - one scalable Bloom filter per time bucket for cooldowns; a viewer is in
+      cooldown while they are in any bucket of the last cooldown period
+    
+    A bucket's filter starts with a layer sized for VIEW_BLOOM_INITIAL_VIEWERS
+    and adds layers VIEW_BLOOM_GROWTH times larger, each with half the false
+    positive rate of the previous one, as viewers come in. Long-tail posts
+    only pay for the small first layer while viral posts keep the rate of
+    false cooldowns under VIEW_BLOOM_FALSE_POSITIVE_RATE.
+    
+    In exchange for bounded memory the cooldown is rounded up to whole
+    buckets, a viewer can be wrongly refused (Bloom false positive), and
+    single views cannot be cleared.
+    """
+    
+    # Bits before the first layer, holding the bucket's viewer count
+    COUNTER_BITS = 32
+    
+    def __init__(self):
+        super().__init__()
+        self.bucket_seconds = getattr(settings, 'VIEW_BLOOM_BUCKET_SECONDS', 60 * 30)
+        self.initial_viewers = getattr(settings, 'VIEW_BLOOM_INITIAL_VIEWERS', 256)
+        self.false_positive_rate = getattr(settings, 'VIEW_BLOOM_FALSE_POSITIVE_RATE', 0.001)
+        self.growth = getattr(settings, 'VIEW_BLOOM_GROWTH', 4)
+        self.max_layers = getattr(settings, 'VIEW_BLOOM_MAX_LAYERS', 8)
+        self.window_buckets = math.ceil(self.cooldown / self.bucket_seconds)
+        self.layers = self._get_layers()
+    
+    def _get_layers(self) -> List[Tuple[int, int, int, int]]:
+        """(start bit, bits, hashes, cumulative capacity) of every filter layer."""
+        layers = []
+        start, capacity = self.COUNTER_BITS, 0
+        # A check goes through every bucket of the window, and the layer rates halve
+        # per layer, so a new viewer is wrongly refused at most false_positive_rate of the time
+        bucket_rate = self.false_positive_rate / (self.window_buckets + 1)
+        for i in range(self.max_layers):
+            viewers = self.initial_viewers * self.growth ** i
+            rate = bucket_rate / 2 ** (i + 1)
+            bits = math.ceil(-viewers * math.log(rate) / math.log(2) ** 2)
+            hashes = max(math.ceil(-math.log2(rate)), 1)
+            capacity += viewers
+            layers.append((start, bits, hashes, capacity))
+            start += bits
+        return layers
+    
+    def _get_viewers_key(self, post_id: str) -> str:
+        return f"{self.key_prefix}:hll:{post_id}"
+    
+    def _get_bucket_keys(self, post_id: str, current_bucket: int) -> List[str]:
+        """Bloom filter keys for every live bucket, current first."""
+        return [
+            f"{self.key_prefix}:bloom:{post_id}:{bucket}"
+            for bucket in range(current_bucket, current_bucket - self.window_buckets - 1, -1)
+        ]
+    
+    def _get_hashes(self, user_identifier: str) -> Tuple[int, int]:
+        """The viewer's two 32-bit hashes, combined into the layers' bit offsets (double hashing)."""
+        digest = hashlib.blake2b(user_identifier.encode(), digest_size=8).digest()
+        return int.from_bytes(digest[:4], 'big'), int.from_bytes(digest[4:], 'big') | 1
+    
+    def _queue_check(self, script, client, post_id: str, user_identifier: str, current_bucket: int, track: bool = True):
+        args = [user_identifier, (self.window_buckets + 2) * self.bucket_seconds, int(track)]
+        args += self._get_hashes(user_identifier)
+        for layer in self.layers:
+            args += layer
+        return script(
+            keys=[self._get_viewers_key(post_id)] + self._get_bucket_keys(post_id, current_bucket),
+            args=args,
+            client=client
+        )
+    
+    def _remaining(self, now: float, current_bucket: int, bucket_age: int) -> int:
+        # A view in bucket b blocks until bucket b leaves the window
+        expires_at = (current_bucket - bucket_age + self.window_buckets + 1) * self.bucket_seconds
+        return max(int(expires_at - now), 1)
+    
+    def can_track_view(self, post_id: str, user_identifier: str) -> bool:
+        return self.get_remaining_cooldown(post_id, user_identifier) is None
+    
+    def check_and_track(self, post_id: str, user_identifier: str) -> Tuple[bool, Optional[int]]:
+        return self.check_and_track_many([post_id], user_identifier)[0]
+    
+    def check_and_track_many(self, post_ids: List[str], user_identifier: str) -> List[Tuple[bool, Optional[int]]]:
+        now = time.time()
+        current_bucket = int(now // self.bucket_seconds)
+        
+        try:
+            redis_conn = self._get_redis()
+            script = redis_conn.register_script(TRACK_VIEW_BLOOM_SCRIPT)
+            pipe = redis_conn.pipeline(transaction=False)
+            for post_id in post_ids:
+                self._queue_check(script, pipe, post_id, user_identifier, current_bucket)
+            rows = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error tracking {len(post_ids)} views: {e}")
+            return [(False, None)] * len(post_ids)
+        
+        results = []
+        for tracked, bucket_age in rows:
+            results.append((True, None) if tracked else (False, self._remaining(now, current_bucket, bucket_age)))
+        logger.info(f"Tracked {sum(tracked for tracked, _ in results)}/{len(post_ids)} views for user {user_identifier}")
+        return results
+    
+    def get_remaining_cooldown(self, post_id: str, user_identifier: str) -> Optional[int]:
+        now = time.time()
+        current_bucket = int(now // self.bucket_seconds)
+        
+        try:
+            redis_conn = self._get_redis()
+            script = redis_conn.register_script(TRACK_VIEW_BLOOM_SCRIPT)
+            tracked, bucket_age = self._queue_check(
+                script, redis_conn, post_id, user_identifier, current_bucket, track=False
+            )
+        except Exception as e:
+            logger.error(f"Error reading view cooldown: {e}")
+            return None
+        
+        if tracked:
+            return None
+        return self._remaining(now, current_bucket, bucket_age)
+    
+    def get_unique_viewers(self, post_id: str) -> int:
+        """Estimated number of distinct viewers of a post (about 0.81% standard error)."""
+        return self._get_redis().pfcount(self._get_viewers_key(post_id))
+    
+    def clear_view(self, post_id: str, user_identifier: str) -> bool:
+        """Bloom filters cannot forget a single viewer."""
+        logger.info(f"Cannot clear a single view record in hll mode (post {post_id}, user {user_identifier})")
+        return False
+
+
+class RedisViewCounter:
+    """
+    Write-behind buffer for post view counts.
+    Views are counted with HINCRBY in a Redis hash (one field per post) and
+    flushed periodically into Post.view_count with bulk UPDATEs.
+    """
+    
+    def __init__(self):
+        self.key = getattr(settings, 'VIEW_COUNT_BUFFER_KEY', 'post_view_buffer')
+        self.flushing_key = f"{self.key}:flushing"
+        self.batch_size = getattr(settings, 'VIEW_COUNT_FLUSH_BATCH_SIZE', 500)
+        self.lock_key = f"{self.key}:lock"
+        self.lock_timeout = getattr(settings, 'VIEW_COUNT_FLUSH_LOCK_TIMEOUT', 60)
+    
+    def _get_redis(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    
+    def increment(self, post_id: str) -> int:
+        """
+        Buffer one view. Returns the number of views pending for this post.
+        While Redis is unavailable the view is written to the database
+        directly and counts as the one pending view.
+        """
+        try:
+            pipe = self._get_redis().pipeline()
+            pipe.hincrby(self.key, post_id, 1)
+            pipe.hget(self.flushing_key, post_id)
+            pending, flushing = pipe.execute()
+            return pending + int(flushing or 0)
+        except Exception as e:
+            logger.error(f"Error buffering a view for post {post_id}, writing it directly: {e}")
+            self._apply([(post_id, 1)])
+            return 1
+    
+    def increment_many(self, post_ids: List[str]) -> Dict[str, int]:
+        """Buffer one view for each post in a single pipeline. Returns pending views per post."""
+        try:
+            pipe = self._get_redis().pipeline(transaction=False)
+            for post_id in post_ids:
+                pipe.hincrby(self.key, post_id, 1)
+                pipe.hget(self.flushing_key, post_id)
+            results = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error buffering views for {len(post_ids)} posts, writing them directly: {e}")
+            self._apply([(post_id, 1) for post_id in post_ids])
+            return {post_id: 1 for post_id in post_ids}
+        
+        pending = {}
+        for i, post_id in enumerate(post_ids):
+            pending[post_id] = results[2 * i] + int(results[2 * i + 1] or 0)
+        return pending
+    
+    def get_pending(self, post_id: str) -> int:
+        """Views buffered for a post that are not in the database yet."""
+        try:
+            pipe = self._get_redis().pipeline()
+            pipe.hget(self.key, post_id)
+            pipe.hget(self.flushing_key, post_id)
+            return sum(int(value) for value in pipe.execute() if value)
+        except Exception as e:
+            logger.error(f"Error reading buffered views for post {post_id}: {e}")
+            return 0
+    
+    def flush(self) -> int:
+        """
+        Apply buffered deltas to Post.view_count.
+        The buffer is renamed before reading so new views keep accumulating
+        in a fresh hash; a leftover flushing hash from a failed run is applied first.
+        Only one flush runs at a time, overlapping runs return right away, and
+        each batch is read and removed from the flushing hash atomically before
+        it is written, so a retry never applies the same deltas twice.
+        Returns the number of posts updated.
+        """
+        redis_conn = self._get_redis()
+        token = uuid.uuid4().hex
+        if not redis_conn.set(self.lock_key, token, nx=True, ex=self.lock_timeout):
+            logger.info("Another view count flush is running, skipping")
+            return 0
+        try:
+            return self._flush(redis_conn)
+        finally:
+            # A flush that outlived its lock must not release the next one's
+            redis_conn.eval(RELEASE_LOCK_SCRIPT, 1, self.lock_key, token)
+    
+    def _apply(self, batch: List[Tuple[str, int]]) -> int:
+        """Add (post_id, delta) pairs to Post.view_count in one UPDATE. Returns the number of posts updated."""
+        from django.db.models import Case, F, IntegerField, Value, When
+        from ..models import Post
+        
+        return Post.objects.filter(pk__in=[post_id for post_id, _ in batch]).update(
+            view_count=F('view_count') + Case(
+                *[When(pk=post_id, then=Value(delta)) for post_id, delta in batch],
+                default=Value(0),
+                output_field=IntegerField()
+            )
+        )
+    
+    def _flush(self, redis_conn) -> int:
+        if not redis_conn.exists(self.flushing_key):
+            try:
+                redis_conn.rename(self.key, self.flushing_key)
+            except Exception:
+                # Nothing buffered since the last flush
+                return 0
+        
+        post_ids = [post_id.decode() for post_id in redis_conn.hkeys(self.flushing_key)]
+        
+        updated = 0
+        for start in range(0, len(post_ids), self.batch_size):
+            # Claim the batch first: a worker dying after this loses these views rather than counting them twice
+            batch_ids = post_ids[start:start + self.batch_size]
+            pipe = redis_conn.pipeline()
+            pipe.hmget(self.flushing_key, batch_ids)
+            pipe.hdel(self.flushing_key, *batch_ids)
+            values, _ = pipe.execute()
+            batch = [(post_id, int(delta)) for post_id, delta in zip(batch_ids, values) if delta is not None]
+            if not batch:
+                continue
+            
+            updated += self._apply(batch)
+        
+        logger.info(f"Flushed buffered views for {updated} posts")
+        return updated
+
+def get_view_tracker() -> RedisViewTracker:
+    """Tracker selected by VIEW_TRACKING_MODE: 'keys' (one key per view, default) or 'hll'."""
+    if getattr(settings, 'VIEW_TRACKING_MODE', 'keys') == 'hll':
+        return RedisHLLViewTracker()
+    return RedisViewTracker()
+
+
+# Singleton instances
+redis_view_tracker = get_view_tracker()
+redis_view_counter = RedisViewCounter()
@@ -0,0 +1,89 @@
+# posts/services/viewer_context.py
+from typing import Iterable, Optional
+
+
+class ViewerContext:
+    """
+    Request-scoped loader for the viewer's votes and follow edges.
+
+    Collects the post and author IDs of a whole page up front and resolves
+    them with one bulk lookup each, instead of one query per serialized post.
+    IDs that were not preloaded are fetched on first access.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._votes = {}
+        self._following = set()
+        self._loaded_posts = set()
+        self._loaded_authors = set()
+
+    @classmethod
+    def for_request(cls, request) -> 'ViewerContext':
+        """Get the loader for this request, creating it on first use."""
+        context = getattr(request, '_viewer_context', None)
+        if context is None:
+            context = cls(request.user)
+            request._viewer_context = context
+        return context
+
+    @property
+    def is_authenticated(self) -> bool:
+        return bool(self.user and self.user.is_authenticated)
+
+    def load(self, post_ids: Iterable = (), author_ids: Iterable = ()):
+        """Resolve votes and follow edges for every ID not loaded yet."""
+        if not self.is_authenticated:
+            return
+
+        post_ids = {str(post_id) for post_id in post_ids} - self._loaded_posts
+        author_ids = {str(author_id) for author_id in author_ids} - self._loaded_authors
+
+        if post_ids:
+            from votes.models import Vote
+            self._votes.update(
+                (str(post_id), value) for post_id, value in
+                Vote.objects.filter(user=self.user, post_id__in=post_ids).values_list('post_id', 'value')
+            )
+            self._loaded_posts |= post_ids
+
+            # Votes still queued for asynchronous ingestion win over stored ones
+            from votes.services.vote_stream import vote_stream
+            if vote_stream.enabled:
+                for post_id, value in vote_stream.get_pending(self.user.pk, post_ids).items():
+                    if value is None:
+                        self._votes.pop(post_id, None)
+                    else:
+                        self._votes[post_id] = value
+
+        if author_ids:
+            # One SMISMEMBER against the Redis follow graph, the Follow table if it is unavailable
+            from users.services.follow_graph import follow_graph
+            following = follow_graph.is_following_many(self.user.pk, author_ids)
+            if following is None:
+                from users.models import Follow
+                following = {
+                    str(user_id) for user_id in
+                    Follow.objects.filter(user_from=self.user, user_to__in=author_ids).values_list('user_to_id', flat=True)
+                }
+            self._following.update(following)
+            self._loaded_authors |= author_ids
+
+    def load_posts(self, posts: Iterable):
+        posts = list(posts)
+        self.load(
+            post_ids=[post.id for post in posts],
+            author_ids=[post.user_id for post in posts]
+        )
+
+    def get_vote(self, post_id) -> Optional[int]:
+        if not self.is_authenticated:
+            return None
+        self.load(post_ids=[post_id])
+        return self._votes.get(str(post_id))
+
+    def is_following(self, author_id) -> bool:
+        if not self.is_authenticated:
+            return False
+        self.load(author_ids=[author_id])
+        return str(author_id) in self._following
@@ -1,5 +1,9 @@
 from celery import shared_task
 from .models import Post
+from .services.ranking_service import feed_ranking_index
+from .services.feed_cache import feed_page_cache
+from .services.following_feed import following_feed
+from .services.redis__service import redis_view_counter
 import time
 
 @shared_task
@@ -24,6 +28,8 @@ def process_video(post_id):
         
         post.status = 'ready'
         post.save()
+        feed_ranking_index.add_post(post)
+        feed_page_cache.invalidate_post(post)
         
         return f"Processed video for post {post_id}"
     except Post.DoesNotExist:
@@ -31,4 +37,53 @@ def process_video(post_id):
     except Exception as e:
         post.status = 'failed'
         post.save()
-        return f"Failed to process post {post_id}: {str(e)}"
\ No newline at end of file
+        return f"Failed to process post {post_id}: {str(e)}"
+
+
+@shared_task
+def rebuild_feed_ranking():
+    """
+    Scheduled task (Celery Beat) that recomputes every feed score
+    and swaps in fresh ranking sorted sets.
+    """
+    count = feed_ranking_index.rebuild()
+    return f"Ranked {count} posts"
+
+
+
+@shared_task
+def flush_view_counts():
+    """
+    Scheduled task (Celery Beat) that writes buffered views
+    into Post.view_count.
+    """
+    updated = redis_view_counter.flush()
+    return f"Flushed views for {updated} posts"
+
+
+
+@shared_task
+def fan_out_post(post_id, after_id=0):
+    """
+    Push a new post into its author's followers' Following inboxes,
+    one chunk per task run, re-enqueueing itself for the next chunk.
+    """
+    post = Post.objects.filter(id=post_id, status='ready').only('id', 'user_id', 'created_at').first()
+    if post is None:
+        return f"Post {post_id} not found"
+
+    next_id = following_feed.fan_out(post, after_id)
+    if next_id is not None:
+        fan_out_post.delay(post_id, next_id)
+        return f"Fanned out post {post_id} up to follow {next_id}"
+    return f"Fanned out post {post_id}"
+
+
+@shared_task
+def build_following_inbox(user_id):
+    """
+    Build one user's Following inbox from the database, queued by
+    the first read of an inbox that was never built.
+    """
+    count = following_feed.build_inbox(user_id)
+    return f"Built following inbox of user {user_id} with {count} posts"
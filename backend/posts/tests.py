@@ -1,3 +1,377 @@
-from django.test import TestCase
+import base64
+import json
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+from fakeredis import FakeConnection
+from rest_framework.test import APIClient, APIRequestFactory
+
+from users.models import User, Follow
+from votes.models import Vote
+from .models import Category, Post
+from .pagination import RankedFeedPagination
+from .serializers import PostSerializer
+from .services.feed_cache import feed_page_cache
+from .services.feed_service import get_user_feed
+from .services.following_feed import following_feed
+from .services.ranking_service import feed_ranking_index
+from .services.redis__service import redis_view_counter, redis_view_tracker
+from .tasks import build_following_inbox, fan_out_post
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+FAKE_REDIS_CACHES = {'default': {
+    'BACKEND': 'django_redis.cache.RedisCache',
+    'LOCATION': 'redis://fakeredis:6379/0',
+    'OPTIONS': {'CONNECTION_POOL_KWARGS': {'connection_class': FakeConnection}},
+}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PostSerializerQueryCountTests(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create(username='viewer')
+        self.authors = [User.objects.create(username=f'author{i}') for i in range(5)]
+        Follow.objects.create(user_from=self.viewer, user_to=self.authors[0])
+
+    def create_posts(self, count):
+        posts = [
+            Post.objects.create(user=self.authors[i % len(self.authors)], caption=f'post {i}', status='ready')
+            for i in range(count)
+        ]
+        Vote.objects.create(user=self.viewer, post=posts[0], value=2)
+        return posts
+
+    def serialize_page(self, count):
+        self.create_posts(count)
+        request = APIRequestFactory().get('/api/posts/')
+        request.user = self.viewer
+        posts = list(Post.objects.select_related('user', 'category'))
+
+        # One bulk query for the viewer's votes, one for their follow edges
+        with self.assertNumQueries(2):
+            data = PostSerializer(posts, many=True, context={'request': request}).data
+        return data
+
+    def test_small_page(self):
+        data = self.serialize_page(5)
+        self.assertEqual(len(data), 5)
+
+    def test_large_page(self):
+        data = self.serialize_page(50)
+        votes = [item['userVote'] for item in data if item['userVote'] is not None]
+        following = {item['author']['name'] for item in data if item['author']['is_following']}
+        self.assertEqual(votes, [2])
+        self.assertEqual(following, {'author0'})
+
+    def test_profile_list_query_count_is_constant(self):
+        self.create_posts(20)
+        client = APIClient()
+        client.force_authenticate(self.viewer)
+
+        # Page query, then the viewer overlay (votes + follows)
+        for limit in (5, 20):
+            with self.assertNumQueries(3):
+                response = client.get('/api/posts/', {'username': 'author0', 'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(all(item['author']['is_following'] for item in response.data['results']))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RankedFeedCursorTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='viewer'))
+
+    def get_with_cursor(self, cursor, url='/api/posts/'):
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('ascii')).decode('ascii')
+        return self.client.get(url, {'cursor': encoded})
+
+    def test_invalid_keyset_id_is_not_found(self):
+        cursor = {'t': 1700000000.0, 'f': 1.0, 'c': '2024-01-01T00:00:00+00:00'}
+        self.assertEqual(self.get_with_cursor(cursor).status_code, 404)
+        self.assertEqual(self.get_with_cursor({**cursor, 'i': 'not-a-uuid'}).status_code, 404)
+        self.assertEqual(self.get_with_cursor({**cursor, 'i': 42}).status_code, 404)
+
+    def test_out_of_range_timestamp_is_not_found(self):
+        cursor = {'f': 1.0, 'c': '2024-01-01T00:00:00+00:00', 'i': 'a7d4fa43-1f1c-4b0e-9d0b-6f1a2f0f9c11'}
+        for timestamp in (1e12, 1e20, 'inf', 'nan'):
+            self.assertEqual(self.get_with_cursor({**cursor, 't': timestamp}).status_code, 404, timestamp)
+            self.assertEqual(
+                self.get_with_cursor({'b': timestamp}, '/api/posts/following/').status_code, 404, timestamp
+            )
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHES)
+class SnapshotToKeysetTests(TestCase):
+    def setUp(self):
+        self.redis = get_redis_connection('default')
+        self.redis.flushdb()
+        author = User.objects.create(username='author')
+        rng = random.Random(1)
+        now = timezone.now()
+        for i in range(45):
+            post = Post.objects.create(user=author, caption=f'post {i}', status='ready', total_score=rng.randint(0, 40))
+            Post.objects.filter(pk=post.pk).update(created_at=now - timedelta(hours=rng.uniform(0, 48)))
+        feed_ranking_index.rebuild()
+        self.ref_time = datetime.fromtimestamp(float(self.redis.get(feed_ranking_index._get_ref_key())), tz=dt_timezone.utc)
+        self.client = APIClient()
+        self.client.force_authenticate(author)
+
+    def test_cursor_keeps_the_snapshot_score(self):
+        snapshot_id = feed_ranking_index.create_snapshot()
+        post_id = feed_ranking_index.get_snapshot_ids(snapshot_id, 19, 1)[0]
+        post = Post.objects.get(pk=post_id)
+
+        cursor = RankedFeedPagination()._keyset_cursor(snapshot_id, post, None)
+        self.assertEqual(cursor['t'], self.ref_time)
+        self.assertEqual(cursor['f'], self.redis.zscore(feed_ranking_index._get_snapshot_key(snapshot_id), post_id))
+
+    @skipIf(connection.vendor == 'sqlite', 'SQLite cannot extract epoch from a datetime')
+    def test_feed_continues_the_snapshot_order(self):
+        expected = [str(post.id) for post in get_user_feed(now=self.ref_time)]
+
+        # Hours later the SQL scores at the current time order the posts differently
+        seen, url = [], '/api/posts/?limit=7'
+        with mock.patch.object(feed_ranking_index, 'snapshot_size', 20), \
+                mock.patch('posts.pagination.timezone.now', return_value=timezone.now() + timedelta(hours=6)):
+            while url:
+                response = self.client.get(url)
+                seen += [str(item['id']) for item in response.data['results']]
+                url = response.data['next']
+        self.assertEqual(seen, expected)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FeedPageCacheTests(TestCase):
+    def test_profile_scopes_share_one_version(self):
+        author = User.objects.create(username='author')
+        category = Category.objects.create(label='Music', slug='music')
+        scopes = [
+            feed_page_cache.profile_scope('author'),
+            feed_page_cache.profile_scope('author', 'all'),
+            feed_page_cache.profile_scope('author', 'music'),
+        ]
+        versions = [feed_page_cache.get_version(scope) for scope in scopes]
+
+        post = Post.objects.create(user=author, caption='new', status='ready', category=category)
+        feed_page_cache.invalidate_post(post)
+
+        for scope, version in zip(scopes, versions):
+            self.assertGreater(feed_page_cache.get_version(scope), version, scope)
+
+    def test_votes_and_comments_do_not_invalidate_feed_pages(self):
+        post = Post.objects.create(user=User.objects.create(username='author'), caption='post', status='ready')
+        scopes = [feed_page_cache.feed_scope(), feed_page_cache.profile_scope('author')]
+        versions = [feed_page_cache.get_version(scope) for scope in scopes]
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='voter'))
+        self.assertEqual(client.post(f'/api/votes/{post.pk}/', {'vote_type': 2}, format='json').status_code, 201)
+        self.assertEqual(client.delete(f'/api/votes/{post.pk}/delete/').status_code, 204)
+        self.assertEqual(client.post('/api/comments/', {'post': post.pk, 'content': 'hi'}).status_code, 201)
+
+        self.assertEqual([feed_page_cache.get_version(scope) for scope in scopes], versions)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ViewTrackingWithoutRedisTests(TestCase):
+    def setUp(self):
+        self.post = Post.objects.create(user=User.objects.create(username='author'), caption='post', status='ready')
+
+    def test_track_view_endpoints_do_not_fail(self):
+        client = APIClient()
+        self.assertEqual(client.post(f'/api/posts/{self.post.pk}/track-view/').status_code, 204)
+        response = client.post('/api/posts/track-views/', {'views': [{'post_id': str(self.post.pk)}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['status'], 'cooldown')
+
+    def test_counter_writes_views_directly(self):
+        self.assertEqual(redis_view_counter.increment(str(self.post.pk)), 1)
+        self.assertEqual(redis_view_counter.increment_many([str(self.post.pk)]), {str(self.post.pk): 1})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 2)
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHES)
+class TrackPostViewsBatchTests(TestCase):
+    def setUp(self):
+        get_redis_connection('default').flushdb()
+        author = User.objects.create(username='author')
+        self.posts = [Post.objects.create(user=author, caption=f'post {i}', status='ready') for i in range(3)]
+        Post.objects.filter(pk=self.posts[0].pk).update(view_count=10)
+        self.viewer = User.objects.create(username='viewer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def track(self, views):
+        return self.client.post('/api/posts/track-views/', {'views': views}, format='json')
+
+    def test_invalid_batches_are_rejected(self):
+        self.assertEqual(self.track([]).status_code, 400)
+        self.assertEqual(self.track([{'post_id': 'not-a-uuid'}]).status_code, 400)
+        too_many = [{'post_id': str(self.posts[0].pk)}] * 51
+        self.assertEqual(self.track(too_many).status_code, 400)
+
+    def test_outcomes_per_view(self):
+        first, second, third = (str(post.pk) for post in self.posts)
+        redis_view_tracker.check_and_track(second, f'user_{self.viewer.pk}')
+        missing = 'a7d4fa43-1f1c-4b0e-9d0b-6f1a2f0f9c11'
+        old = (timezone.now() - timedelta(days=1)).isoformat()
+
+        response = self.track([
+            {'post_id': first},
+            {'post_id': second},
+            {'post_id': missing},
+            {'post_id': third, 'viewed_at': old},
+            {'post_id': first},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([result['post_id'] for result in results], [first, second, missing, third, first])
+        self.assertEqual(
+            [result['status'] for result in results], ['tracked', 'cooldown', 'not_found', 'expired', 'cooldown']
+        )
+        # The buffered view is added to the stored count
+        self.assertEqual(results[0]['total_views'], 11)
+        self.assertGreater(results[1]['cooldown_remaining_seconds'], 0)
+        self.assertEqual(redis_view_counter.get_pending(first), 1)
+        self.assertEqual(redis_view_counter.get_pending(third), 0)
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHES)
+class ViewCountFlushTests(TestCase):
+    def setUp(self):
+        self.redis = get_redis_connection('default')
+        self.redis.flushdb()
+        self.post = Post.objects.create(user=User.objects.create(username='author'), caption='post', status='ready')
+
+    def test_flush_applies_buffered_views(self):
+        for _ in range(3):
+            redis_view_counter.increment(str(self.post.pk))
+        self.assertEqual(redis_view_counter.get_pending(str(self.post.pk)), 3)
+
+        self.assertEqual(redis_view_counter.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 3)
+        self.assertEqual(redis_view_counter.get_pending(str(self.post.pk)), 0)
+        self.assertIsNone(self.redis.get(redis_view_counter.lock_key))
+
+    def test_flush_keeps_a_lock_taken_over_by_another_flush(self):
+        redis_view_counter.increment(str(self.post.pk))
+        apply = redis_view_counter._apply
+
+        def apply_after_lock_expired(batch):
+            # The lock expired during this flush and another flush took it
+            self.redis.set(redis_view_counter.lock_key, 'other')
+            return apply(batch)
+
+        with mock.patch.object(redis_view_counter, '_apply', side_effect=apply_after_lock_expired):
+            redis_view_counter.flush()
+        self.assertEqual(self.redis.get(redis_view_counter.lock_key), b'other')
+        self.assertEqual(redis_view_counter.flush(), 0)
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHES)
+class FollowingFeedTests(TestCase):
+    def setUp(self):
+        get_redis_connection('default').flushdb()
+        self.viewer = User.objects.create(username='viewer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def test_built_empty_inbox_is_an_empty_page(self):
+        following_feed.build_inbox(self.viewer.pk)
+        author = User.objects.create(username='author')
+        Post.objects.create(user=author, caption='post', status='ready')
+        # Followed without the inbox hearing about it, so only the database has the post
+        Follow.objects.bulk_create([Follow(user_from=self.viewer, user_to=author)])
+
+        with mock.patch('posts.tasks.build_following_inbox.apply_async') as apply_async:
+            response = self.client.get('/api/posts/following/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+        apply_async.assert_not_called()
+
+    def post(self, author, minutes_ago, status='ready'):
+        post = Post.objects.create(user=author, caption='post', status=status)
+        Post.objects.filter(pk=post.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        post.refresh_from_db()
+        return post
+
+    def inbox(self, user):
+        return [post_id.decode() for post_id in get_redis_connection('default').zrevrange(
+            following_feed.inbox_key(user.pk), 0, -1)]
+
+    def feed(self):
+        return [row['id'] for row in self.client.get('/api/posts/following/').data['results']]
+
+    def test_fan_out_reaches_every_follower_in_chunks(self):
+        author = User.objects.create(username='author')
+        followers = [self.viewer] + [User.objects.create(username=f'follower{i}') for i in range(2)]
+        Follow.objects.bulk_create([Follow(user_from=follower, user_to=author) for follower in followers])
+        post = self.post(author, 0)
+        self.assertTrue(following_feed.publish(post))
+
+        with mock.patch.object(following_feed, 'fanout_chunk_size', 2), \
+                mock.patch('posts.tasks.fan_out_post.delay') as delay:
+            fan_out_post(str(post.id))
+            (post_id, after_id), _ = delay.call_args
+            self.assertEqual(fan_out_post(post_id, after_id), f"Fanned out post {post.id}")
+        delay.assert_called_once()
+        self.assertEqual([self.inbox(follower) for follower in followers], [[str(post.id)]] * 3)
+
+    def test_inboxes_are_capped(self):
+        author = User.objects.create(username='author')
+        Follow.objects.create(user_from=self.viewer, user_to=author)
+        posts = [self.post(author, minutes_ago) for minutes_ago in (3, 2, 1)]
+        with mock.patch.object(following_feed, 'inbox_size', 2):
+            for post in posts:
+                following_feed.fan_out(post)
+        self.assertEqual(self.inbox(self.viewer), [str(posts[2].id), str(posts[1].id)])
+
+    def test_large_accounts_are_merged_on_read(self):
+        large = User.objects.create(username='large', follower_count=2)
+        small = User.objects.create(username='small')
+        Follow.objects.create(user_from=self.viewer, user_to=large)
+        Follow.objects.create(user_from=self.viewer, user_to=small)
+        following_feed.build_inbox(self.viewer.pk)
+        large_post, small_post = self.post(large, 1), self.post(small, 2)
+        with mock.patch.object(following_feed, 'fanout_limit', 1):
+            self.assertFalse(following_feed.publish(large_post))
+            self.assertTrue(following_feed.publish(small_post))
+        following_feed.fan_out(small_post)
+
+        self.assertEqual(self.inbox(self.viewer), [str(small_post.id)])
+        self.assertEqual(self.feed(), [str(large_post.id), str(small_post.id)])
+
+    def test_first_read_queues_one_inbox_build(self):
+        author = User.objects.create(username='author')
+        large = User.objects.create(username='large')
+        Follow.objects.create(user_from=self.viewer, user_to=author)
+        Follow.objects.create(user_from=self.viewer, user_to=large)
+        older, newer = self.post(author, 2), self.post(author, 1)
+        self.post(author, 0, status='processing')
+        get_redis_connection('default').sadd(following_feed.large_key, str(large.pk))
+        self.post(large, 0)
+
+        with mock.patch('posts.tasks.build_following_inbox.apply_async') as apply_async:
+            # Served from the database until the inbox is built
+            self.assertEqual(len(self.feed()), 3)
+            self.assertEqual(len(self.feed()), 3)
+        apply_async.assert_called_once()
+
+        # Entries fanned out before the build are kept, even ones the database no longer gives
+        fanned_out = self.post(User.objects.create(username='other'), 3)
+        follow = Follow.objects.create(user_from=self.viewer, user_to=fanned_out.user)
+        following_feed.fan_out(fanned_out)
+        Follow.objects.filter(pk=follow.pk).delete()
+
+        self.assertEqual(build_following_inbox(*apply_async.call_args.args[0]),
+                         f"Built following inbox of user {self.viewer.pk} with 2 posts")
+        self.assertEqual(self.inbox(self.viewer), [str(newer.id), str(older.id), str(fanned_out.id)])
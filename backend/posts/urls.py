@@ -2,9 +2,11 @@ from django.urls import path
 from .views import (
     PostListView, 
     PostCreateView, 
+    FollowingFeedView,
     PostDetailView, 
     CategoryListAPIView,
     TrackPostViewAPI,
+    TrackPostViewsBatchAPI,
     UserVideosView,
     PostDeleteView 
 )
@@ -13,8 +15,10 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path('', PostListView.as_view(), name='post-list'),
+    path('following/', FollowingFeedView.as_view(), name='post-following-feed'),
     path('categories/', CategoryListAPIView.as_view(), name='category-list'),
     path('create/', PostCreateView.as_view(), name='post-create'),
+    path('track-views/', TrackPostViewsBatchAPI.as_view(), name='track-post-views'),
     path('<uuid:pk>/', PostDetailView.as_view(), name='post-detail'),
     path('<uuid:pk>/delete/', PostDeleteView.as_view(), name='post-delete'),
     path('<uuid:pk>/track-view/', TrackPostViewAPI.as_view(), name='track-post-view'),
@@ -1,8 +1,13 @@
 # posts/views.py
 import logging
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.db.models import F
+from django.utils import timezone
 
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
@@ -11,12 +16,16 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 
 from .models import Post, Category
-from .serializers import PostSerializer, PostCreateSerializer, CategorySerializer, PostThumbnailSerializer
+from .serializers import (
+    PostSerializer, PostCreateSerializer, CategorySerializer, PostThumbnailSerializer, TrackViewsBatchSerializer
+)
 from .services.feed_service import get_user_feed
-from .services.redis__service import redis_view_tracker
+from .services.redis__service import redis_view_tracker, redis_view_counter
+from .services.ranking_service import feed_ranking_index
+from .services.feed_cache import feed_page_cache
+from .services.following_feed import following_feed
+from .pagination import FollowingFeedPagination, RankedFeedPagination
 from .utils import get_user_identifier
-from users.models import Follow
-from django.db.models import Exists, OuterRef, Count, Value
 from rest_framework.pagination import CursorPagination
 logger = logging.getLogger(__name__)
 
@@ -47,30 +56,42 @@ class PostListView(generics.ListAPIView):
             if category_slug and category_slug not in ['all', 'other']:
                 queryset = queryset.filter(category__slug=category_slug)
             
-            queryset = queryset.select_related('user', 'category').prefetch_related('comments').annotate(
-                comment_count=Count('comments')
-            ) 
-                    
-            if self.request.user.is_authenticated:
-                queryset = queryset.annotate(
-                    is_following_author=Exists(
-                        Follow.objects.filter(
-                            user_from=self.request.user,
-                            user_to=OuterRef('user_id')
-                        )
-                    )
-                )
-            else:
-                queryset = queryset.annotate(is_following_author=Value(False))
+            queryset = queryset.select_related('user', 'category')
             
             return queryset.order_by('-created_at')
         
-        feed = get_user_feed(user=self.request.user, category_slug=category_slug)
-        return feed.annotate(comment_count=Count('comments')).order_by('-created_at')
+        return get_user_feed(category_slug=category_slug)
+
+    def list(self, request, *args, **kwargs):
+        username = request.query_params.get('username', None)
+        category_slug = request.query_params.get('category', None)
+        
+        if username:
+            scope = feed_page_cache.profile_scope(username, category_slug)
+        else:
+            scope = feed_page_cache.feed_scope(category_slug)
+        params = f"{request.query_params.get('cursor', '')}:{request.query_params.get('limit', '')}"
+        
+        # Pages are shared between viewers, viewer-specific fields are filled in afterwards
+        page = feed_page_cache.get_or_build(
+            scope, params, lambda: self._build_page(request, username, category_slug)
+        )
+        return Response(feed_page_cache.apply_viewer_overlay(page, request.user))
+    
+    def _build_page(self, request, username, category_slug):
+        # Profile lists stay chronological, the main feed keeps its ranking
+        if username:
+            return super().list(request).data
+        
+        paginator = RankedFeedPagination()
+        page = paginator.paginate_feed(request, category_slug=category_slug)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data).data
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
+        context['viewer_independent'] = True
         return context
     
     
@@ -106,14 +127,31 @@ class PostCreateView(generics.CreateAPIView):
         
         from users.models import CreatorProfile
         
+        # Recounts work_count from the posts table, including this post
         profile, created = CreatorProfile.objects.get_or_create(user=self.request.user)
+        profile.update_leaderboard_score()
         
-        CreatorProfile.objects.filter(user=self.request.user).update(
-            work_count=F('work_count') + 1
-        )
+        from users.services.rollup_service import record_activity
+        record_activity([(post.user_id, timezone.localdate(post.created_at), 0, 0, 1)])
         
-        profile.refresh_from_db()
-        profile.update_leaderboard_score()
+        feed_ranking_index.add_post(post)
+        feed_page_cache.invalidate_post(post)
+        
+        # Large accounts are merged into their followers' feeds at read time instead
+        if following_feed.publish(post):
+            from .tasks import fan_out_post
+            transaction.on_commit(lambda: fan_out_post.delay(str(post.id)))
+    
+    
+class FollowingFeedView(APIView):
+    """Posts from the creators the viewer follows, newest first."""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        paginator = FollowingFeedPagination()
+        posts = paginator.paginate_following(request)
+        serializer = PostSerializer(posts, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
     
     
 class PostDetailView(generics.RetrieveAPIView):
@@ -149,32 +187,33 @@ class TrackPostViewAPI(APIView):
     permission_classes = [AllowAny]
     
     def post(self, request, pk):
-        # Verify post exists
-        post = get_object_or_404(Post, pk=pk)
+        # Verify post exists without loading the whole row
+        view_count = Post.objects.filter(pk=pk).values_list('view_count', flat=True).first()
+        if view_count is None:
+            raise Http404
+        
+        post_id = str(pk)
         
         # Get user identifier
         user_identifier = get_user_identifier(request)
         
-        # Try to track the view
-        tracked = redis_view_tracker.track_view(str(post.id), user_identifier)
+        # Try to track the view, one atomic Redis call also returns the remaining cooldown
+        tracked, remaining = redis_view_tracker.check_and_track(post_id, user_identifier)
         
         if tracked:
-            # Increment view count in database (async recommended for production)
-            post.view_count += 1
-            post.save(update_fields=['view_count'])
+            # Buffer the view, flush_view_counts writes it to the database
+            pending = redis_view_counter.increment(post_id)
+            total_views = view_count + pending
             
-            logger.info(f"View tracked: post={post.id}, user={user_identifier}, total_views={post.view_count}")
+            logger.info(f"View tracked: post={post_id}, user={user_identifier}, total_views={total_views}")
             
             return Response({
                 'status': 'tracked',
                 'message': 'View tracked successfully',
-                'total_views': post.view_count
+                'total_views': total_views
             }, status=status.HTTP_200_OK)
         else:
-            # Get remaining cooldown time
-            remaining = redis_view_tracker.get_remaining_cooldown(str(post.id), user_identifier)
-            
-            logger.info(f"View not tracked (cooldown): post={post.id}, user={user_identifier}, remaining={remaining}s")
+            logger.info(f"View not tracked (cooldown): post={post_id}, user={user_identifier}, remaining={remaining}s")
             
             return Response({
                 'status': 'cooldown',
@@ -184,6 +223,74 @@ class TrackPostViewAPI(APIView):
        
     
            
+class TrackPostViewsBatchAPI(APIView):
+    """
+    API endpoint to track the views of a whole feed scroll session at once.
+    
+    POST /posts/track-views/
+    {"views": [{"post_id": "<uuid>", "viewed_at": "<datetime>"}, ...]}  (max 50)
+    
+    All posts are validated with one query and all cooldowns are checked in
+    one Redis pipeline. Views older than VIEW_BATCH_MAX_AGE seconds are dropped.
+    
+    Returns 200 with one result per view, in request order, with status:
+    - tracked: view counted (includes total_views)
+    - cooldown: already viewed recently (includes cooldown_remaining_seconds)
+    - expired: viewed_at is too old
+    - not_found: post does not exist
+    """
+    permission_classes = [AllowAny]
+    
+    def post(self, request):
+        serializer = TrackViewsBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        views = serializer.validated_data['views']
+        post_ids = [str(view['post_id']) for view in views]
+        view_counts = {
+            str(post_id): view_count
+            for post_id, view_count in Post.objects.filter(pk__in=post_ids).values_list('id', 'view_count')
+        }
+        oldest = timezone.now() - timedelta(seconds=getattr(settings, 'VIEW_BATCH_MAX_AGE', 60 * 60))
+        
+        results = [None] * len(views)
+        trackable = []
+        for i, view in enumerate(views):
+            if post_ids[i] not in view_counts:
+                results[i] = {'post_id': post_ids[i], 'status': 'not_found'}
+            elif view.get('viewed_at') and view['viewed_at'] < oldest:
+                results[i] = {'post_id': post_ids[i], 'status': 'expired'}
+            else:
+                trackable.append(i)
+        
+        user_identifier = get_user_identifier(request)
+        outcomes = redis_view_tracker.check_and_track_many([post_ids[i] for i in trackable], user_identifier)
+        
+        tracked_ids = [post_ids[i] for i, (tracked, _) in zip(trackable, outcomes) if tracked]
+        pending = redis_view_counter.increment_many(tracked_ids) if tracked_ids else {}
+        
+        for i, (tracked, remaining) in zip(trackable, outcomes):
+            post_id = post_ids[i]
+            if tracked:
+                results[i] = {
+                    'post_id': post_id,
+                    'status': 'tracked',
+                    'total_views': view_counts[post_id] + pending[post_id]
+                }
+            else:
+                results[i] = {
+                    'post_id': post_id,
+                    'status': 'cooldown',
+                    'cooldown_remaining_seconds': remaining
+                }
+        
+        logger.info(f"Batch views: user={user_identifier}, tracked={len(tracked_ids)}/{len(views)}")
+        
+        return Response({'results': results}, status=status.HTTP_200_OK)
+       
+    
+           
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -223,16 +330,31 @@ class PostDeleteView(generics.DestroyAPIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Decrement work count before deleting
-        from users.models import CreatorProfile
-        profile, created = CreatorProfile.objects.get_or_create(user=request.user)
+        feed_ranking_index.remove_post(post.id, post.category.slug if post.category_id else None)
+        feed_page_cache.invalidate_post(post)
+        following_feed.remove_post(post)
         
-        if profile.work_count > 0:
-            CreatorProfile.objects.filter(user=request.user).update(
-                work_count=F('work_count') - 1
+        # Take the post and the votes it received out of the daily rollups
+        from users.models import User
+        from users.services.rollup_service import record_activity
+        from votes.models import Vote
+        votes_by_day = Vote.objects.filter(post=post).annotate(
+            day=TruncDate('created_at')
+        ).values('day').annotate(votes=Count('id'), score=Sum('value')).order_by()
+        with transaction.atomic():
+            # Lock the post so no vote lands between reading its score and deleting it
+            total_score = Post.objects.select_for_update().filter(pk=post.pk).values_list(
+                'total_score', flat=True
+            ).first() or 0
+            User.objects.filter(pk=post.user_id).update(total_points=F('total_points') - total_score)
+            record_activity(
+                [(post.user_id, timezone.localdate(post.created_at), 0, 0, -1)] +
+                [(post.user_id, row['day'], -row['votes'], -row['score'], 0) for row in votes_by_day]
             )
-            profile.refresh_from_db()
-            profile.update_leaderboard_score()
+            post.delete()
         
-        post.delete()
+        # Recount work_count and votes now that the post is gone
+        from users.models import CreatorProfile
+        profile, created = CreatorProfile.objects.get_or_create(user=request.user)
+        profile.update_leaderboard_score()
         return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -14,20 +14,12 @@ class CustomUserAdmin(UserAdmin):
     model = User
     inlines = [CreatorProfileInline]
     
-    def follower_count_display(self, obj):
-        return obj.followers.count()
-    follower_count_display.short_description = 'Followers'
-    
-    def following_count_display(self, obj):
-        return obj.following.count()
-    following_count_display.short_description = 'Following'
-    
     list_display = (
         'username',
         'email',
         'total_points',
-        'follower_count_display',
-        'following_count_display',
+        'follower_count',
+        'following_count',
         'is_staff',
         'is_superuser',
         'is_active',
@@ -44,10 +36,10 @@ class CustomUserAdmin(UserAdmin):
         'email',
     )
 
-    readonly_fields = ('total_points', 'follower_count_display', 'following_count_display')
+    readonly_fields = ('total_points', 'follower_count', 'following_count')
 
     fieldsets = UserAdmin.fieldsets + (
         ('Profile', {
-            'fields': ('bio', 'avatar', 'total_points', 'follower_count_display', 'following_count_display'),
+            'fields': ('bio', 'avatar', 'total_points', 'follower_count', 'following_count'),
         }),
     )
\ No newline at end of file
@@ -0,0 +1,37 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .services.user_cache import user_lookup_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user through
+    user_lookup_cache, so most authenticated requests skip the User query.
+    The active and revoked-token checks still run on every request. The
+    user only has the cached auth fields loaded, others are read on access.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        cached = user_lookup_cache.get(user_id)
+        if cached is None:
+            user = super().get_user(validated_token)
+            user_lookup_cache.set(user_id, user)
+            return user
+        user, password_marker = cached
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_marker:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
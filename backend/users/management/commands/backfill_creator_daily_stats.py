@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from datetime import timedelta
+
+from posts.models import Post
+from users.models import CreatorDailyStats
+from votes.models import Vote
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily creator rollups for the last N days from the votes and posts tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = timezone.localdate() - timedelta(days=options['days'] - 1)
+        rows = {}
+
+        votes = Vote.objects.filter(created_at__date__gte=start).annotate(
+            day=TruncDate('created_at')
+        ).values('post__user_id', 'day').annotate(votes=Count('id'), score=Sum('value')).order_by()
+        for row in votes.iterator(chunk_size=options['batch_size']):
+            stats = rows.setdefault((row['post__user_id'], row['day']), CreatorDailyStats(user_id=row['post__user_id'], date=row['day']))
+            stats.vote_count, stats.score = row['votes'], row['score']
+
+        posts = Post.objects.filter(created_at__date__gte=start).annotate(
+            day=TruncDate('created_at')
+        ).values('user_id', 'day').annotate(posts=Count('id')).order_by()
+        for row in posts.iterator(chunk_size=options['batch_size']):
+            stats = rows.setdefault((row['user_id'], row['day']), CreatorDailyStats(user_id=row['user_id'], date=row['day']))
+            stats.post_count = row['posts']
+
+        with transaction.atomic():
+            deleted, _ = CreatorDailyStats.objects.filter(date__gte=start).delete()
+            CreatorDailyStats.objects.bulk_create(rows.values(), batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(rows)} daily rollups since {start} (replaced {deleted})'
+        ))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.recommendations import TOP_K, compute_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute every user\'s who-to-follow suggestions from the follow and vote matrices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users scored per sparse product')
+        parser.add_argument('--top-k', type=int, default=TOP_K)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stored = compute_recommendations(chunk_size=options['chunk_size'], k=options['top_k'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Stored suggestions for {stored} users in {elapsed:.1f}s'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.services.follow_graph import follow_graph
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Redis follow graph from the Follow table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = follow_graph.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt follow graph with {count} edges'))
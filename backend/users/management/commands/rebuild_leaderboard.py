@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.services.leaderboard_service import creator_leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Redis creator leaderboard from the stored reputation scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = creator_leaderboard.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt leaderboard with {count} creators'))
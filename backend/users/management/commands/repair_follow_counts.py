@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = 'Backfill User.follower_count and following_count and repair any drift from the follow table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report users with wrong counts')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        follower_count = Follow.objects.filter(
+            user_to=OuterRef('pk')
+        ).order_by().values('user_to').annotate(total=Count('id')).values('total')
+        following_count = Follow.objects.filter(
+            user_from=OuterRef('pk')
+        ).order_by().values('user_from').annotate(total=Count('id')).values('total')
+
+        drifted = User.objects.annotate(
+            actual_followers=Coalesce(Subquery(follower_count), 0),
+            actual_following=Coalesce(Subquery(following_count), 0),
+        ).filter(
+            ~Q(follower_count=F('actual_followers')) | ~Q(following_count=F('actual_following'))
+        ).values_list('id', 'actual_followers', 'actual_following')
+
+        batch = []
+        repaired = 0
+        for user_id, followers, following in drifted.iterator(chunk_size=batch_size):
+            batch.append(User(id=user_id, follower_count=followers, following_count=following))
+            if len(batch) >= batch_size:
+                repaired += self._save(batch, options['dry_run'])
+                batch = []
+        repaired += self._save(batch, options['dry_run'])
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{action} {repaired} users with wrong follow counts'))
+
+    def _save(self, batch, dry_run):
+        if batch and not dry_run:
+            User.objects.bulk_update(batch, ['follower_count', 'following_count'])
+        return len(batch)
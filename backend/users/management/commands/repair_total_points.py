@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from posts.models import Post
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Repair any drift of User.total_points from the total_score of the user's posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report users with wrong points')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        total_score = Post.objects.filter(
+            user=OuterRef('pk')
+        ).order_by().values('user').annotate(total=Sum('total_score')).values('total')
+
+        drifted = User.objects.annotate(
+            actual_points=Coalesce(Subquery(total_score), 0),
+        ).filter(
+            ~Q(total_points=F('actual_points'))
+        ).values_list('id', 'actual_points')
+
+        batch = []
+        repaired = 0
+        for user_id, points in drifted.iterator(chunk_size=batch_size):
+            batch.append(User(id=user_id, total_points=points))
+            if len(batch) >= batch_size:
+                repaired += self._save(batch, options['dry_run'])
+                batch = []
+        repaired += self._save(batch, options['dry_run'])
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{action} {repaired} users with wrong total points'))
+
+    def _save(self, batch, dry_run):
+        if batch and not dry_run:
+            User.objects.bulk_update(batch, ['total_points'])
+        return len(batch)
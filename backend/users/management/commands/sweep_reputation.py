@@ -0,0 +1,62 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from users.scoring import GLOBAL_AVG_RATING, MIN_RATINGS, compute_scores, load_all_stats, sweep
+
+
+def _floats(value):
+    return [float(item) for item in value.split(',')]
+
+
+class Command(BaseCommand):
+    help = (
+        'What-if sweep of the reputation prior over the whole creator base: '
+        'how each (min_ratings, global_avg) pair would reorder the leaderboard'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-ratings', type=_floats, default=[25, 75, 100, 200])
+        parser.add_argument('--global-avg', type=_floats, default=[1.5, 2.0, GLOBAL_AVG_RATING])
+        parser.add_argument('--top', type=int, default=50, help='Leaderboard size compared with the current one')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stats = load_all_stats(options['chunk_size'])
+        loaded = time.perf_counter() - start
+        if not len(stats):
+            self.stdout.write('No creators')
+            return
+
+        start = time.perf_counter()
+        _, baseline = compute_scores(stats)
+        grid = sweep(stats, options['min_ratings'], options['global_avg'])
+        computed = time.perf_counter() - start
+
+        observed_avg = stats.total_votes.sum() / max(stats.rating_count.sum(), 1)
+        self.stdout.write(
+            f"{len(stats)} creators, loaded in {loaded:.2f}s, {grid.shape[0] * grid.shape[1]} "
+            f"parameter sets scored in {computed * 1000:.1f} ms. Observed average vote: {observed_avg:.2f}"
+        )
+        self.stdout.write(f"Compared with min_ratings={MIN_RATINGS}, global_avg={GLOBAL_AVG_RATING}:")
+
+        top = min(options['top'], len(stats))
+        baseline_top = set(np.argsort(-baseline, kind='stable')[:top])
+        baseline_ranks = self.ranks(baseline)
+        for i, min_ratings in enumerate(options['min_ratings']):
+            for j, global_avg in enumerate(options['global_avg']):
+                scores = grid[i, j]
+                overlap = len(baseline_top & set(np.argsort(-scores, kind='stable')[:top])) / top
+                correlation = np.corrcoef(baseline_ranks, self.ranks(scores))[0, 1] if len(stats) > 1 else 1.0
+                self.stdout.write(
+                    f"  min_ratings={min_ratings:>6g} global_avg={global_avg:>4g}: "
+                    f"top {top} overlap {overlap:.0%}, rank correlation {correlation:.3f}, "
+                    f"mean score {scores.mean():.3f}"
+                )
+
+    def ranks(self, scores):
+        ranks = np.empty(len(scores))
+        ranks[np.argsort(scores, kind='stable')] = np.arange(len(scores))
+        return ranks
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_follow_user_following_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreatorDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('vote_count', models.IntegerField(default=0)),
+                ('score', models.IntegerField(default=0)),
+                ('post_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'user'], name='users_creat_date_1e0b59_idx')],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
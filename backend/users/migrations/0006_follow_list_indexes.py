@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_follow_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['user_to', '-created_at'], name='users_follo_user_to_b6280e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['user_from', '-created_at'], name='users_follo_user_fr_26f00a_idx'),
+        ),
+    ]
@@ -2,7 +2,6 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.conf import settings
 from rest_framework import serializers
-import math
 import uuid
 
 class User(AbstractUser):
@@ -10,6 +9,9 @@ class User(AbstractUser):
     total_points = models.IntegerField(default=0)
     bio = models.TextField(blank=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    # Maintained by users.services.follow_service, repaired by repair_follow_counts
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
     following = models.ManyToManyField(
         'self',
         through='Follow',
@@ -29,12 +31,14 @@ class CreatorProfile(models.Model):
     work_count = models.IntegerField(default=0)
     bio = serializers.CharField(source='user.bio', read_only=True)
 
-    def update_leaderboard_score(self, global_avg=4.2, min_ratings=25):
-        """Bayesian rating formula with consistency boost"""
-        score = (min_ratings * global_avg + self.avg_rating * self.rating_count) / (min_ratings + self.rating_count)
-        score *= math.log(self.work_count + 1)
-        self.reputation_score = score
-        self.save(update_fields=['reputation_score'])
+    def update_leaderboard_score(self, global_avg=None, min_ratings=None):
+        """Recalculate this creator's reputation with the shared scoring engine"""
+        from .scoring import GLOBAL_AVG_RATING, MIN_RATINGS, score_creators
+        score_creators(
+            [self],
+            global_avg=GLOBAL_AVG_RATING if global_avg is None else global_avg,
+            min_ratings=MIN_RATINGS if min_ratings is None else min_ratings,
+        )
         
         
 class Follow(models.Model):
@@ -46,7 +50,27 @@ class Follow(models.Model):
         unique_together = ('user_from', 'user_to')
         indexes = [
             models.Index(fields=['user_from', 'user_to']),
+            # Follower and following lists page through these
+            models.Index(fields=['user_to', '-created_at']),
+            models.Index(fields=['user_from', '-created_at']),
         ]
     
     def __str__(self):
-        return f"{self.user_from.username} follows {self.user_to.username}"
\ No newline at end of file
+        return f"{self.user_from.username} follows {self.user_to.username}"
+
+class CreatorDailyStats(models.Model):
+    """Per-creator daily rollup of votes received, score and posts, behind the windowed leaderboards."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='daily_stats', on_delete=models.CASCADE)
+    date = models.DateField()
+    vote_count = models.IntegerField(default=0)
+    score = models.IntegerField(default=0)
+    post_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'date')
+        indexes = [
+            models.Index(fields=['date', 'user']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.date}: {self.score}"
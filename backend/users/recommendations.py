@@ -0,0 +1,210 @@
+# users/recommendations.py
+"""
+Who-to-follow recommendation engine.
+
+The follow graph and vote history are loaded into sparse matrices, with
+users and posts indexed 0..n-1:
+
+    F  (users x users)  F[i, j] = 1 if user i follows user j
+    P  (users x posts)  P[i, p] = 1 if user i voted on post p
+    A  (posts x users)  A[p, j] = 1 if user j wrote post p
+    B = P @ A           B[i, j] = number of user j's posts user i voted on
+
+and candidate scores are computed for a chunk of users at once:
+
+    two_hop = F @ F                          followed by people you follow
+    S       = P' @ P.T - self                posts voted on in common
+    co_vote = top(S) @ (B > 0)               voted for by people who vote on the same posts
+    score   = TWO_HOP_WEIGHT * log(1 + two_hop)
+            + CO_VOTE_WEIGHT * log(1 + co_vote)
+            + DIRECT_VOTE_WEIGHT * log(1 + B)
+
+P' leaves out posts with more than MAX_CO_VOTE_POST_VOTERS voters, which
+say little about taste and would make S dense, and top(S) keeps each
+user's SIMILAR_VOTERS most similar voters.
+
+Users themselves, the users they already follow and inactive accounts are
+masked out, and the TOP_K best candidates of each user are stored in the
+cache, where the who-to-follow endpoint reads them.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from typing import Dict, List, Tuple
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+
+logger = logging.getLogger(__name__)
+
+TWO_HOP_WEIGHT = 1.0
+CO_VOTE_WEIGHT = 0.5
+DIRECT_VOTE_WEIGHT = 1.5
+
+TOP_K = 50
+
+MAX_CO_VOTE_POST_VOTERS = 1000
+SIMILAR_VOTERS = 100
+
+CACHE_KEY_PREFIX = 'who_to_follow'
+
+
+def cache_key(user_id) -> str:
+    return f"{CACHE_KEY_PREFIX}:{user_id}"
+
+
+class InteractionGraph:
+    """Sparse follow and vote matrices, with the user IDs behind each index."""
+
+    def __init__(self, user_ids: List, active: np.ndarray, follows: sp.csr_matrix,
+                 votes: sp.csr_matrix, authors: sp.csr_matrix):
+        self.user_ids = user_ids
+        self.active = active
+        self.follows = follows
+        self.votes = votes
+        # Only niche posts count towards voter similarity
+        niche = (np.asarray(votes.getnnz(axis=0)) <= MAX_CO_VOTE_POST_VOTERS).astype(np.float64)
+        self.similarity_votes = (votes @ sp.diags(niche)).tocsr()
+        self.similarity_votes.eliminate_zeros()
+        self.voted_creators = (votes @ authors).tocsr()
+        self.voted_creators_binary = (self.voted_creators > 0).astype(np.float64)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+
+def _edges(queryset, index: Dict, other_index: Dict, chunk_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    rows, cols = [], []
+    for left, right in queryset.iterator(chunk_size=chunk_size):
+        if left in index and right in other_index:
+            rows.append(index[left])
+            cols.append(other_index[right])
+    return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+
+
+def _matrix(rows: np.ndarray, cols: np.ndarray, shape: Tuple[int, int]) -> sp.csr_matrix:
+    matrix = sp.csr_matrix((np.ones(len(rows), dtype=np.float64), (rows, cols)), shape=shape)
+    # Duplicate edges are summed by the constructor, every relation here is binary
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def load_graph(chunk_size: int = 10000) -> InteractionGraph:
+    """Load every user, follow edge and vote, streaming the rows from the database."""
+    from posts.models import Post
+    from votes.models import Vote
+    from .models import Follow, User
+
+    users = list(User.objects.order_by('id').values_list('id', 'is_active'))
+    user_ids = [user_id for user_id, _ in users]
+    active = np.asarray([is_active for _, is_active in users], dtype=np.float64)
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+
+    posts = list(Post.objects.filter(status='ready').values_list('id', 'user_id').iterator(chunk_size=chunk_size))
+    post_index = {post_id: i for i, (post_id, _) in enumerate(posts)}
+    n, m = len(user_ids), len(posts)
+
+    follows = _matrix(*_edges(
+        Follow.objects.values_list('user_from_id', 'user_to_id'), user_index, user_index, chunk_size
+    ), (n, n))
+    votes = _matrix(*_edges(
+        Vote.objects.values_list('user_id', 'post_id'), user_index, post_index, chunk_size
+    ), (n, m))
+    authors = _matrix(
+        np.arange(m, dtype=np.int64),
+        np.asarray([user_index[user_id] for _, user_id in posts], dtype=np.int64),
+        (m, n)
+    )
+    return InteractionGraph(user_ids, active, follows, votes, authors)
+
+
+def _identity(start: int, stop: int, shape: Tuple[int, int]) -> sp.csr_matrix:
+    """Ones where row i is user start + i."""
+    return sp.csr_matrix((np.ones(stop - start), (np.arange(stop - start), np.arange(start, stop))), shape=shape)
+
+
+def _keep_top(matrix: sp.csr_matrix, k: int) -> sp.csr_matrix:
+    """Only the k largest entries of each row."""
+    rows, cols, data = [], [], []
+    for i, (row_cols, row_data) in enumerate(top_k(matrix, k)):
+        rows.append(np.full(len(row_cols), i))
+        cols.append(row_cols)
+        data.append(row_data)
+    if not rows:
+        return sp.csr_matrix(matrix.shape)
+    return sp.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape=matrix.shape)
+
+
+def score_chunk(graph: InteractionGraph, start: int, stop: int) -> sp.csr_matrix:
+    """Candidate scores of users start..stop-1 against every user, as a (stop - start) x n matrix."""
+    rows = slice(start, stop)
+    follows = graph.follows[rows]
+
+    two_hop = follows @ graph.follows
+
+    # The most similar voters of each user, not counting themselves
+    similar = (graph.similarity_votes[rows] @ graph.similarity_votes.T).tocsr()
+    similar = similar - similar.multiply(_identity(start, stop, similar.shape))
+    co_vote = _keep_top(similar, SIMILAR_VOTERS) @ graph.voted_creators_binary
+
+    score = (
+        TWO_HOP_WEIGHT * two_hop.log1p()
+        + CO_VOTE_WEIGHT * co_vote.tocsr().log1p()
+        + DIRECT_VOTE_WEIGHT * graph.voted_creators[rows].log1p()
+    ).tocsr()
+
+    # Mask out the users themselves, who they already follow and inactive accounts
+    exclude = (follows + _identity(start, stop, score.shape)) > 0
+    score = (score - score.multiply(exclude)) @ sp.diags(graph.active)
+    score = sp.csr_matrix(score)
+    score.data[score.data < 0] = 0
+    score.eliminate_zeros()
+    return score
+
+
+def top_k(scores: sp.csr_matrix, k: int = TOP_K) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """(column indices, scores) of the k best entries of each row, best first."""
+    results = []
+    for i in range(scores.shape[0]):
+        begin, end = scores.indptr[i], scores.indptr[i + 1]
+        data, cols = scores.data[begin:end], scores.indices[begin:end]
+        if len(data) > k:
+            best = np.argpartition(-data, k)[:k]
+            data, cols = data[best], cols[best]
+        order = np.argsort(-data, kind='stable')
+        results.append((cols[order], data[order]))
+    return results
+
+
+def compute_recommendations(chunk_size: int = 1000, k: int = TOP_K, timeout=None) -> int:
+    """
+    Score every user's candidates in chunks and store their top k in the
+    cache. Returns the number of users with at least one suggestion.
+    """
+    timeout = timeout or getattr(settings, 'WHO_TO_FOLLOW_TTL', 60 * 60 * 48)
+    graph = load_graph()
+    stored = 0
+
+    for start in range(0, len(graph), chunk_size):
+        stop = min(start + chunk_size, len(graph))
+        entries = {}
+        for offset, (cols, data) in enumerate(top_k(score_chunk(graph, start, stop), k)):
+            user_id = graph.user_ids[start + offset]
+            entries[cache_key(user_id)] = [
+                (str(graph.user_ids[col]), round(float(score), 4)) for col, score in zip(cols, data)
+            ]
+            stored += bool(len(cols))
+        cache.set_many(entries, timeout)
+        logger.info(f"Computed who-to-follow suggestions for {stop}/{len(graph)} users")
+
+    return stored
+
+
+def get_recommendations(user_id) -> List[Tuple[str, float]]:
+    """The stored (user_id, score) suggestions of a user, best first."""
+    try:
+        return cache.get(cache_key(user_id)) or []
+    except Exception as e:
+        logger.error(f"Error reading who-to-follow suggestions of user {user_id}: {e}")
+        return []
@@ -0,0 +1,157 @@
+# users/scoring.py
+"""
+Creator reputation scoring engine.
+
+Creator stats are loaded into columnar NumPy arrays and every score is
+computed in one vectorized pass:
+
+    bayesian_avg = (min_ratings * global_avg + rating_count * avg_rating) / (min_ratings + rating_count)
+    reputation   = max(0, bayesian_avg * log(work_count + 1) - days_inactive * decay_rate)
+"""
+from django.utils import timezone
+
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Bayesian prior: the rating assumed for a creator with no votes, and how
+# many votes it takes before their own average outweighs it
+GLOBAL_AVG_RATING = 4.2
+MIN_RATINGS = 100
+
+# Setting DECAY_RATE_PER_DAY to 0.02 means it takes 50 days of
+# total inactivity to lose just 1.0 point of reputation.
+DECAY_RATE_PER_DAY = 0.02
+
+SCORE_FIELDS = ['avg_rating', 'rating_count', 'work_count', 'reputation_score']
+
+
+class CreatorStats:
+    """Per-creator inputs of the formula, one array element per creator."""
+
+    def __init__(self, creator_ids, total_votes, rating_count, work_count, days_inactive):
+        self.creator_ids = np.asarray(creator_ids, dtype=np.int64)
+        self.total_votes = np.asarray(total_votes, dtype=np.float64)
+        self.rating_count = np.asarray(rating_count, dtype=np.int64)
+        self.work_count = np.asarray(work_count, dtype=np.int64)
+        self.days_inactive = np.asarray(days_inactive, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.creator_ids)
+
+    @classmethod
+    def concatenate(cls, parts: Sequence['CreatorStats']) -> 'CreatorStats':
+        return cls(*(
+            np.concatenate([getattr(part, name) for part in parts]) if parts else []
+            for name in ('creator_ids', 'total_votes', 'rating_count', 'work_count', 'days_inactive')
+        ))
+
+
+def creator_queryset():
+    """CreatorProfiles with their user, which scoring and the leaderboard rows read."""
+    from .models import CreatorProfile
+    return CreatorProfile.objects.select_related('user')
+
+
+def load_stats(creators: Sequence, now=None) -> CreatorStats:
+    """Stats for these CreatorProfiles, in the same order, from one grouped aggregate over Post."""
+    from django.db.models import Count, F, Max, Sum
+    from posts.models import Post
+
+    now = now or timezone.now()
+    rows = {
+        row['user_id']: row for row in
+        Post.objects.filter(user_id__in=[creator.user_id for creator in creators])
+        .values('user_id')
+        .annotate(
+            total_v=Sum('total_score'),                              # Sum of all vote values
+            total_c=Sum(F('plus_one_count') + F('plus_two_count')),  # Total number of votes received
+            last_post_date=Max('created_at'),                        # Date of most recent contribution
+            work_c=Count('id'),                                      # Number of posts
+        )
+        .order_by()
+    }
+
+    empty = {}
+    stats = [rows.get(creator.user_id, empty) for creator in creators]
+    return CreatorStats(
+        creator_ids=[creator.id for creator in creators],
+        total_votes=[row.get('total_v') or 0 for row in stats],
+        rating_count=[row.get('total_c') or 0 for row in stats],
+        work_count=[row.get('work_c') or 0 for row in stats],
+        days_inactive=[
+            (now - (row.get('last_post_date') or creator.user.date_joined)).days
+            for creator, row in zip(creators, stats)
+        ],
+    )
+
+
+def iter_stats(chunk_size: int = 1000, now=None) -> Iterator[Tuple[List, CreatorStats]]:
+    """Every creator in ID order, as (creators, stats) chunks."""
+    now = now or timezone.now()
+    last_id = 0
+    while True:
+        creators = list(creator_queryset().filter(id__gt=last_id).order_by('id')[:chunk_size])
+        if not creators:
+            return
+        yield creators, load_stats(creators, now)
+        last_id = creators[-1].id
+
+
+def load_all_stats(chunk_size: int = 1000, now=None) -> CreatorStats:
+    """Stats for the whole creator base, loaded chunk by chunk."""
+    return CreatorStats.concatenate([stats for _, stats in iter_stats(chunk_size, now)])
+
+
+def compute_scores(stats: CreatorStats, global_avg=GLOBAL_AVG_RATING, min_ratings=MIN_RATINGS,
+                   decay_rate=DECAY_RATE_PER_DAY) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (avg_rating, reputation_score) arrays.
+    global_avg and min_ratings may also be arrays that broadcast against
+    the creator axis (the last one), see sweep().
+    """
+    avg_rating = stats.total_votes / np.maximum(stats.rating_count, 1)
+    bayesian_avg = (
+        (min_ratings * global_avg + stats.rating_count * avg_rating)
+        / (min_ratings + stats.rating_count)
+    )
+    quantity_bonus = np.log1p(stats.work_count)
+    total_decay = stats.days_inactive * decay_rate
+    return avg_rating, np.maximum(0.0, bayesian_avg * quantity_bonus - total_decay)
+
+
+def sweep(stats: CreatorStats, min_ratings_values: Iterable[float], global_avg_values: Iterable[float],
+          decay_rate=DECAY_RATE_PER_DAY) -> np.ndarray:
+    """
+    Scores for every (min_ratings, global_avg) pair in one pass.
+    Returns an array of shape (len(min_ratings_values), len(global_avg_values), len(stats)).
+    """
+    min_ratings = np.asarray(list(min_ratings_values), dtype=np.float64)[:, None, None]
+    global_avg = np.asarray(list(global_avg_values), dtype=np.float64)[None, :, None]
+    _, scores = compute_scores(stats, global_avg, min_ratings, decay_rate)
+    return scores
+
+
+def write_scores(creators: Sequence, stats: CreatorStats, avg_rating: np.ndarray, scores: np.ndarray) -> int:
+    """Store computed scores on the creators (aligned with stats) with one bulk_update, then on the leaderboard."""
+    from .models import CreatorProfile
+    from .services.leaderboard_service import creator_leaderboard
+
+    for i, creator in enumerate(creators):
+        creator.avg_rating = float(avg_rating[i])
+        creator.rating_count = int(stats.rating_count[i])
+        creator.work_count = int(stats.work_count[i])
+        creator.reputation_score = float(scores[i])
+    CreatorProfile.objects.bulk_update(creators, SCORE_FIELDS)
+    creator_leaderboard.update(creators)
+    return len(creators)
+
+
+def score_creators(creators: Iterable, global_avg=GLOBAL_AVG_RATING, min_ratings=MIN_RATINGS,
+                   now=None) -> int:
+    """Load, score and store a chunk of creators. Returns the number updated."""
+    creators = list(creators)
+    if not creators:
+        return 0
+    stats = load_stats(creators, now)
+    avg_rating, scores = compute_scores(stats, global_avg, min_ratings)
+    return write_scores(creators, stats, avg_rating, scores)
@@ -3,6 +3,7 @@ from .models import User, CreatorProfile, Follow
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
+from posts.services.viewer_context import ViewerContext
 
 User = get_user_model()
 
@@ -29,11 +30,11 @@ class UserSerializer(serializers.ModelSerializer):
     def get_is_following(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            # Check if annotated value exists (from optimized query)
+            # Check if the value was already resolved for the whole page
             if hasattr(obj, 'is_following'):
                 return obj.is_following
-            # Fallback for individual queries
-            return Follow.objects.filter(user_from=request.user, user_to=obj).exists()
+            # Fallback for individual users, served from the follow graph
+            return ViewerContext.for_request(request).is_following(obj.pk)
         return False
 
 
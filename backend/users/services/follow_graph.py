@@ -0,0 +1,160 @@
+# users/services/follow_graph.py
+from django.conf import settings
+
+from typing import Iterable, List, Optional, Set
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class FollowGraph:
+    """
+    Mirror of the Follow table in Redis, one set of user IDs per direction.
+
+    following:<id> holds the users <id> follows and followers:<id> the users
+    following <id>, so relationship checks for a whole page are a single
+    SMISMEMBER and "followed by people you follow" is a set intersection.
+    Edges are written after each follow/unfollow commits; rebuild() reloads
+    the whole graph. Reads return None while the mirror is unavailable or
+    being rebuilt, and callers fall back to the database. The first read
+    that finds the graph missing queues a rebuild.
+    """
+
+    def __init__(self):
+        self.key_prefix = getattr(settings, 'FOLLOW_GRAPH_KEY_PREFIX', 'follow_graph')
+        self.built_key = f"{self.key_prefix}:built"
+        self.rebuild_key = f"{self.key_prefix}:rebuild"
+        # A rebuild queued on a read is retried after this many seconds if the graph is still missing
+        self.rebuild_retry = getattr(settings, 'FOLLOW_GRAPH_REBUILD_RETRY', 60 * 60)
+
+    def _get_redis(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+
+    def following_key(self, user_id) -> str:
+        return f"{self.key_prefix}:following:{user_id}"
+
+    def followers_key(self, user_id) -> str:
+        return f"{self.key_prefix}:followers:{user_id}"
+
+    def _queue_edge(self, pipe, user_from_id, user_to_id, add: bool):
+        command = pipe.sadd if add else pipe.srem
+        command(self.following_key(user_from_id), str(user_to_id))
+        command(self.followers_key(user_to_id), str(user_from_id))
+
+    def add(self, user_from_id, user_to_id):
+        try:
+            pipe = self._get_redis().pipeline()
+            self._queue_edge(pipe, user_from_id, user_to_id, add=True)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error adding follow {user_from_id} -> {user_to_id} to the graph: {e}")
+
+    def remove(self, user_from_id, user_to_id):
+        try:
+            pipe = self._get_redis().pipeline()
+            self._queue_edge(pipe, user_from_id, user_to_id, add=False)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error removing follow {user_from_id} -> {user_to_id} from the graph: {e}")
+
+    def _read(self, queue, description: str):
+        """
+        Run the command queued by queue(pipe) if the graph is built. Returns
+        None, and callers fall back to the database, while it is missing.
+        """
+        try:
+            redis_conn = self._get_redis()
+            pipe = redis_conn.pipeline()
+            pipe.exists(self.built_key)
+            queue(pipe)
+            built, result = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error reading {description} from the follow graph: {e}")
+            return None
+        if not built:
+            self._schedule_rebuild(redis_conn)
+            return None
+        return result
+
+    def _schedule_rebuild(self, redis_conn):
+        """Queue one rebuild when a read finds the graph missing, e.g. after a deploy or a Redis flush."""
+        try:
+            if redis_conn.set(self.rebuild_key, 1, nx=True, ex=self.rebuild_retry):
+                from ..tasks import rebuild_follow_graph
+                rebuild_follow_graph.apply_async(retry=False)
+        except Exception as e:
+            logger.error(f"Error scheduling a follow graph rebuild: {e}")
+
+    def is_following_many(self, user_id, candidate_ids: Iterable) -> Optional[Set[str]]:
+        """The subset of candidate_ids (as strings) that user_id follows, None if the graph is unavailable."""
+        candidate_ids = [str(candidate_id) for candidate_id in candidate_ids]
+        if not candidate_ids:
+            return set()
+        members = self._read(
+            lambda pipe: pipe.smismember(self.following_key(user_id), candidate_ids), f"follows of user {user_id}"
+        )
+        if members is None:
+            return None
+        return {candidate_id for candidate_id, member in zip(candidate_ids, members) if member}
+
+    def followed_followers(self, user_id, target_id) -> Optional[List[str]]:
+        """Followers of target_id that user_id follows ("followed by people you follow")."""
+        members = self._read(
+            lambda pipe: pipe.sinter([self.following_key(user_id), self.followers_key(target_id)]),
+            f"followers of user {target_id} followed by user {user_id}"
+        )
+        if members is None:
+            return None
+        return sorted(member.decode() for member in members)
+
+    def rebuild(self, chunk_size: int = 5000) -> int:
+        """
+        Reload every edge from the Follow table. Reads fall back to the
+        database until the rebuild is finished.
+        """
+        from ..models import Follow
+
+        redis_conn = self._get_redis()
+        pipe = redis_conn.pipeline()
+        pipe.delete(self.built_key)
+        # Reads during the rebuild must not queue another one
+        pipe.set(self.rebuild_key, 1, ex=self.rebuild_retry)
+        pipe.execute()
+        for pattern in (self.following_key('*'), self.followers_key('*')):
+            keys = []
+            for key in redis_conn.scan_iter(match=pattern, count=chunk_size):
+                keys.append(key)
+                if len(keys) >= chunk_size:
+                    redis_conn.delete(*keys)
+                    keys = []
+            if keys:
+                redis_conn.delete(*keys)
+
+        count = 0
+        last_id = 0
+        while True:
+            edges = list(
+                Follow.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'user_from_id', 'user_to_id')[:chunk_size]
+            )
+            if not edges:
+                break
+            pipe = redis_conn.pipeline()
+            for _, user_from_id, user_to_id in edges:
+                self._queue_edge(pipe, user_from_id, user_to_id, add=True)
+            pipe.execute()
+            count += len(edges)
+            last_id = edges[-1][0]
+
+        pipe = redis_conn.pipeline()
+        pipe.set(self.built_key, int(time.time()))
+        pipe.delete(self.rebuild_key)
+        pipe.execute()
+        logger.info(f"Rebuilt follow graph with {count} edges")
+        return count
+
+
+# Singleton instance
+follow_graph = FollowGraph()
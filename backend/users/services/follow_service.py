@@ -0,0 +1,62 @@
+# users/services/follow_service.py
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from ..models import Follow, User
+from .follow_graph import follow_graph
+
+
+def _adjust_counts(user_from, user_to, delta: int):
+    """Apply a follow (+1) or unfollow (-1) to the stored counts of both users."""
+    if delta > 0:
+        User.objects.filter(pk=user_from.pk).update(following_count=F('following_count') + delta)
+        User.objects.filter(pk=user_to.pk).update(follower_count=F('follower_count') + delta)
+    else:
+        User.objects.filter(pk=user_from.pk).update(following_count=Greatest(F('following_count') + delta, 0))
+        User.objects.filter(pk=user_to.pk).update(follower_count=Greatest(F('follower_count') + delta, 0))
+
+    # Keep the loaded instances in sync for the response, deferred counts
+    # (on a request.user from the auth cache) are read fresh on access
+    if 'following_count' not in user_from.get_deferred_fields():
+        user_from.following_count = max(user_from.following_count + delta, 0)
+    if 'follower_count' not in user_to.get_deferred_fields():
+        user_to.follower_count = max(user_to.follower_count + delta, 0)
+
+
+def _on_follow(user_from_id, user_to_id):
+    from posts.services.following_feed import following_feed
+    follow_graph.add(user_from_id, user_to_id)
+    following_feed.add_author(user_from_id, user_to_id)
+
+
+def _on_unfollow(user_from_id, user_to_id):
+    from posts.services.following_feed import following_feed
+    follow_graph.remove(user_from_id, user_to_id)
+    following_feed.remove_author(user_from_id, user_to_id)
+
+
+def follow(user_from, user_to) -> bool:
+    """Follow user_to. Returns False if the edge already existed."""
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user_from=user_from, user_to=user_to)
+        except IntegrityError:
+            # Already following, possibly from a concurrent request
+            return False
+        _adjust_counts(user_from, user_to, 1)
+        transaction.on_commit(lambda: _on_follow(user_from.pk, user_to.pk))
+    return True
+
+
+def unfollow(user_from, user_to) -> bool:
+    """Unfollow user_to. Returns False if there was no edge to remove."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(user_from=user_from, user_to=user_to).delete()
+        if not deleted:
+            return False
+        _adjust_counts(user_from, user_to, -1)
+        transaction.on_commit(lambda: _on_unfollow(user_from.pk, user_to.pk))
+    return True
+
@@ -0,0 +1,232 @@
+# users/services/leaderboard_service.py
+from django.conf import settings
+
+from typing import Dict, Iterable, List, Optional
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Writes entries to the live board, and to the board being rebuilt if
+# KEYS[3] holds its key suffix, so a rebuild swapping in keeps them.
+# ARGV holds (user_id, score, row) triples.
+UPDATE_ENTRIES_SCRIPT = """
+local suffix = redis.call('GET', KEYS[3])
+for i = 1, #ARGV, 3 do
+    redis.call('ZADD', KEYS[1], ARGV[i + 1], ARGV[i])
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 2])
+    if suffix then
+        redis.call('ZADD', KEYS[1] .. suffix, ARGV[i + 1], ARGV[i])
+        redis.call('HSET', KEYS[2] .. suffix, ARGV[i], ARGV[i + 2])
+    end
+end
+return 0
+"""
+
+# Same for removals, ARGV holds user IDs. They are also recorded for the
+# swap, in case the rebuild read them from the database before they went.
+REMOVE_ENTRIES_SCRIPT = """
+local suffix = redis.call('GET', KEYS[3])
+redis.call('ZREM', KEYS[1], unpack(ARGV))
+redis.call('HDEL', KEYS[2], unpack(ARGV))
+if suffix then
+    redis.call('ZREM', KEYS[1] .. suffix, unpack(ARGV))
+    redis.call('HDEL', KEYS[2] .. suffix, unpack(ARGV))
+    redis.call('SADD', KEYS[1] .. suffix .. ':removed', unpack(ARGV))
+end
+return 0
+"""
+
+# Swaps the rebuilt board (KEYS[4], KEYS[5]) in for the live one (KEYS[1],
+# KEYS[2]) without the users removed meanwhile (KEYS[6]), marks it built
+# (KEYS[3]) at ARGV[1] and ends the rebuild (KEYS[7]).
+SWAP_BOARD_SCRIPT = """
+for _, user_id in ipairs(redis.call('SMEMBERS', KEYS[6])) do
+    redis.call('ZREM', KEYS[4], user_id)
+    redis.call('HDEL', KEYS[5], user_id)
+end
+for i = 1, 2 do
+    if redis.call('EXISTS', KEYS[i + 3]) == 1 then
+        redis.call('RENAME', KEYS[i + 3], KEYS[i])
+    else
+        redis.call('DEL', KEYS[i])
+    end
+end
+redis.call('SET', KEYS[3], ARGV[1])
+redis.call('DEL', KEYS[6], KEYS[7])
+return 0
+"""
+
+
+class CreatorLeaderboard:
+    """
+    All-time creator leaderboard kept in Redis.
+
+    A sorted set ranks user IDs by reputation_score, and a hash holds each
+    creator's serialized leaderboard row, so pages and rank lookups are
+    served from Redis alone. Entries are written whenever the scoring
+    engine stores new reputations and removed when a user is deleted; the
+    nightly rebuild catches anything missed. Reads return None while the
+    board is unavailable, and the first read that finds it missing queues
+    a rebuild.
+    """
+
+    def __init__(self):
+        self.key_prefix = getattr(settings, 'LEADERBOARD_KEY_PREFIX', 'leaderboard')
+        self.scores_key = f"{self.key_prefix}:creators"
+        self.rows_key = f"{self.key_prefix}:rows"
+        self.built_key = f"{self.key_prefix}:built"
+        # Holds the key suffix of the rebuild in progress, writes go to both boards meanwhile
+        self.rebuilding_key = f"{self.key_prefix}:rebuilding"
+        self.rebuild_timeout = getattr(settings, 'LEADERBOARD_REBUILD_TIMEOUT', 60 * 60)
+        self.schedule_key = f"{self.key_prefix}:rebuild_scheduled"
+        # A rebuild queued on a read is retried after this many seconds if the board is still missing
+        self.rebuild_retry = getattr(settings, 'LEADERBOARD_REBUILD_RETRY', 60 * 10)
+
+    def _get_redis(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+
+    def _serialize(self, creators) -> Dict[str, str]:
+        from ..serializers import CreatorProfileSerializer
+        return {
+            str(creator.user_id): json.dumps(row, default=str)
+            for creator, row in zip(creators, CreatorProfileSerializer(creators, many=True).data)
+        }
+
+    def update(self, creators: Iterable):
+        """Store the score and row of these CreatorProfiles (with user loaded)."""
+        creators = list(creators)
+        if not creators:
+            return
+        rows = self._serialize(creators)
+        args = []
+        for creator in creators:
+            args += [str(creator.user_id), creator.reputation_score, rows[str(creator.user_id)]]
+        try:
+            self._get_redis().eval(
+                UPDATE_ENTRIES_SCRIPT, 3, self.scores_key, self.rows_key, self.rebuilding_key, *args
+            )
+        except Exception as e:
+            logger.error(f"Error updating leaderboard for {len(creators)} creators: {e}")
+
+    def remove(self, user_ids: Iterable, chunk_size: int = 1000):
+        """Drop these users from the board, in chunks of chunk_size."""
+        user_ids = [str(user_id) for user_id in user_ids]
+        try:
+            redis_conn = self._get_redis()
+            for start in range(0, len(user_ids), chunk_size):
+                redis_conn.eval(
+                    REMOVE_ENTRIES_SCRIPT, 3, self.scores_key, self.rows_key, self.rebuilding_key,
+                    *user_ids[start:start + chunk_size]
+                )
+        except Exception as e:
+            logger.error(f"Error removing {len(user_ids)} users from leaderboard: {e}")
+
+    def _rows(self, redis_conn, user_ids: List[bytes], first_rank: int) -> List[dict]:
+        rows = []
+        if not user_ids:
+            return rows
+        for rank, row in enumerate(redis_conn.hmget(self.rows_key, user_ids), start=first_rank):
+            if row is not None:
+                rows.append({'rank': rank, **json.loads(row)})
+        return rows
+
+    def get_page(self, offset: int = 0, limit: int = 50) -> Optional[List[dict]]:
+        """Rows ranked offset + 1 to offset + limit, None if the board is unavailable."""
+        try:
+            redis_conn = self._get_redis()
+            pipe = redis_conn.pipeline()
+            pipe.exists(self.built_key)
+            pipe.zrevrange(self.scores_key, offset, offset + limit - 1)
+            built, user_ids = pipe.execute()
+            if not built:
+                self._schedule_rebuild(redis_conn)
+                return None
+            return self._rows(redis_conn, user_ids, offset + 1)
+        except Exception as e:
+            logger.error(f"Error reading leaderboard page at {offset}: {e}")
+            return None
+
+    def get_around(self, user_id, radius: int = 5) -> Optional[dict]:
+        """
+        A user's rank with the creators ranked just above and below them.
+        'rank' is None when the user is not on the board. None if the board is unavailable.
+        """
+        try:
+            redis_conn = self._get_redis()
+            pipe = redis_conn.pipeline()
+            pipe.exists(self.built_key)
+            pipe.zrevrank(self.scores_key, str(user_id))
+            pipe.zcard(self.scores_key)
+            built, rank, total = pipe.execute()
+            if not built:
+                self._schedule_rebuild(redis_conn)
+                return None
+            if rank is None:
+                return {'rank': None, 'total': total, 'entry': None, 'around': []}
+
+            start = max(rank - radius, 0)
+            around = self._rows(redis_conn, redis_conn.zrevrange(self.scores_key, start, rank + radius), start + 1)
+            entry = next((row for row in around if row['rank'] == rank + 1), None)
+            return {'rank': rank + 1, 'total': total, 'entry': entry, 'around': around}
+        except Exception as e:
+            logger.error(f"Error reading leaderboard rank of user {user_id}: {e}")
+            return None
+
+    def _schedule_rebuild(self, redis_conn):
+        """Queue one rebuild when a read finds the board missing, e.g. after a deploy or a Redis flush."""
+        try:
+            if redis_conn.set(self.schedule_key, 1, nx=True, ex=self.rebuild_retry):
+                from ..tasks import rebuild_leaderboard
+                rebuild_leaderboard.apply_async(retry=False)
+        except Exception as e:
+            logger.error(f"Error scheduling a leaderboard rebuild: {e}")
+
+    def rebuild(self, chunk_size: int = 1000) -> int:
+        """
+        Rebuild the board from every CreatorProfile and atomically swap it in.
+        Entries updated or removed meanwhile are written to both boards.
+        Does nothing and returns 0 while another rebuild is running.
+        """
+        from ..scoring import creator_queryset
+
+        redis_conn = self._get_redis()
+        tmp_suffix = f":rebuild:{int(time.time())}"
+        if not redis_conn.set(self.rebuilding_key, tmp_suffix, nx=True, ex=self.rebuild_timeout):
+            logger.info("Another leaderboard rebuild is running, skipping")
+            return 0
+        scores_tmp, rows_tmp = self.scores_key + tmp_suffix, self.rows_key + tmp_suffix
+        removed_tmp = f"{scores_tmp}:removed"
+
+        count = 0
+        last_id = 0
+        try:
+            while True:
+                creators = list(creator_queryset().filter(id__gt=last_id).order_by('id')[:chunk_size])
+                if not creators:
+                    break
+                # An entry already there was written by update() after this chunk was read, keep it
+                pipe = redis_conn.pipeline()
+                pipe.zadd(scores_tmp, {str(creator.user_id): creator.reputation_score for creator in creators}, nx=True)
+                for user_id, row in self._serialize(creators).items():
+                    pipe.hsetnx(rows_tmp, user_id, row)
+                pipe.execute()
+                count += len(creators)
+                last_id = creators[-1].id
+        except Exception:
+            redis_conn.delete(self.rebuilding_key, scores_tmp, rows_tmp, removed_tmp)
+            raise
+
+        redis_conn.eval(
+            SWAP_BOARD_SCRIPT, 7, self.scores_key, self.rows_key, self.built_key,
+            scores_tmp, rows_tmp, removed_tmp, self.rebuilding_key, int(time.time())
+        )
+
+        logger.info(f"Rebuilt leaderboard with {count} creators")
+        return count
+
+
+# Singleton instance
+creator_leaderboard = CreatorLeaderboard()
@@ -0,0 +1,137 @@
+# users/services/rollup_service.py
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from collections import defaultdict
+from datetime import timedelta
+from typing import Iterable, List, Optional, Tuple
+import logging
+
+from ..models import CreatorDailyStats, User
+
+logger = logging.getLogger(__name__)
+
+# Rolling windows, in days including today
+WINDOWS = {'week': 7, 'month': 30}
+
+
+def _merge(entries: Iterable[Tuple]) -> List[Tuple]:
+    """Sum (user_id, date, votes, score, posts) entries per (user, date), in a fixed lock order."""
+    totals = defaultdict(lambda: [0, 0, 0])
+    for user_id, day, votes, score, posts in entries:
+        total = totals[(str(user_id), day)]
+        total[0] += votes
+        total[1] += score
+        total[2] += posts
+    return [(user_id, day, *total) for (user_id, day), total in sorted(totals.items()) if any(total)]
+
+
+def _record_postgresql(rows):
+    table = CreatorDailyStats._meta.db_table
+    values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(rows))
+    sql = f"""
+        INSERT INTO {table} (user_id, date, vote_count, score, post_count)
+        VALUES {values}
+        ON CONFLICT (user_id, date) DO UPDATE SET
+            vote_count = {table}.vote_count + EXCLUDED.vote_count,
+            score = {table}.score + EXCLUDED.score,
+            post_count = {table}.post_count + EXCLUDED.post_count
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+
+
+def _record_generic(rows):
+    for user_id, day, votes, score, posts in rows:
+        deltas = {
+            'vote_count': F('vote_count') + votes,
+            'score': F('score') + score,
+            'post_count': F('post_count') + posts,
+        }
+        if CreatorDailyStats.objects.filter(user_id=user_id, date=day).update(**deltas):
+            continue
+        try:
+            with transaction.atomic():
+                CreatorDailyStats.objects.create(
+                    user_id=user_id, date=day, vote_count=votes, score=score, post_count=posts
+                )
+        except IntegrityError:
+            # Created concurrently
+            CreatorDailyStats.objects.filter(user_id=user_id, date=day).update(**deltas)
+
+
+def record_activity(entries: Iterable[Tuple]):
+    """
+    Add (user_id, date, votes, score, posts) deltas to the daily rollups,
+    creating missing rows. One statement for the whole batch on PostgreSQL.
+    """
+    rows = _merge(entries)
+    if not rows:
+        return
+    if connection.vendor == 'postgresql':
+        _record_postgresql(rows)
+    else:
+        _record_generic(rows)
+
+
+def window_start(window: str, today=None):
+    today = today or timezone.localdate()
+    return today - timedelta(days=WINDOWS[window] - 1)
+
+
+def _cache_key(window: str, limit: int) -> str:
+    return f"leaderboard:{window}:{limit}"
+
+
+def build_window_leaderboard(window: str, limit: int = 50) -> List[dict]:
+    """Top creators by score over a rolling window, summed from the daily rollups."""
+    from ..serializers import UserSerializer
+
+    totals = list(
+        CreatorDailyStats.objects.filter(date__gte=window_start(window))
+        .values('user_id')
+        .annotate(score_total=Sum('score'), vote_total=Sum('vote_count'), post_total=Sum('post_count'))
+        .filter(score_total__gt=0)
+        .order_by('-score_total', '-vote_total', 'user_id')[:limit]
+    )
+    users = User.objects.in_bulk([row['user_id'] for row in totals])
+    serialized = {
+        row['id']: row for row in
+        UserSerializer([users[row['user_id']] for row in totals if row['user_id'] in users], many=True).data
+    }
+
+    rows = []
+    for row in totals:
+        user = serialized.get(str(row['user_id']))
+        if user is None:
+            continue
+        rows.append({
+            'rank': len(rows) + 1,
+            'user': user,
+            'score': row['score_total'],
+            'vote_count': row['vote_total'],
+            'post_count': row['post_total'],
+        })
+    return rows
+
+
+def get_window_leaderboard(window: str, limit: int = 50) -> List[dict]:
+    """Cached windowed leaderboard, rebuilt at most every LEADERBOARD_WINDOW_CACHE_TTL seconds."""
+    key = _cache_key(window, limit)
+    try:
+        rows: Optional[List[dict]] = cache.get(key)
+    except Exception as e:
+        logger.error(f"Error reading cached {window} leaderboard: {e}")
+        rows = None
+    if rows is not None:
+        return rows
+
+    rows = build_window_leaderboard(window, limit)
+    try:
+        cache.set(key, rows, getattr(settings, 'LEADERBOARD_WINDOW_CACHE_TTL', 300))
+    except Exception as e:
+        logger.error(f"Error caching {window} leaderboard: {e}")
+    return rows
@@ -0,0 +1,114 @@
+# users/services/user_cache.py
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class UserLookupCache:
+    """
+    Two-tier cache of the User fields request authentication needs.
+
+    Entries are looked up in a small in-process LRU first, then in the shared
+    cache (Redis), and only then in the database. Only the fields in
+    `fields` and an MD5 marker of the password hash (the one simplejwt's
+    revoke check compares) are stored, so no password hash reaches the
+    shared cache and no profile field or counter is served stale: the
+    returned user loads any other field from the database on access.
+
+    Saving or deleting a user drops both tiers in this process and the
+    shared entry; other processes' in-process copies expire after local_ttl
+    seconds, which bounds how long a deactivation or password change can go
+    unnoticed there.
+    """
+
+    fields = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+        self.local_ttl = getattr(settings, 'AUTH_USER_CACHE_LOCAL_TTL', 5)
+        self.local_size = getattr(settings, 'AUTH_USER_CACHE_LOCAL_SIZE', 1024)
+        self.key_prefix = getattr(settings, 'AUTH_USER_CACHE_KEY_PREFIX', 'auth_user')
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_key(self, user_id) -> str:
+        return f"{self.key_prefix}:{user_id}"
+
+    def _get_local(self, key: str):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires, fields = entry
+            if expires < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return fields
+
+    def _set_local(self, key: str, entry: dict):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl, entry)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _to_user(self, entry: dict):
+        # The other fields are deferred, Django loads them on first access
+        from ..models import User
+        # from_db expects the values in model field order
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in self.fields]
+        return User.from_db(None, field_names, [entry[name] for name in field_names])
+
+    def get(self, user_id) -> Optional[Tuple[object, str]]:
+        """(user, password marker) of a cached user, None on a miss."""
+        key = self._get_key(user_id)
+        entry = self._get_local(key)
+        if entry is None:
+            try:
+                entry = cache.get(key)
+            except Exception as e:
+                logger.error(f"Error reading cached user {user_id}: {e}")
+                return None
+            if entry is None:
+                return None
+            self._set_local(key, entry)
+        # A fresh instance per request, requests may set attributes on their user
+        return self._to_user(entry), entry['password_marker']
+
+    def set(self, user_id, user):
+        key = self._get_key(user_id)
+        entry = {field: getattr(user, field) for field in self.fields}
+        entry['password_marker'] = get_md5_hash_password(user.password)
+        self._set_local(key, entry)
+        try:
+            cache.set(key, entry, self.ttl)
+        except Exception as e:
+            logger.error(f"Error caching user {user_id}: {e}")
+
+    def invalidate(self, *user_ids):
+        keys = [self._get_key(user_id) for user_id in user_ids]
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        try:
+            cache.delete_many(keys)
+        except Exception as e:
+            logger.error(f"Error invalidating cached users {user_ids}: {e}")
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+
+# Singleton instance
+user_lookup_cache = UserLookupCache()
@@ -0,0 +1,25 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+from .services.leaderboard_service import creator_leaderboard
+from .services.user_cache import user_lookup_cache
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drops the user from the authentication cache once a username change,
+    password change or deactivation is committed.
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: user_lookup_cache.invalidate(user_id))
+
+
+@receiver(post_delete, sender=User)
+def remove_from_leaderboard(sender, instance, **kwargs):
+    """Takes a deleted user off the creator leaderboard once the delete is committed."""
+    user_id = instance.pk
+    transaction.on_commit(lambda: creator_leaderboard.remove([user_id]))
@@ -0,0 +1,35 @@
+from celery import shared_task
+from .recommendations import compute_recommendations
+from .services.follow_graph import follow_graph
+from .services.leaderboard_service import creator_leaderboard
+
+
+@shared_task
+def rebuild_follow_graph():
+    """
+    Scheduled task (Celery Beat) that reloads the Redis follow graph
+    from the Follow table, dropping any drift. Also queued by the
+    first read that finds the graph missing.
+    """
+    count = follow_graph.rebuild()
+    return f"Rebuilt follow graph with {count} edges"
+
+
+@shared_task
+def rebuild_leaderboard():
+    """
+    Rebuild the creator leaderboard from the database, queued by
+    the first read that finds the board missing.
+    """
+    count = creator_leaderboard.rebuild()
+    return f"Rebuilt leaderboard with {count} creators"
+
+
+@shared_task
+def compute_who_to_follow():
+    """
+    Scheduled task (Celery Beat) that recomputes every user's
+    who-to-follow suggestions from the follow and vote matrices.
+    """
+    stored = compute_recommendations()
+    return f"Stored suggestions for {stored} users"
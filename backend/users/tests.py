@@ -1,3 +1,272 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+import numpy as np
+from fakeredis import FakeConnection
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import CreatorProfile, Follow, User
+from .recommendations import InteractionGraph, _matrix, compute_recommendations, get_recommendations, score_chunk
+from .services.leaderboard_service import creator_leaderboard
+from .services.user_cache import user_lookup_cache
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+FAKE_REDIS_CACHES = {'default': {
+    'BACKEND': 'django_redis.cache.RedisCache',
+    'LOCATION': 'redis://fakeredis:6379/0',
+    'OPTIONS': {'CONNECTION_POOL_KWARGS': {'connection_class': FakeConnection}},
+}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LeaderboardViewerTests(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create(username='viewer')
+        self.creators = [User.objects.create(username=f'creator{i}') for i in range(3)]
+        for score, user in enumerate([self.viewer] + self.creators):
+            CreatorProfile.objects.create(user=user, reputation_score=score)
+        Follow.objects.create(user_from=self.viewer, user_to=self.creators[1])
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def following(self, rows):
+        return {row['user']['username'] for row in rows if row['user']['is_following']}
+
+    def test_leaderboard_rows_are_overlaid_per_viewer(self):
+        response = self.client.get('/api/users/leaderboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.following(response.data), {'creator1'})
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.following(self.client.get('/api/users/leaderboard/').data), set())
+
+    def test_rank_rows_are_overlaid_per_viewer(self):
+        response = self.client.get('/api/users/leaderboard/me/', {'radius': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.following(response.data['around']), {'creator1'})
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHES)
+class LeaderboardRebuildTests(TestCase):
+    def setUp(self):
+        get_redis_connection('default').flushdb()
+        self.users = [User.objects.create(username=f'creator{i}') for i in range(3)]
+        self.profiles = [
+            CreatorProfile.objects.create(user=user, reputation_score=score) for score, user in enumerate(self.users)
+        ]
+
+    def ranking(self):
+        return [row['user']['username'] for row in creator_leaderboard.get_page()]
+
+    def test_first_read_queues_one_rebuild(self):
+        with mock.patch('users.tasks.rebuild_leaderboard.apply_async') as apply_async:
+            self.assertIsNone(creator_leaderboard.get_page())
+            self.assertIsNone(creator_leaderboard.get_around(self.users[0].pk))
+        apply_async.assert_called_once()
+
+        creator_leaderboard.rebuild()
+        self.assertEqual(self.ranking(), ['creator2', 'creator1', 'creator0'])
+
+    def test_writes_during_a_rebuild_are_kept(self):
+        serialize = creator_leaderboard._serialize
+        written = []
+
+        def serialize_and_write(creators):
+            if not written:
+                # Scores stored and a user deleted while the rebuild is running
+                written.append(True)
+                self.profiles[0].reputation_score = 10
+                creator_leaderboard.update([self.profiles[0]])
+                creator_leaderboard.remove([self.users[1].pk])
+            return serialize(creators)
+
+        with mock.patch.object(creator_leaderboard, '_serialize', side_effect=serialize_and_write):
+            creator_leaderboard.rebuild()
+        self.assertEqual(self.ranking(), ['creator0', 'creator2'])
+        self.assertFalse(get_redis_connection('default').keys('*:rebuild:*'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        user_lookup_cache.clear_local()
+        self.user = User.objects.create_user(username='member', password='secret-1')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_cache_holds_auth_fields_only(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        entry = cache.get(user_lookup_cache._get_key(self.user.pk))
+        self.assertEqual(set(entry), set(user_lookup_cache.fields) | {'password_marker'})
+        self.assertNotIn(self.user.password, entry.values())
+
+    def test_me_is_not_served_from_the_cache(self):
+        self.client.get('/api/users/me/')
+        # Counters written with queryset updates bypass post_save
+        User.objects.filter(pk=self.user.pk).update(total_points=F('total_points') + 3, follower_count=2)
+
+        data = self.client.get('/api/users/me/').data
+        self.assertEqual((data['total_points'], data['follower_count']), (3, 2))
+
+    def test_deactivation_is_seen_through_the_cache(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHES)
+class FollowCountTests(TestCase):
+    def setUp(self):
+        get_redis_connection('default').flushdb()
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def counts(self, user):
+        user.refresh_from_db()
+        return user.follower_count, user.following_count
+
+    def toggle(self, username):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/users/follow/{username}/')
+
+    def test_toggle_follow_keeps_counts(self):
+        self.assertEqual(self.toggle('bob').status_code, 201)
+        self.assertEqual((self.counts(self.alice), self.counts(self.bob)), ((0, 1), (1, 0)))
+
+        self.assertEqual(self.toggle('bob').status_code, 200)
+        self.assertEqual((self.counts(self.alice), self.counts(self.bob)), ((0, 0), (0, 0)))
+
+    def test_self_follow_changes_nothing(self):
+        self.assertEqual(self.toggle('alice').status_code, 400)
+        self.assertEqual(self.counts(self.alice), (0, 0))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_unfollow_never_goes_negative(self):
+        Follow.objects.create(user_from=self.alice, user_to=self.bob)
+        self.assertEqual(self.toggle('bob').status_code, 200)
+        self.assertEqual((self.counts(self.alice), self.counts(self.bob)), ((0, 0), (0, 0)))
+
+    def test_repair_follow_counts(self):
+        carol = User.objects.create(username='carol')
+        Follow.objects.create(user_from=self.alice, user_to=self.bob)
+        Follow.objects.create(user_from=carol, user_to=self.bob)
+        User.objects.filter(pk=carol.pk).update(follower_count=4)
+
+        out = StringIO()
+        call_command('repair_follow_counts', '--dry-run', stdout=out)
+        self.assertIn('Found 3 users', out.getvalue())
+        self.assertEqual(self.counts(self.bob), (0, 0))
+
+        call_command('repair_follow_counts', '--batch-size', '2', stdout=out)
+        self.assertIn('Repaired 3 users', out.getvalue())
+        self.assertEqual(
+            [self.counts(user) for user in (self.alice, self.bob, carol)], [(0, 1), (2, 0), (0, 1)]
+        )
+        call_command('repair_follow_counts', stdout=out)
+        self.assertIn('Repaired 0 users', out.getvalue())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FollowListTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='owner')
+        self.viewer = User.objects.create(username='viewer')
+        self.followed = [User.objects.create(username=f'followed{i}') for i in range(5)]
+        now = timezone.now()
+        for i, user in enumerate(self.followed):
+            follow = Follow.objects.create(user_from=self.owner, user_to=user)
+            Follow.objects.filter(pk=follow.pk).update(created_at=now - timedelta(minutes=i))
+        Follow.objects.create(user_from=self.viewer, user_to=self.followed[3])
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def pages(self, url, limit):
+        pages = []
+        params = {'limit': limit}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data['results'])
+            url, params = response.data['next'], None
+        return pages
+
+    def test_following_pages_most_recent_first(self):
+        pages = self.pages('/api/users/owner/following/', 2)
+        self.assertEqual(
+            [[row['username'] for row in page] for page in pages],
+            [['followed0', 'followed1'], ['followed2', 'followed3'], ['followed4']],
+        )
+        following = {row['username'] for page in pages for row in page if row['is_following']}
+        self.assertEqual(following, {'followed3'})
+
+    def test_followers_list_the_other_side(self):
+        [page] = self.pages('/api/users/followed3/followers/', 10)
+        self.assertEqual([row['username'] for row in page], ['viewer', 'owner'])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/api/users/owner/following/', {'limit': 1000})
+        self.assertEqual(len(response.data['results']), 5)
+        with mock.patch('users.views.FollowCursorPagination.max_page_size', 3):
+            response = self.client.get('/api/users/owner/following/', {'limit': 1000})
+        self.assertEqual(len(response.data['results']), 3)
+
+
+class ScoreChunkTests(TestCase):
+    def graph(self, follows, votes, post_authors, active):
+        n, m = len(active), len(post_authors)
+        return InteractionGraph(
+            list(range(n)), np.asarray(active, dtype=np.float64),
+            _matrix(*map(np.asarray, zip(*follows)), (n, n)),
+            _matrix(*map(np.asarray, zip(*votes)), (n, m)),
+            _matrix(np.arange(m), np.asarray(post_authors), (m, n)),
+        )
+
+    def candidates(self, graph, start, stop):
+        scores = score_chunk(graph, start, stop)
+        return [sorted(scores[i].indices.tolist()) for i in range(stop - start)]
+
+    def test_self_followed_and_inactive_users_are_masked(self):
+        # 0 follows 1, who follows 0, 2 and 3; 0 also voted on posts of 1 and 4; 3 is inactive
+        graph = self.graph(
+            follows=[(0, 1), (1, 0), (1, 2), (1, 3)],
+            votes=[(0, 0), (0, 1)], post_authors=[1, 4], active=[1, 1, 1, 0, 1],
+        )
+        self.assertEqual(self.candidates(graph, 0, 1), [[2, 4]])
+
+    def test_masks_line_up_with_the_chunk_offset(self):
+        # Two hops lead 2 back to itself and to 3, whom it follows, and lead 3 back to itself
+        graph = self.graph(
+            follows=[(2, 0), (2, 3), (3, 2), (3, 4), (0, 3)],
+            votes=[(0, 0)], post_authors=[1], active=[1, 1, 1, 1, 1],
+        )
+        self.assertEqual(self.candidates(graph, 2, 4), [[4], [0]])
+        self.assertEqual(self.candidates(graph, 0, 5)[2:4], [[4], [0]])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ComputeRecommendationsTests(TestCase):
+    def test_suggestions_skip_followed_and_inactive_users(self):
+        viewer, friend, candidate, followed, inactive = (
+            User.objects.create(username=name) for name in ('viewer', 'friend', 'candidate', 'followed', 'inactive')
+        )
+        User.objects.filter(pk=inactive.pk).update(is_active=False)
+        Follow.objects.create(user_from=viewer, user_to=friend)
+        Follow.objects.create(user_from=viewer, user_to=followed)
+        for user in (viewer, candidate, followed, inactive):
+            Follow.objects.create(user_from=friend, user_to=user)
+
+        compute_recommendations(chunk_size=2)
+        self.assertEqual([user_id for user_id, _ in get_recommendations(viewer.pk)], [str(candidate.pk)])
@@ -2,7 +2,8 @@ from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     RegisterView, UserProfileView, CurrentUserView, CustomTokenObtainPairView,
-    LeaderboardView, UpdateProfileView, toggle_follow, FollowingListView, FollowersListView
+    LeaderboardView, LeaderboardRankView, WindowedLeaderboardView, UpdateProfileView, toggle_follow, FollowingListView, FollowersListView,
+    FollowedFollowersView, WhoToFollowView
 )
 
 urlpatterns = [
@@ -12,8 +13,13 @@ urlpatterns = [
     path('profile/<str:username>/', UserProfileView.as_view(), name='user-profile'),
     path('me/', CurrentUserView.as_view(), name='current-user'),
     path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('leaderboard/me/', LeaderboardRankView.as_view(), name='leaderboard-rank'),
+    path('leaderboard/week/', WindowedLeaderboardView.as_view(window='week'), name='leaderboard-week'),
+    path('leaderboard/month/', WindowedLeaderboardView.as_view(window='month'), name='leaderboard-month'),
     path('update-profile/<uuid:user_id>/', UpdateProfileView.as_view(), name='update_profile'),
     path('follow/<str:username>/', toggle_follow, name='toggle_follow'),
+    path('who-to-follow/', WhoToFollowView.as_view(), name='who_to_follow'),
     path('<str:username>/following/', FollowingListView.as_view(), name='following_list'),
     path('<str:username>/followers/', FollowersListView.as_view(), name='followers_list'),
+    path('<str:username>/followers/followed/', FollowedFollowersView.as_view(), name='followed_followers'),
 ]
\ No newline at end of file
@@ -10,7 +10,14 @@ from .serializers import (
 )
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination
+from posts.services.viewer_context import ViewerContext
+from .recommendations import TOP_K, get_recommendations
+from .services.follow_graph import follow_graph
+from .services.follow_service import follow, unfollow
+from .services.leaderboard_service import creator_leaderboard
+from .services.rollup_service import get_window_leaderboard
 
 
 class RegisterView(generics.CreateAPIView):
@@ -24,35 +31,14 @@ class UserProfileView(generics.RetrieveAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'username'
-    
-    def get_queryset(self):
-        queryset = User.objects.annotate(
-            follower_count=Count('follower_set', distinct=True),
-            following_count=Count('following_set', distinct=True)
-        )
-        
-        if self.request.user.is_authenticated:
-            queryset = queryset.annotate(
-                is_following=Exists(
-                    Follow.objects.filter(
-                        user_from=self.request.user,
-                        user_to=OuterRef('pk')
-                    )
-                )
-            )
-        
-        return queryset
 
 
 class CurrentUserView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        user = User.objects.annotate(
-            follower_count=Count('follower_set', distinct=True),
-            following_count=Count('following_set', distinct=True)
-        ).get(pk=request.user.pk)
-        
+        # request.user only has the cached auth fields, load the current profile and counters
+        user = User.objects.get(pk=request.user.pk)
         serializer = UserSerializer(user, context={'request': request})
         return Response(serializer.data)
 
@@ -61,13 +47,91 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
+def _viewer_rows(request, rows):
+    """
+    Rows are serialized once for every viewer, so local media URLs are still
+    relative and user.is_following is unset. Fill both in for this request.
+    """
+    context = ViewerContext.for_request(request)
+    context.load(author_ids=[row['user']['id'] for row in rows])
+    for row in rows:
+        avatar = row['user'].get('avatar')
+        if avatar and avatar.startswith('/'):
+            row['user']['avatar'] = request.build_absolute_uri(avatar)
+        row['user']['is_following'] = context.is_following(row['user']['id'])
+    return rows
+
+
 class LeaderboardView(APIView):
     permission_classes = []
+    max_limit = 100
+
+    def get(self, request):
+        try:
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), self.max_limit)
+        except ValueError:
+            return Response({'error': 'offset and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = creator_leaderboard.get_page(offset, limit)
+        if rows is None:
+            creators = CreatorProfile.objects.select_related('user').order_by('-reputation_score')[offset:offset + limit]
+            rows = [
+                {'rank': rank, **row} for rank, row in
+                enumerate(CreatorProfileSerializer(creators, many=True).data, start=offset + 1)
+            ]
+        return Response(_viewer_rows(request, rows), status=status.HTTP_200_OK)
+
+
+class WindowedLeaderboardView(APIView):
+    permission_classes = []
+    window = 'week'
+    max_limit = 100
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), self.max_limit)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = get_window_leaderboard(self.window, limit)
+        return Response(_viewer_rows(request, rows), status=status.HTTP_200_OK)
+
+
+class LeaderboardRankView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    max_radius = 25
 
     def get(self, request):
-        creators = CreatorProfile.objects.select_related('user').order_by('-reputation_score')[:50]
-        serializer = CreatorProfileSerializer(creators, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            radius = min(max(int(request.query_params.get('radius', 5)), 0), self.max_radius)
+        except ValueError:
+            return Response({'error': 'radius must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = creator_leaderboard.get_around(request.user.pk, radius)
+        if data is None:
+            data = self._get_around_from_db(request.user, radius)
+        if data['rank'] is None:
+            return Response({'error': 'Not on the leaderboard'}, status=status.HTTP_404_NOT_FOUND)
+
+        _viewer_rows(request, data['around'])
+        return Response(data, status=status.HTTP_200_OK)
+
+    def _get_around_from_db(self, user, radius):
+        total = CreatorProfile.objects.count()
+        profile = CreatorProfile.objects.filter(user=user).first()
+        if profile is None:
+            return {'rank': None, 'total': total, 'entry': None, 'around': []}
+
+        rank = CreatorProfile.objects.filter(reputation_score__gt=profile.reputation_score).count() + 1
+        start = max(rank - 1 - radius, 0)
+        creators = CreatorProfile.objects.select_related('user').order_by('-reputation_score')[start:rank + radius]
+        around = [
+            {'rank': i, **row} for i, row in
+            enumerate(CreatorProfileSerializer(creators, many=True).data, start=start + 1)
+        ]
+        entry = next((row for row in around if row['user']['id'] == str(user.pk)), None)
+        return {'rank': rank, 'total': total, 'entry': entry, 'around': around}
 
 
 class UpdateProfileView(APIView):
@@ -86,6 +150,8 @@ class UpdateProfileView(APIView):
         
         if serializer.is_valid():
             serializer.save()
+            # The cached leaderboard row shows bio and avatar
+            creator_leaderboard.update(CreatorProfile.objects.select_related('user').filter(user=user))
             return Response(serializer.data, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -99,65 +165,114 @@ def toggle_follow(request, username):
     if request.user == target_user:
         return Response({'error': 'Cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
     
-    follow = Follow.objects.filter(user_from=request.user, user_to=target_user).first()
-    
-    if follow:
-        follow.delete()
+    if unfollow(request.user, target_user):
         return Response({'following': False, 'message': f'Unfollowed {username}'}, status=status.HTTP_200_OK)
-    else:
-        Follow.objects.create(user_from=request.user, user_to=target_user)
-        return Response({'following': True, 'message': f'Now following {username}'}, status=status.HTTP_201_CREATED)
+    
+    follow(request.user, target_user)
+    return Response({'following': True, 'message': f'Now following {username}'}, status=status.HTTP_201_CREATED)
+
+
+class FollowCursorPagination(CursorPagination):
+    # Keyset pagination on the (user_from, -created_at) and (user_to, -created_at) indexes
+    page_size = 50
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = '-created_at'
+    cursor_query_param = 'cursor'
 
 
-class FollowingListView(APIView):
+class FollowListView(generics.GenericAPIView):
+    """One page of the users on the other side of a user's follow edges, most recent first."""
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FollowCursorPagination
+    # The Follow field holding the listed user, and the one matching the profile owner
+    listed_field = None
+    owner_field = None
+    
+    def get_queryset(self):
+        return Follow.objects.filter(
+            **{self.owner_field: self.owner}
+        ).select_related(self.listed_field)
     
     def get(self, request, username):
-        user = get_object_or_404(User, username=username)
-        
-        following_users = User.objects.filter(
-            follower_set__user_from=user
-        ).annotate(
-            follower_count=Count('follower_set', distinct=True),
-            following_count=Count('following_set', distinct=True)
-        )
+        self.owner = get_object_or_404(User, username=username)
+        page = self.paginate_queryset(self.get_queryset())
+        users = [getattr(follow, self.listed_field) for follow in page]
         
-        if request.user.is_authenticated:
-            following_users = following_users.annotate(
-                is_following=Exists(
-                    Follow.objects.filter(
-                        user_from=request.user,
-                        user_to=OuterRef('pk')
-                    )
-                )
-            )
+        # One lookup for the whole page instead of a subquery per row
+        context = ViewerContext.for_request(request)
+        context.load(author_ids=[user.pk for user in users])
+        for user in users:
+            user.is_following = context.is_following(user.pk)
         
-        serializer = UserSerializer(following_users, many=True, context={'request': request})
-        return Response(serializer.data)
+        serializer = UserSerializer(users, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
 
 
-class FollowersListView(APIView):
+class FollowedFollowersView(APIView):
+    """Followers of a user that the viewer follows, from the Redis follow graph."""
     permission_classes = [permissions.IsAuthenticated]
+    max_limit = 50
     
     def get(self, request, username):
-        user = get_object_or_404(User, username=username)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        target = get_object_or_404(User, username=username)
+        user_ids = follow_graph.followed_followers(request.user.pk, target.pk)
+        if user_ids is None:
+            user_ids = Follow.objects.filter(
+                user_to=target,
+                user_from__in=Follow.objects.filter(user_from=request.user).values('user_to')
+            ).values_list('user_from_id', flat=True)
         
-        follower_users = User.objects.filter(
-            following_set__user_to=user
-        ).annotate(
-            follower_count=Count('follower_set', distinct=True),
-            following_count=Count('following_set', distinct=True)
-        )
+        users = User.objects.filter(pk__in=list(user_ids)).order_by('-follower_count', 'username')[:limit]
+        for user in users:
+            # The viewer follows every one of them
+            user.is_following = True
+        serializer = UserSerializer(users, many=True, context={'request': request})
+        return Response({'count': len(user_ids), 'results': serializer.data})
+
+
+class WhoToFollowView(APIView):
+    """Follow suggestions precomputed by the nightly recommendation job, see users.recommendations."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), TOP_K)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if request.user.is_authenticated:
-            follower_users = follower_users.annotate(
-                is_following=Exists(
-                    Follow.objects.filter(
-                        user_from=request.user,
-                        user_to=OuterRef('pk')
-                    )
-                )
-            )
+        suggestions = get_recommendations(request.user.pk)
         
-        serializer = UserSerializer(follower_users, many=True, context={'request': request})
-        return Response(serializer.data)
\ No newline at end of file
+        # Skip users followed since the job ran
+        context = ViewerContext.for_request(request)
+        context.load(author_ids=[user_id for user_id, _ in suggestions])
+        suggestions = [
+            (user_id, score) for user_id, score in suggestions if not context.is_following(user_id)
+        ][:limit]
+        
+        users = {
+            str(user.pk): user for user in
+            User.objects.filter(pk__in=[user_id for user_id, _ in suggestions], is_active=True)
+        }
+        suggestions = [(users[user_id], score) for user_id, score in suggestions if user_id in users]
+        for user, _ in suggestions:
+            user.is_following = False
+        
+        serializer = UserSerializer([user for user, _ in suggestions], many=True, context={'request': request})
+        results = [{'user': row, 'score': score} for row, (_, score) in zip(serializer.data, suggestions)]
+        return Response(results, status=status.HTTP_200_OK)
+
+
+class FollowingListView(FollowListView):
+    listed_field = 'user_to'
+    owner_field = 'user_from'
+
+
+class FollowersListView(FollowListView):
+    listed_field = 'user_from'
+    owner_field = 'user_to'
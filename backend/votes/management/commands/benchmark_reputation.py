@@ -0,0 +1,96 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.models import Post
+from users.models import CreatorProfile
+from users.scoring import creator_queryset, score_creators
+from users.services.leaderboard_service import creator_leaderboard
+from votes.tasks import recalculate_creator_reputation
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the nightly reputation recalculation on synthetic creators: '
+        'one task per creator against chunked grouped aggregates, vectorized scoring and bulk_update. '
+        'Runs in a transaction that is rolled back, on a separate leaderboard'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--creators', type=int, default=100000)
+        parser.add_argument('--posts-per-creator', type=int, default=3)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--sample', type=int, default=1000, help='Creators timed on the per-creator path, then extrapolated')
+        parser.add_argument('--i-know', action='store_true',
+                            help='Run with DEBUG off, e.g. against a production-sized copy of the database')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['i_know']:
+            raise CommandError(
+                'This benchmark writes and scores synthetic creators in the configured database. '
+                'Run it with DEBUG=True, or pass --i-know'
+            )
+
+        run_id = uuid.uuid4().hex[:8]
+        # Scoring writes every creator to the leaderboard, keep them off the live board
+        live_keys = (creator_leaderboard.scores_key, creator_leaderboard.rows_key, creator_leaderboard.rebuilding_key)
+        creator_leaderboard.scores_key, creator_leaderboard.rows_key, creator_leaderboard.rebuilding_key = (
+            f"bench-{run_id}:{key}" for key in live_keys
+        )
+        try:
+            with transaction.atomic():
+                self.run(run_id, options)
+                # Leave the database as it was
+                transaction.set_rollback(True)
+        finally:
+            creator_leaderboard.scores_key, creator_leaderboard.rows_key, creator_leaderboard.rebuilding_key = live_keys
+            redis_conn = creator_leaderboard._get_redis()
+            for key in redis_conn.scan_iter(match=f"bench-{run_id}:*", count=1000):
+                redis_conn.delete(key)
+
+    def run(self, run_id, options):
+        count = options['creators']
+        self.stdout.write(f"Creating {count} synthetic creators...")
+        creator_ids = self.create_creators(run_id, count, options['posts_per_creator'])
+
+        sample = creator_ids[:options['sample']]
+        start = time.perf_counter()
+        for creator_id in sample:
+            # Called inline, so broker overhead is not even counted
+            recalculate_creator_reputation(creator_id)
+        per_creator = (time.perf_counter() - start) / max(len(sample), 1)
+        self.stdout.write(
+            f"one task per creator: {per_creator * 1000:.2f} ms/creator, "
+            f"~{per_creator * count:.0f}s for {count} creators"
+        )
+
+        start = time.perf_counter()
+        for i in range(0, count, options['chunk_size']):
+            chunk = creator_queryset().filter(id__in=creator_ids[i:i + options['chunk_size']])
+            score_creators(chunk)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"chunked bulk: {elapsed * 1000 / count:.2f} ms/creator, {elapsed:.1f}s for {count} creators "
+            f"({per_creator * count / elapsed:.0f}x faster)"
+        ))
+
+    def create_creators(self, run_id, count, posts_per_creator, batch_size=5000):
+        creator_ids = []
+        for start in range(0, count, batch_size):
+            users = User.objects.bulk_create(
+                User(username=f"bench_{run_id}_{i}") for i in range(start, min(start + batch_size, count))
+            )
+            profiles = CreatorProfile.objects.bulk_create(CreatorProfile(user=user) for user in users)
+            Post.objects.bulk_create(
+                Post(user=user, caption='benchmark', status='ready', plus_one_count=i % 7, plus_two_count=i % 5,
+                     total_score=i % 7 + 2 * (i % 5))
+                for user in users for i in range(posts_per_creator)
+            )
+            creator_ids.extend(profile.id for profile in profiles)
+        return creator_ids
@@ -0,0 +1,88 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.models import Post
+from votes.models import Vote
+from votes.services.vote_service import cast_vote
+from votes.services.vote_stream import VoteStream
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare votes/sec on one trending post when votes are applied in the request '
+        'with votes queued in the Redis stream and applied in batches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votes', type=int, default=2000)
+        parser.add_argument('--voters', type=int, default=500, help='Distinct voters, fewer than votes means re-votes')
+        parser.add_argument('--concurrency', type=int, default=16)
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        self.stream = VoteStream()
+        self.stream.stream_key = f"bench-{run_id}:{self.stream.stream_key}"
+        self.stream.pending_key = f"{self.stream.stream_key}:pending"
+
+        self.author = User.objects.create(username=f"bench_{run_id}_author")
+        self.voters = User.objects.bulk_create(
+            User(username=f"bench_{run_id}_{i}") for i in range(options['voters'])
+        )
+        votes = options['votes']
+        try:
+            elapsed, post = self.run(self.sync_vote, options)
+            self.stdout.write(f"  sync: {votes / elapsed:.0f} votes/s ({elapsed:.2f}s)")
+            self.check_counters(post)
+
+            elapsed, post = self.run(self.stream_vote, options)
+            start = time.perf_counter()
+            self.stream.consume()
+            drained = time.perf_counter() - start
+            self.stdout.write(
+                f"stream: {votes / elapsed:.0f} votes/s accepted ({elapsed:.2f}s), "
+                f"{votes / (elapsed + drained):.0f} votes/s including the drain ({drained:.2f}s)"
+            )
+            self.check_counters(post)
+        finally:
+            self.stream._get_redis().delete(self.stream.stream_key, self.stream.pending_key)
+            User.objects.filter(username__startswith=f"bench_{run_id}_").delete()
+
+    def sync_vote(self, user, post_id, value):
+        post = Post.objects.select_related('user', 'category').get(id=post_id)
+        cast_vote(user, post, value)
+
+    def stream_vote(self, user, post_id, value):
+        post = Post.objects.select_related('user', 'category').get(id=post_id)
+        self.stream.append(user.pk, post.pk, value)
+
+    def run(self, vote, options):
+        """Cast votes concurrently on a fresh post, like VoteCreateView requests would."""
+        post = Post.objects.create(user=self.author, caption='benchmark', status='ready')
+
+        def cast(i):
+            try:
+                vote(self.voters[i % len(self.voters)], post.pk, i % 2 + 1)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(cast, range(options['votes'])))
+        return time.perf_counter() - start, post
+
+    def check_counters(self, post):
+        post.refresh_from_db()
+        plus_one = Vote.objects.filter(post=post, value=1).count()
+        plus_two = Vote.objects.filter(post=post, value=2).count()
+        message = f"        counters +1 {post.plus_one_count} / +2 {post.plus_two_count}, votes +1 {plus_one} / +2 {plus_two}"
+        if (post.plus_one_count, post.plus_two_count) == (plus_one, plus_two):
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(self.style.ERROR(f"{message}, counters do not match"))
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from votes.services.reputation_service import recalculate_all
+
+
+class Command(BaseCommand):
+    help = 'Recalculate every creator reputation in chunks, resuming an interrupted run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=getattr(settings, 'REPUTATION_CHUNK_SIZE', 1000))
+        parser.add_argument('--restart', action='store_true', help='Ignore the progress of an interrupted run')
+
+    def handle(self, *args, **options):
+        def progress(processed, total):
+            self.stdout.write(f"{processed}/{total} creators ({processed / max(total, 1):.0%})")
+
+        processed = recalculate_all(chunk_size=options['chunk_size'], restart=options['restart'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Recalculated {processed} creators'))
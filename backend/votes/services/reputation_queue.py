@@ -0,0 +1,67 @@
+# votes/services/reputation_queue.py
+from django.conf import settings
+
+from typing import List
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReputationQueue:
+    """
+    Coalesces creator reputation recalculations.
+
+    Votes add the post author's user ID to a Redis set instead of enqueuing
+    a task each. A periodic job takes the whole set and recalculates every
+    creator in it once, however many votes they received in the window.
+    Creators missed while Redis is unavailable are caught by the nightly decay.
+    """
+
+    def __init__(self):
+        self.key = getattr(settings, 'REPUTATION_DIRTY_KEY', 'reputation_dirty')
+        self.processing_key = f"{self.key}:processing"
+
+    def _get_redis(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+
+    def mark_dirty(self, *user_ids):
+        """Queue a recalculation for these creators (by user ID)."""
+        if not user_ids:
+            return
+        try:
+            self._get_redis().sadd(self.key, *[str(user_id) for user_id in user_ids])
+        except Exception as e:
+            logger.error(f"Error queueing reputation recalculation for {len(user_ids)} creators: {e}")
+
+    def pending_count(self) -> int:
+        try:
+            pipe = self._get_redis().pipeline()
+            pipe.scard(self.key)
+            pipe.scard(self.processing_key)
+            return sum(pipe.execute())
+        except Exception as e:
+            logger.error(f"Error reading reputation queue size: {e}")
+            return 0
+
+    def take(self) -> List[str]:
+        """
+        Move the dirty set aside and return its user IDs, so creators marked
+        meanwhile wait for the next run. A set left by a failed run is returned
+        again. Call done() once they are all recalculated.
+        """
+        redis_conn = self._get_redis()
+        if not redis_conn.exists(self.processing_key):
+            try:
+                redis_conn.rename(self.key, self.processing_key)
+            except Exception:
+                # No votes since the last run
+                return []
+        return [user_id.decode() for user_id in redis_conn.smembers(self.processing_key)]
+
+    def done(self):
+        self._get_redis().delete(self.processing_key)
+
+
+# Singleton instance
+reputation_queue = ReputationQueue()
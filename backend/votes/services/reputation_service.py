@@ -0,0 +1,64 @@
+# votes/services/reputation_service.py
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from typing import Callable, List, Optional
+import logging
+
+from users.models import CreatorProfile
+from users.scoring import GLOBAL_AVG_RATING, MIN_RATINGS, creator_queryset, score_creators
+
+logger = logging.getLogger(__name__)
+
+# Where an interrupted full recalculation resumes from
+CURSOR_KEY = 'reputation_recalc:cursor'
+CURSOR_TTL = 60 * 60 * 48
+
+
+def recalculate_users(user_ids: List, chunk_size: int = 1000,
+                      global_avg=GLOBAL_AVG_RATING, min_ratings=MIN_RATINGS) -> int:
+    """Recalculate the creators of these users, chunk by chunk."""
+    recalculated = 0
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = creator_queryset().filter(user_id__in=user_ids[start:start + chunk_size])
+        recalculated += score_creators(chunk, global_avg, min_ratings)
+    return recalculated
+
+
+def recalculate_all(chunk_size: int = 1000, restart: bool = False,
+                    progress: Optional[Callable[[int, int], None]] = None,
+                    global_avg=GLOBAL_AVG_RATING, min_ratings=MIN_RATINGS) -> int:
+    """
+    Recalculate every creator in chunks of chunk_size, in ID order.
+
+    Progress is saved after each chunk, so a run that fails part way
+    resumes after the last finished chunk, with the same reference time,
+    unless restart is set. progress(processed, total) is called after
+    each chunk. Returns the number of creators processed in this run.
+    """
+    state = None if restart else cache.get(CURSOR_KEY)
+    if state:
+        now = parse_datetime(state['now'])
+        last_id, processed = state['last_id'], state['processed']
+        logger.info(f"Resuming reputation recalculation after creator {last_id} ({processed} done)")
+    else:
+        now, last_id, processed = timezone.now(), 0, 0
+
+    total = CreatorProfile.objects.count()
+    done_before = processed
+    while True:
+        chunk = list(creator_queryset().filter(id__gt=last_id).order_by('id')[:chunk_size])
+        if not chunk:
+            break
+
+        processed += score_creators(chunk, global_avg, min_ratings, now=now)
+        last_id = chunk[-1].id
+        cache.set(CURSOR_KEY, {'now': now.isoformat(), 'last_id': last_id, 'processed': processed}, CURSOR_TTL)
+
+        if progress:
+            progress(processed, total)
+        logger.info(f"Recalculated reputation for {processed}/{total} creators")
+
+    cache.delete(CURSOR_KEY)
+    return processed - done_before
@@ -0,0 +1,196 @@
+# votes/services/vote_service.py
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+from ..models import Vote
+from .reputation_queue import reputation_queue
+from posts.models import Post
+from users.services.rollup_service import record_activity
+
+User = get_user_model()
+
+# Votes are either +1 or +2, so a vote that changed must have had the other value
+OTHER_VALUE = {1: 2, 2: 1}
+
+
+def _upsert_vote_postgresql(user_id, post_id, value) -> Tuple[Optional[int], Optional[datetime]]:
+    # Rows are only touched when the value changes; xmax = 0 means the row was inserted
+    sql = f"""
+        INSERT INTO {Vote._meta.db_table} (user_id, post_id, value, created_at, weight, vote_context)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (user_id, post_id) DO UPDATE SET value = EXCLUDED.value
+        WHERE {Vote._meta.db_table}.value <> EXCLUDED.value
+        RETURNING (xmax = 0) AS inserted, created_at
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, post_id, value, timezone.now(), 1.0, 'feed'])
+        row = cursor.fetchone()
+
+    if row is None:
+        return value, None
+    inserted, created_at = row
+    return (None if inserted else OTHER_VALUE[value]), created_at
+
+
+def _upsert_vote_generic(user_id, post_id, value) -> Tuple[Optional[int], Optional[datetime]]:
+    vote, created = Vote.objects.select_for_update().get_or_create(
+        user_id=user_id, post_id=post_id, defaults={'value': value}
+    )
+    if created:
+        return None, vote.created_at
+    if vote.value == value:
+        return value, None
+    Vote.objects.filter(pk=vote.pk).update(value=value)
+    return vote.value, vote.created_at
+
+
+def upsert_vote(user_id, post_id, value) -> Tuple[Optional[int], Optional[datetime]]:
+    """
+    Insert or update a vote in one statement (on PostgreSQL).
+    Returns the previous value (None for a new vote) and when the vote was
+    first cast (None if nothing changed).
+    """
+    if connection.vendor == 'postgresql':
+        return _upsert_vote_postgresql(user_id, post_id, value)
+    return _upsert_vote_generic(user_id, post_id, value)
+
+
+def delete_vote(user_id, post_id) -> Tuple[Optional[int], Optional[datetime]]:
+    """
+    Delete a vote in one statement (on PostgreSQL).
+    Returns its value and when it was cast, (None, None) if there was no vote.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Vote._meta.db_table} WHERE user_id = %s AND post_id = %s RETURNING value, created_at",
+                [user_id, post_id]
+            )
+            row = cursor.fetchone()
+        return row if row else (None, None)
+
+    row = Vote.objects.select_for_update().filter(user_id=user_id, post_id=post_id).values_list('value', 'created_at').first()
+    if row is None:
+        return None, None
+    Vote.objects.filter(user_id=user_id, post_id=post_id).delete()
+    return row
+
+
+def vote_delta(old_value: Optional[int], new_value: Optional[int]) -> Tuple[int, int, int]:
+    """Change in (plus_one_count, plus_two_count, total_score) when a vote goes from old_value to new_value."""
+    return (
+        (new_value == 1) - (old_value == 1),
+        (new_value == 2) - (old_value == 2),
+        (new_value or 0) - (old_value or 0),
+    )
+
+
+def _update_counters(post, plus_one: int, plus_two: int, score: int):
+    Post.objects.filter(pk=post.pk).update(
+        plus_one_count=F('plus_one_count') + plus_one,
+        plus_two_count=F('plus_two_count') + plus_two,
+        total_score=F('total_score') + score,
+    )
+
+    # Keep the in-memory post in step for callers (ranking index, cache)
+    post.plus_one_count += plus_one
+    post.plus_two_count += plus_two
+    post.total_score += score
+
+
+def _activity(author_id, voted_at, old_value, new_value, score) -> Tuple:
+    """Rollup entry for a vote change, counted on the day the vote was first cast."""
+    votes = (new_value is not None) - (old_value is not None)
+    return (author_id, timezone.localdate(voted_at), votes, score, 0)
+
+
+def apply_vote_delta(post, old_value: Optional[int], new_value: Optional[int], voted_at=None) -> int:
+    """
+    Apply the exact change between two vote values to the post counters,
+    the author's total_points and their daily rollup. Returns the score delta.
+    """
+    plus_one, plus_two, score = vote_delta(old_value, new_value)
+
+    if plus_one or plus_two:
+        _update_counters(post, plus_one, plus_two, score)
+        User.objects.filter(pk=post.user_id).update(total_points=F('total_points') + score)
+        record_activity([_activity(post.user_id, voted_at or timezone.now(), old_value, new_value, score)])
+        transaction.on_commit(lambda: reputation_queue.mark_dirty(post.user_id))
+
+    return score
+
+
+def cast_vote(user, post, value: int) -> Optional[int]:
+    """Record a user's vote on a post. Returns the previous value, None for a new vote."""
+    with transaction.atomic():
+        old_value, voted_at = upsert_vote(user.pk, post.pk, value)
+        apply_vote_delta(post, old_value, value, voted_at)
+    return old_value
+
+
+def remove_vote(user, post) -> Optional[int]:
+    """Remove a user's vote from a post. Returns the removed value, None if there was no vote."""
+    with transaction.atomic():
+        old_value, voted_at = delete_vote(user.pk, post.pk)
+        if old_value is not None:
+            apply_vote_delta(post, old_value, None, voted_at)
+    return old_value
+
+
+def apply_votes(votes: Iterable[Tuple[str, str, Optional[int]]]) -> List[Post]:
+    """
+    Apply many (user_id, post_id, value) votes in one transaction, value None removes the vote.
+    Counter deltas are summed so each post, author and rollup row is updated once.
+    Votes on posts or by users that no longer exist are skipped.
+    Returns the posts whose counters changed.
+    """
+    votes = [(str(user_id), str(post_id), value) for user_id, post_id, value in votes]
+    posts = {
+        str(post.pk): post for post in
+        Post.objects.select_related('user', 'category').filter(pk__in={post_id for _, post_id, _ in votes})
+    }
+    user_ids = {
+        str(user_id) for user_id in
+        User.objects.filter(pk__in={user_id for user_id, _, _ in votes}).values_list('pk', flat=True)
+    }
+
+    post_deltas = defaultdict(lambda: [0, 0, 0])
+    activity = []
+    with transaction.atomic():
+        for user_id, post_id, value in votes:
+            if post_id not in posts or user_id not in user_ids:
+                continue
+            if value is None:
+                old_value, voted_at = delete_vote(user_id, post_id)
+            else:
+                old_value, voted_at = upsert_vote(user_id, post_id, value)
+            delta = vote_delta(old_value, value)
+            for i in range(3):
+                post_deltas[post_id][i] += delta[i]
+            if voted_at is not None and delta[2]:
+                activity.append(_activity(posts[post_id].user_id, voted_at, old_value, value, delta[2]))
+
+        changed = []
+        author_points = defaultdict(int)
+        # Fixed lock order, so concurrent batches cannot deadlock on the same rows
+        for post_id in sorted(post_deltas):
+            plus_one, plus_two, score = post_deltas[post_id]
+            if not (plus_one or plus_two):
+                continue
+            post = posts[post_id]
+            _update_counters(post, plus_one, plus_two, score)
+            author_points[str(post.user_id)] += score
+            changed.append(post)
+
+        for author_id in sorted(author_points):
+            if author_points[author_id]:
+                User.objects.filter(pk=author_id).update(total_points=F('total_points') + author_points[author_id])
+        record_activity(activity)
+        transaction.on_commit(lambda: reputation_queue.mark_dirty(*author_points))
+
+    return changed
@@ -0,0 +1,170 @@
+# votes/services/vote_stream.py
+from django.conf import settings
+from redis.exceptions import ResponseError
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+# Deletes a pending vote only if it still holds the value that was applied,
+# so a re-vote queued meanwhile stays visible until it is applied too.
+CLEAR_PENDING_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+# Releases the consumer lock only if this consumer still holds it.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class VoteStream:
+    """
+    Asynchronous vote ingestion through a Redis stream.
+
+    Requests append votes to the stream and return immediately. Consumer
+    workers read it through a consumer group and apply each batch in one
+    transaction, collapsing re-votes on the same (user, post). Only one
+    consumer runs at a time, so batches are applied in stream order and an
+    older re-vote never overwrites a newer one. The latest queued value per
+    (user, post) is also kept in a pending hash, so users see their own vote
+    before it reaches the database.
+    """
+
+    def __init__(self):
+        self.stream_key = getattr(settings, 'VOTE_STREAM_KEY', 'vote_stream')
+        self.pending_key = f"{self.stream_key}:pending"
+        self.group = getattr(settings, 'VOTE_STREAM_GROUP', 'vote-appliers')
+        self.batch_size = getattr(settings, 'VOTE_STREAM_BATCH_SIZE', 500)
+        self.claim_idle_ms = getattr(settings, 'VOTE_STREAM_CLAIM_IDLE', 60) * 1000
+        self.lock_key = f"{self.stream_key}:lock"
+        # Longer than any single batch takes to apply, renewed after each batch
+        self.lock_timeout = getattr(settings, 'VOTE_STREAM_LOCK_TIMEOUT', 60)
+
+    def _get_redis(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'VOTE_INGESTION_MODE', 'sync') == 'stream'
+
+    def _field(self, user_id, post_id) -> str:
+        return f"{user_id}:{post_id}"
+
+    def append(self, user_id, post_id, value: Optional[int]):
+        """Queue a vote, value None removes it. Raises if Redis is unavailable."""
+        field = self._field(user_id, post_id)
+        pipe = self._get_redis().pipeline()
+        pipe.hset(self.pending_key, field, value or 0)
+        pipe.xadd(self.stream_key, {'user': str(user_id), 'post': str(post_id), 'value': value or 0})
+        pipe.execute()
+
+    def get_pending(self, user_id, post_ids: Iterable) -> Dict[str, Optional[int]]:
+        """
+        Queued votes of a user that are not applied yet, by post ID.
+        A value of None is a queued removal.
+        """
+        post_ids = [str(post_id) for post_id in post_ids]
+        if not post_ids:
+            return {}
+        try:
+            values = self._get_redis().hmget(self.pending_key, [self._field(user_id, post_id) for post_id in post_ids])
+        except Exception as e:
+            logger.error(f"Error reading pending votes for user {user_id}: {e}")
+            return {}
+        return {
+            post_id: int(value) or None
+            for post_id, value in zip(post_ids, values)
+            if value is not None
+        }
+
+    def _ensure_group(self, redis_conn):
+        try:
+            redis_conn.xgroup_create(self.stream_key, self.group, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _next_batch(self, redis_conn, consumer: str) -> List[Tuple[bytes, dict]]:
+        # Entries left unacknowledged by a crashed consumer are taken over first
+        _, entries, *_ = redis_conn.xautoclaim(
+            self.stream_key, self.group, consumer,
+            min_idle_time=self.claim_idle_ms, start_id='0-0', count=self.batch_size
+        )
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+        if entries:
+            return entries
+
+        response = redis_conn.xreadgroup(self.group, consumer, {self.stream_key: '>'}, count=self.batch_size)
+        return response[0][1] if response else []
+
+    def _apply_batch(self, redis_conn, entries) -> int:
+        from posts.services.ranking_service import feed_ranking_index
+        from .vote_service import apply_votes
+
+        # Stream order, so the last vote per (user, post) wins
+        latest = {}
+        for _, fields in entries:
+            key = (fields[b'user'].decode(), fields[b'post'].decode())
+            latest[key] = int(fields[b'value']) or None
+
+        changed = apply_votes([(user_id, post_id, value) for (user_id, post_id), value in latest.items()])
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        pipe = redis_conn.pipeline()
+        for (user_id, post_id), value in latest.items():
+            pipe.eval(CLEAR_PENDING_SCRIPT, 1, self.pending_key, self._field(user_id, post_id), value or 0)
+        pipe.xack(self.stream_key, self.group, *entry_ids)
+        pipe.xdel(self.stream_key, *entry_ids)
+        pipe.execute()
+
+        for post in changed:
+            feed_ranking_index.add_post(post)
+        return len(entries)
+
+    def consume(self, consumer: Optional[str] = None, max_batches: Optional[int] = None) -> int:
+        """
+        Apply queued votes batch by batch until the stream is drained, or do
+        nothing while another consumer holds the lock.
+        Re-applying a batch after a crash is safe, votes are stored as values, not increments.
+        Returns the number of stream entries applied.
+        """
+        consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        redis_conn = self._get_redis()
+        if not redis_conn.set(self.lock_key, consumer, nx=True, ex=self.lock_timeout):
+            # Another consumer is draining the stream
+            return 0
+
+        applied = batches = 0
+        try:
+            self._ensure_group(redis_conn)
+            while max_batches is None or batches < max_batches:
+                entries = self._next_batch(redis_conn, consumer)
+                if not entries:
+                    break
+                applied += self._apply_batch(redis_conn, entries)
+                batches += 1
+                # Stop if the lock expired during a slow batch and another consumer took over
+                if redis_conn.get(self.lock_key) != consumer.encode():
+                    break
+                redis_conn.expire(self.lock_key, self.lock_timeout)
+        finally:
+            redis_conn.eval(RELEASE_LOCK_SCRIPT, 1, self.lock_key, consumer)
+
+        if applied:
+            logger.info(f"Applied {applied} queued votes in {batches} batches")
+        return applied
+
+
+# Singleton instance
+vote_stream = VoteStream()
@@ -1,56 +1,20 @@
-import math
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.db.models import F
 
+from posts.models import Post
 from .models import Vote
-from .tasks import recalculate_creator_reputation
+from .services.reputation_queue import reputation_queue
 
-# Constants (Could also be moved to settings.py)
-GLOBAL_AVG_RATING = 4.2
-MIN_RATINGS = 75
 
 @receiver(post_save, sender=Vote)
-def update_post_and_creator(sender, instance, created, **kwargs):
+def queue_creator_reputation(sender, instance, **kwargs):
     """
-    Handles immediate post updates and triggers background 
-    recalculation for the creator's reputation.
+    Queues a coalesced reputation recalculation for the post's author
+    when a vote is saved through the ORM (e.g. the admin). The vote
+    endpoints write through votes.services.vote_service, which updates
+    the post counters and queues the recalculation itself.
     """
-    if not created:
-        return
-
-    post = instance.post
-
-    # 1. Update Post counts atomically in the DB
-    update_fields = {
-        'total_score': F('total_score') + instance.value,
-        'rating_count': F('rating_count') + 1,
-    }
-
-    if instance.value == 1:
-        update_fields['plus_one_count'] = F('plus_one_count') + 1
-    elif instance.value == 2:
-        update_fields['plus_two_count'] = F('plus_two_count') + 1
-
-    # Apply updates directly to the DB to avoid race conditions
-    # We use .filter().update() because it returns the number of rows updated
-    # and executes a single SQL UPDATE statement.
-    sender.objects.filter(post=post).update() # Note: This is a placeholder for logic
-    
-    # Correct way to update the specific post instance's related post object
-    post.__class__.objects.filter(pk=post.pk).update(**update_fields)
-
-    # 2. Refresh post to calculate the new average rating for that specific post
-    post.refresh_from_db()
-    if post.rating_count > 0:
-        post.avg_rating = post.total_score / post.rating_count
-        post.save(update_fields=['avg_rating'])
-
-    # 3. Offload the heavy CreatorProfile math to Celery
-    # We pass IDs only (best practice for Celery)
-    creator = post.user.creatorprofile
-    recalculate_creator_reputation.delay(
-        creator.id, 
-        GLOBAL_AVG_RATING, 
-        MIN_RATINGS
-    )
\ No newline at end of file
+    author_id = Post.objects.filter(pk=instance.post_id).values_list('user_id', flat=True).first()
+    if author_id:
+        transaction.on_commit(lambda: reputation_queue.mark_dirty(author_id))
@@ -1,3 +1,187 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django_redis import get_redis_connection
+from fakeredis import FakeConnection
+from rest_framework.test import APIClient
+
+from posts.models import Post
+from users.models import CreatorProfile, User
+from .models import Vote
+from .services.vote_service import apply_votes, cast_vote, remove_vote
+from .services.reputation_queue import reputation_queue
+from .services.reputation_service import recalculate_users
+from .services.vote_stream import vote_stream
+from .tasks import consume_vote_stream, recalculate_dirty_creators
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+FAKE_REDIS_CACHES = {'default': {
+    'BACKEND': 'django_redis.cache.RedisCache',
+    'LOCATION': 'redis://fakeredis:6379/0',
+    'OPTIONS': {'CONNECTION_POOL_KWARGS': {'connection_class': FakeConnection}},
+}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VoteDeltaTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.voters = [User.objects.create(username=f'voter{i}') for i in range(3)]
+        self.post = Post.objects.create(user=self.author, caption='post', status='ready')
+
+    def assertCounters(self, plus_one, plus_two):
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual((self.post.plus_one_count, self.post.plus_two_count), (plus_one, plus_two))
+        self.assertEqual(self.post.total_score, plus_one + 2 * plus_two)
+        self.assertEqual(self.author.total_points, self.post.total_score)
+
+    def test_cast_change_and_remove(self):
+        self.assertIsNone(cast_vote(self.voters[0], self.post, 1))
+        self.assertCounters(1, 0)
+
+        self.assertEqual(cast_vote(self.voters[0], self.post, 2), 1)
+        self.assertCounters(0, 1)
+
+        # Re-casting the same vote changes nothing
+        self.assertEqual(cast_vote(self.voters[0], self.post, 2), 2)
+        self.assertCounters(0, 1)
+
+        self.assertEqual(remove_vote(self.voters[0], self.post), 2)
+        self.assertIsNone(remove_vote(self.voters[0], self.post))
+        self.assertCounters(0, 0)
+
+    def test_apply_votes_batch(self):
+        cast_vote(self.voters[0], self.post, 1)
+        changed = apply_votes([
+            (self.voters[0].pk, self.post.pk, 2),
+            (self.voters[1].pk, self.post.pk, 1),
+            (self.voters[1].pk, self.post.pk, None),
+            (self.voters[2].pk, self.post.pk, 2),
+            (self.voters[2].pk, 'a7d4fa43-1f1c-4b0e-9d0b-6f1a2f0f9c11', 2),
+        ])
+        self.assertEqual([post.pk for post in changed], [self.post.pk])
+        self.assertCounters(0, 2)
+        self.assertEqual(Vote.objects.count(), 2)
+
+    def test_deleting_a_post_takes_its_score_off_the_author(self):
+        other = Post.objects.create(user=self.author, caption='other', status='ready')
+        cast_vote(self.voters[0], self.post, 1)
+        cast_vote(self.voters[1], other, 2)
+
+        client = APIClient()
+        client.force_authenticate(self.author)
+        self.assertEqual(client.delete(f'/api/posts/{other.pk}/delete/').status_code, 204)
+        self.assertCounters(1, 0)
+
+    def test_repair_total_points(self):
+        cast_vote(self.voters[0], self.post, 2)
+        User.objects.filter(pk=self.author.pk).update(total_points=7)
+
+        out = StringIO()
+        call_command('repair_total_points', stdout=out)
+        self.assertIn('Repaired 1 users', out.getvalue())
+        self.assertCounters(0, 1)
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHES)
+class BenchmarkReputationTests(TestCase):
+    def test_refuses_to_run_without_debug(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_reputation', creators=10, stdout=StringIO())
+
+    def test_leaves_the_database_and_leaderboard_alone(self):
+        redis_conn = get_redis_connection('default')
+        redis_conn.flushdb()
+        User.objects.create(username='author')
+
+        out = StringIO()
+        call_command('benchmark_reputation', creators=20, sample=5, chunk_size=8, i_know=True, stdout=out)
+        self.assertIn('chunked bulk', out.getvalue())
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['author'])
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(redis_conn.keys('*'), [])
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHES, VOTE_INGESTION_MODE='stream')
+class VoteStreamTests(TestCase):
+    def setUp(self):
+        get_redis_connection('default').flushdb()
+        self.author = User.objects.create(username='author')
+        self.voter = User.objects.create(username='voter')
+        self.post = Post.objects.create(user=self.author, caption='post', status='ready')
+        self.client = APIClient()
+        self.client.force_authenticate(self.voter)
+
+    def vote(self, value):
+        return self.client.post(f'/api/votes/{self.post.pk}/', {'vote_type': value}, format='json')
+
+    def test_votes_are_queued_then_applied(self):
+        self.assertEqual(self.vote(1).status_code, 202)
+        self.assertEqual(self.vote(2).status_code, 202)
+        self.assertFalse(Vote.objects.exists())
+        self.assertEqual(vote_stream.get_pending(self.voter.pk, [self.post.pk]), {str(self.post.pk): 2})
+
+        self.assertEqual(consume_vote_stream(), 'Applied 2 queued votes')
+        # Re-votes on the same post collapse to the latest one
+        self.assertEqual(list(Vote.objects.values_list('value', flat=True)), [2])
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.plus_one_count, self.post.plus_two_count), (0, 1))
+        self.assertEqual(vote_stream.get_pending(self.voter.pk, [self.post.pk]), {})
+
+    def test_removal_is_queued_then_applied(self):
+        cast_vote(self.voter, self.post, 2)
+        response = self.client.delete(f'/api/votes/{self.post.pk}/delete/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(vote_stream.get_pending(self.voter.pk, [self.post.pk]), {str(self.post.pk): None})
+        # A removal already queued leaves nothing to remove
+        self.assertEqual(self.client.delete(f'/api/votes/{self.post.pk}/delete/').status_code, 404)
+
+        consume_vote_stream()
+        self.assertFalse(Vote.objects.exists())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.total_points, 0)
+
+
+@override_settings(CACHES=FAKE_REDIS_CACHES)
+class ReputationQueueTests(TestCase):
+    def setUp(self):
+        get_redis_connection('default').flushdb()
+        self.authors = [User.objects.create(username=f'author{i}') for i in range(2)]
+        for author in self.authors:
+            CreatorProfile.objects.create(user=author)
+        self.posts = [
+            Post.objects.create(user=author, caption='post', status='ready')
+            for author in (self.authors[0], self.authors[0], self.authors[1])
+        ]
+        self.voters = [User.objects.create(username=f'voter{i}') for i in range(4)]
+
+    def test_votes_coalesce_into_one_recalculation_per_creator(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for voter in self.voters:
+                for post in self.posts:
+                    cast_vote(voter, post, 2)
+        self.assertEqual(reputation_queue.pending_count(), 2)
+
+        with mock.patch('votes.tasks.recalculate_users', wraps=recalculate_users) as recalculate:
+            self.assertEqual(recalculate_dirty_creators(), 'Recalculated 2 creators')
+        recalculate.assert_called_once()
+        self.assertEqual(sorted(recalculate.call_args.args[0]), sorted(str(author.pk) for author in self.authors))
+
+        profile = CreatorProfile.objects.get(user=self.authors[0])
+        self.assertEqual(profile.rating_count, 8)
+        self.assertGreater(profile.reputation_score, 0)
+        self.assertEqual(reputation_queue.pending_count(), 0)
+        self.assertEqual(recalculate_dirty_creators(), 'Recalculated 0 creators')
+
+    def test_creators_marked_during_a_run_wait_for_the_next_one(self):
+        reputation_queue.mark_dirty(self.authors[0].pk)
+        self.assertEqual(reputation_queue.take(), [str(self.authors[0].pk)])
+        reputation_queue.mark_dirty(self.authors[1].pk)
+        # A failed run leaves its set to be taken again
+        self.assertEqual(reputation_queue.take(), [str(self.authors[0].pk)])
+        reputation_queue.done()
+        self.assertEqual(reputation_queue.take(), [str(self.authors[1].pk)])
@@ -2,11 +2,15 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db import transaction
-from django.db.models import Sum
-from .models import Vote
 from posts.models import Post
+from .models import Vote
+from posts.services.ranking_service import feed_ranking_index
 from .serializers import VoteSerializer
+from .services.vote_service import cast_vote, remove_vote
+from .services.vote_stream import vote_stream
+import logging
+
+logger = logging.getLogger(__name__)
 
 class VoteCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -14,7 +18,7 @@ class VoteCreateView(APIView):
     def post(self, request, post_id):
         
         try:
-            post = Post.objects.get(id=post_id)
+            post = Post.objects.select_related('user', 'category').get(id=post_id)
         except Post.DoesNotExist:
             return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
         
@@ -22,37 +26,16 @@ class VoteCreateView(APIView):
         if vote_value not in [1, 2]:
             return Response({'error': 'vote_type must be 1 or 2'}, status=status.HTTP_400_BAD_REQUEST)
         
-        with transaction.atomic():
+        if vote_stream.enabled:
             try:
-                existing_vote = Vote.objects.get(user=request.user, post=post)
-                old_value = existing_vote.value
-                existing_vote.value = vote_value
-                existing_vote.save()
-                
-                if old_value == 1 and vote_value == 2:
-                    post.plus_one_count -= 1
-                    post.plus_two_count += 1
-                elif old_value == 2 and vote_value == 1:
-                    post.plus_two_count -= 1
-                    post.plus_one_count += 1
-                    
-            except Vote.DoesNotExist:
-                Vote.objects.create(
-                    user=request.user,
-                    post=post,
-                    value=vote_value
-                )
-                if vote_value == 1:
-                    post.plus_one_count += 1
-                else:
-                    post.plus_two_count += 1
-            
-            post.calculate_score()
-            
-            post.user.total_points = Post.objects.filter(user=post.user).aggregate(
-                total=Sum('total_score')
-            )['total'] or 0
-            post.user.save(update_fields=['total_points'])
+                vote_stream.append(request.user.pk, post.pk, vote_value)
+                return Response({'message': 'Vote queued'}, status=status.HTTP_202_ACCEPTED)
+            except Exception as e:
+                logger.error(f"Error queueing vote on post {post.pk}, applying it directly: {e}")
+        
+        # Re-casting the same vote changes nothing, so there is nothing to reindex
+        if cast_vote(request.user, post, vote_value) != vote_value:
+            feed_ranking_index.add_post(post)
         
         return Response({'message': 'Vote recorded'}, status=status.HTTP_201_CREATED)
 
@@ -61,25 +44,27 @@ class VoteDeleteView(APIView):
     
     def delete(self, request, post_id):
         try:
-            vote = Vote.objects.get(user=request.user, post_id=post_id)
-        except Vote.DoesNotExist:
+            post = Post.objects.select_related('user', 'category').get(id=post_id)
+        except Post.DoesNotExist:
             return Response({'error': 'Vote not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        with transaction.atomic():
-            post = vote.post
-            
-            if vote.value == 1:
-                post.plus_one_count -= 1
+        if vote_stream.enabled:
+            pending = vote_stream.get_pending(request.user.pk, [post.pk])
+            if str(post.pk) in pending:
+                has_vote = pending[str(post.pk)] is not None
             else:
-                post.plus_two_count -= 1
-            
-            post.calculate_score()
-            
-            post.user.total_points = Post.objects.filter(user=post.user).aggregate(
-                total=Sum('total_score')
-            )['total'] or 0
-            post.user.save(update_fields=['total_points'])
-            
-            vote.delete()
+                has_vote = Vote.objects.filter(user=request.user, post=post).exists()
+            if not has_vote:
+                return Response({'error': 'Vote not found'}, status=status.HTTP_404_NOT_FOUND)
+            try:
+                vote_stream.append(request.user.pk, post.pk, None)
+                return Response({'message': 'Vote removal queued'}, status=status.HTTP_202_ACCEPTED)
+            except Exception as e:
+                logger.error(f"Error queueing vote removal on post {post.pk}, applying it directly: {e}")
+        
+        if remove_vote(request.user, post) is None:
+            return Response({'error': 'Vote not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        feed_ranking_index.add_post(post)
         
         return Response({'message': 'Vote removed'}, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file